@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:47
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brand', '0001_initial'),
+        # gin_trgm_ops is provided by the pg_trgm extension
+        ('product', '0011_enable_pg_trgm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='brand',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='brands_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -9,6 +10,10 @@ class Brand(models.Model):
     class Meta:
         db_table = 'brands'
         ordering = ['name']
+        indexes = [
+            # Trigram index for brand search (ILIKE and pg_trgm % operator)
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='brands_name_trgm'),
+        ]
 
     def __str__(self):
         return self.name
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Product, ProductTag, ProductDetailPic
+from .collection_registry import refresh_collection
+from .models import Collection, Product, ProductTag, ProductDetailPic
 
 
 @admin.register(ProductDetailPic)
@@ -41,3 +42,18 @@ class ProductTagAdmin(admin.ModelAdmin):
     list_display = ('product', 'new', 'new_if', 'hot', 'hot_if', 'rank_if')
     list_filter = ('new', 'hot')
     search_fields = ('product__name',)
+
+
+@admin.register(Collection)
+class CollectionAdmin(admin.ModelAdmin):
+    list_display = ('slug', 'title', 'product_count', 'stale', 'refreshed_at')
+    list_filter = ('stale',)
+    search_fields = ('slug', 'title')
+    readonly_fields = ('stale', 'product_count', 'refreshed_at')
+    actions = ('refresh_membership',)
+
+    @admin.action(description='Refresh membership of selected collections')
+    def refresh_membership(self, request, queryset):
+        for collection in queryset:
+            refresh_collection(collection)
+        self.message_user(request, f'Refreshed {queryset.count()} collection(s)')
@@ -0,0 +1,302 @@
+"""
+In-process autocomplete index for the search-as-you-type endpoint.
+
+Each worker keeps brand names, product names and product types in memory with
+a sorted prefix table and a trigram inverted index, so header search
+suggestions are answered without touching the database.
+
+Lifecycle:
+- warm_up() builds the index in a background thread (called per worker from config/wsgi.py)
+- model signals (see signals.py) apply product/brand changes incrementally
+- suggest() returns None while the index is cold so callers fall back to SQL
+- an index older than PRODUCT_AUTOCOMPLETE_MAX_AGE is rebuilt in the background,
+  which picks up writes handled by other workers
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+KIND_BRAND = 'brand'
+KIND_TYPE = 'type'
+KIND_PRODUCT = 'product'
+
+# Brands first, then product types, then product names when scores tie
+KIND_PRIORITY = {KIND_BRAND: 0, KIND_TYPE: 1, KIND_PRODUCT: 2}
+
+# Scores above any trigram similarity (which is at most 1.0)
+FULL_PREFIX_SCORE = 3.0
+WORD_PREFIX_SCORE = 2.0
+
+# Upper bound on prefix-table rows inspected for very short prefixes
+PREFIX_SCAN_LIMIT = 500
+
+# pg_trgm treats every non-alphanumeric character as a word separator
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return ' '.join(str(text).lower().split())
+
+
+def trigrams(text: str) -> set:
+    """Trigram set compatible with pg_trgm (words padded with two leading and one trailing space)"""
+    grams = set()
+    for word in _WORD_RE.findall(str(text).lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class _IndexState:
+    """
+    Index contents. Writers hold SuggestionIndex._lock; once the state is
+    published, they replace the prefix table and the posting sets they touch
+    instead of mutating them, so suggest() can read without the lock.
+    """
+
+    def __init__(self):
+        self.refs = Counter()              # (kind, display) -> number of catalog rows naming it
+        self.prefixes = []                 # sorted (normalized word-suffix, entry)
+        self.grams = defaultdict(set)      # trigram -> {entry}
+        self.gram_counts = {}              # entry -> number of trigrams
+        self.products = {}                 # product id -> (name, types)
+        self.brands = {}                   # brand id -> name
+
+    @staticmethod
+    def _suffixes(display):
+        words = normalize(display).split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def _index_entry(self, entry, bulk=False):
+        grams = trigrams(entry[1])
+        if bulk:
+            # Unpublished state being built: mutate in place, sorted once at the end
+            self.prefixes.extend((suffix, entry) for suffix in self._suffixes(entry[1]))
+            for gram in grams:
+                self.grams[gram].add(entry)
+        else:
+            prefixes = list(self.prefixes)
+            for suffix in self._suffixes(entry[1]):
+                bisect.insort(prefixes, (suffix, entry))
+            self.prefixes = prefixes
+            for gram in grams:
+                self.grams[gram] = self.grams.get(gram, frozenset()) | {entry}
+        self.gram_counts[entry] = len(grams)
+
+    def _unindex_entry(self, entry):
+        removed = {(suffix, entry) for suffix in self._suffixes(entry[1])}
+        self.prefixes = [row for row in self.prefixes if row not in removed]
+        for gram in trigrams(entry[1]):
+            entries = self.grams.get(gram)
+            if entries is None:
+                continue
+            remaining = entries - {entry}
+            if remaining:
+                self.grams[gram] = remaining
+            else:
+                del self.grams[gram]
+        self.gram_counts.pop(entry, None)
+
+    def add(self, kind, display, bulk=False):
+        if not display or not str(display).strip():
+            return
+        entry = (kind, str(display).strip())
+        self.refs[entry] += 1
+        if self.refs[entry] == 1:
+            self._index_entry(entry, bulk=bulk)
+
+    def discard(self, kind, display):
+        if not display or not str(display).strip():
+            return
+        entry = (kind, str(display).strip())
+        if entry not in self.refs:
+            return
+        self.refs[entry] -= 1
+        if self.refs[entry] <= 0:
+            del self.refs[entry]
+            self._unindex_entry(entry)
+
+    def set_product(self, product_id, name, types, bulk=False):
+        self.remove_product(product_id)
+        types = tuple(t for t in types if isinstance(t, str)) if isinstance(types, list) else ()
+        self.products[product_id] = (name, types)
+        self.add(KIND_PRODUCT, name, bulk=bulk)
+        for product_type in types:
+            self.add(KIND_TYPE, product_type, bulk=bulk)
+
+    def remove_product(self, product_id):
+        previous = self.products.pop(product_id, None)
+        if previous is None:
+            return
+        name, types = previous
+        self.discard(KIND_PRODUCT, name)
+        for product_type in types:
+            self.discard(KIND_TYPE, product_type)
+
+    def set_brand(self, brand_id, name, bulk=False):
+        self.remove_brand(brand_id)
+        self.brands[brand_id] = name
+        self.add(KIND_BRAND, name, bulk=bulk)
+
+    def remove_brand(self, brand_id):
+        previous = self.brands.pop(brand_id, None)
+        if previous is not None:
+            self.discard(KIND_BRAND, previous)
+
+    def suggest(self, query, limit, threshold):
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        scores = {}
+        # Writers swap these containers rather than mutating them
+        prefixes, grams, gram_counts = self.prefixes, self.grams, self.gram_counts
+
+        # Prefix matches: whole string first, then any word boundary
+        position = bisect.bisect_left(prefixes, (normalized,))
+        for suffix, entry in prefixes[position:position + PREFIX_SCAN_LIMIT]:
+            if not suffix.startswith(normalized):
+                break
+            score = FULL_PREFIX_SCORE if normalize(entry[1]).startswith(normalized) else WORD_PREFIX_SCORE
+            scores[entry] = max(scores.get(entry, 0.0), score)
+
+        # Fuzzy matches: trigram similarity, same semantics as pg_trgm similarity()
+        query_grams = trigrams(normalized)
+        if len(normalized) > 2 and query_grams:
+            shared = Counter()
+            for gram in query_grams:
+                for entry in grams.get(gram, ()):
+                    shared[entry] += 1
+            for entry, common in shared.items():
+                entry_grams = gram_counts.get(entry)
+                if entry_grams is None:
+                    # Removed by a concurrent write
+                    continue
+                similarity = common / (len(query_grams) + entry_grams - common)
+                if similarity > threshold and similarity > scores.get(entry, 0.0):
+                    scores[entry] = similarity
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], KIND_PRIORITY[item[0][0]], len(item[0][1]), item[0][1])
+        )
+        suggestions = []
+        seen = set()
+        for (kind, display), _score in ranked:
+            key = display.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            suggestions.append(display)
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+
+class SuggestionIndex:
+    """Per-worker suggestion index over brand names, product names and product types"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state = None
+        self._pending = None
+        self._building = False
+        self.built_at = None
+
+    @property
+    def is_warm(self):
+        return self._state is not None
+
+    def suggest(self, query: str, limit: int = 8):
+        """
+        Return up to `limit` suggestion strings for `query`, or None when the
+        index has not been built yet (caller should use the SQL path).
+        """
+        with self._lock:
+            state = self._state
+        if state is None:
+            return None
+        suggestions = state.suggest(query, limit, settings.PRODUCT_SEARCH_SIMILARITY_THRESHOLD)
+        if self.built_at is not None and time.monotonic() - self.built_at > settings.PRODUCT_AUTOCOMPLETE_MAX_AGE:
+            self.warm_up()
+        return suggestions
+
+    def rebuild(self):
+        """Build a fresh index from the database and swap it in"""
+        from apps.brand.models import Brand
+        from .models import Product
+
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._pending = []
+        try:
+            state = _IndexState()
+            for brand_id, name in Brand.objects.values_list('id', 'name').iterator(chunk_size=2000):
+                state.set_brand(brand_id, name, bulk=True)
+            for product_id, name, types in Product.objects.values_list('id', 'name', 'type').iterator(chunk_size=2000):
+                state.set_product(product_id, name, types, bulk=True)
+            state.prefixes.sort()
+            with self._lock:
+                # Replay changes committed while the snapshot was being read
+                for operation, args in self._pending:
+                    getattr(state, operation)(*args)
+                self._state = state
+                self.built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._building = False
+                self._pending = None
+
+    def warm_up(self):
+        """Rebuild the index in a background daemon thread"""
+        with self._lock:
+            if self._building:
+                return
+        thread = threading.Thread(target=self._rebuild_in_background, name='suggestion-index-build', daemon=True)
+        thread.start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Failed to build the autocomplete suggestion index')
+        finally:
+            connections.close_all()
+
+    def reset(self):
+        """Drop the index (it reports cold until rebuilt)"""
+        with self._lock:
+            self._state = None
+            self.built_at = None
+
+    def _apply(self, operation, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((operation, args))
+            if self._state is not None:
+                getattr(self._state, operation)(*args)
+
+    def product_saved(self, product):
+        self._apply('set_product', product.id, product.name, product.type)
+
+    def product_deleted(self, product_id):
+        self._apply('remove_product', product_id)
+
+    def brand_saved(self, brand):
+        self._apply('set_brand', brand.id, brand.name)
+
+    def brand_deleted(self, brand_id):
+        self._apply('remove_brand', brand_id)
+
+
+suggestion_index = SuggestionIndex()
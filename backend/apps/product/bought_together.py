@@ -0,0 +1,193 @@
+"""
+"Frequently bought together" mined from order history.
+
+Order.products holds {product_id: quantity}. The job streams orders newer
+than its watermark through a server-side cursor, and for each chunk of
+orders adds the co-occurrence counts of every product pair (product_pairs)
+and every product (product_order_counts) with one upsert each. The
+watermark moves in the same transaction as the counts, so an interrupted
+run resumes without counting an order twice. Memory is bounded by the chunk
+size, never by the number of orders.
+
+The products of each chunk get their ranked list recomputed in SQL
+(bought_together) in that same transaction, so a run that dies part way
+leaves no counted product without its list. Lists hold pairs seen in at
+least PRODUCT_BOUGHT_TOGETHER_MIN_ORDERS orders, ranked by
+    lift       = orders(A and B) * orders / (orders(A) * orders(B))
+    confidence = orders(A and B) / orders(A)
+where orders counts the mined orders only (orders above MAX_ORDER_ITEMS
+are skipped, as are empty ones). Other products keep the scores of their
+last recompute (only the total order count has moved); `--full` starts over
+from the first order.
+
+Order ids come from a sequence, so a transaction can commit an order below
+the watermark after a run has passed it. Ids a run steps over are kept as
+open ids (up to PRODUCT_BOUGHT_TOGETHER_RESCAN_WINDOW below the watermark)
+and looked up again by every later run (a first run starts at the oldest
+order it sees); an order is counted when it shows up and its id dropped, so
+nothing is counted twice. Orders committing later
+than that window are only picked up by a `--full` run.
+
+Cancelled orders are skipped when streamed; orders are counted once, so a
+later cancellation is only reflected by a `--full` run. Run the job from
+one process at a time:
+
+    python manage.py mine_bought_together
+"""
+from collections import Counter
+from itertools import combinations
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from apps.order.models import Order
+from .models import BoughtTogetherProgress
+
+# Orders with more distinct products than this are skipped: bulk orders add
+# n^2 pairs and little signal
+MAX_ORDER_ITEMS = 50
+
+# Products whose lists are recomputed per statement
+RESCORE_BATCH_SIZE = 5000
+
+PAIRS_UPSERT_SQL = """
+    INSERT INTO product_pairs (product_a, product_b, orders)
+    SELECT * FROM unnest(%s::bigint[], %s::bigint[], %s::integer[])
+    ON CONFLICT (product_a, product_b) DO UPDATE SET orders = product_pairs.orders + EXCLUDED.orders
+"""
+
+COUNTS_UPSERT_SQL = """
+    INSERT INTO product_order_counts (product_id, orders)
+    SELECT * FROM unnest(%s::bigint[], %s::integer[])
+    ON CONFLICT (product_id) DO UPDATE SET orders = product_order_counts.orders + EXCLUDED.orders
+"""
+
+# Both directions of each pair, scored and ranked per product. Within one
+# product's partition lift is proportional to orders / b.orders and confidence
+# to orders, so the window orders by those. Params: total orders, then
+# (product ids, min orders) for each direction, then the list size
+RESCORE_SQL = """
+    INSERT INTO bought_together (product_id, other_id, rank, orders, confidence, lift)
+    SELECT product_id, other_id, rank, orders, confidence, lift
+    FROM (
+        SELECT pairs.product_id, pairs.other_id, pairs.orders,
+               pairs.orders::float8 / a.orders AS confidence,
+               pairs.orders::float8 * %s / (a.orders::float8 * b.orders) AS lift,
+               ROW_NUMBER() OVER (
+                   PARTITION BY pairs.product_id
+                   ORDER BY pairs.orders::float8 / b.orders DESC, pairs.orders DESC, pairs.other_id
+               ) AS rank
+        FROM (
+            SELECT product_a AS product_id, product_b AS other_id, orders
+            FROM product_pairs WHERE product_a = ANY(%s) AND orders >= %s
+            UNION ALL
+            SELECT product_b, product_a, orders
+            FROM product_pairs WHERE product_b = ANY(%s) AND orders >= %s
+        ) AS pairs
+        JOIN product_order_counts a ON a.product_id = pairs.product_id
+        JOIN product_order_counts b ON b.product_id = pairs.other_id
+    ) AS ranked
+    WHERE rank <= %s
+"""
+
+
+def order_product_ids(products) -> list:
+    """Sorted distinct product ids of an Order.products mapping (malformed keys ignored)"""
+    ids = set()
+    for key in products or ():
+        try:
+            ids.add(int(key))
+        except (TypeError, ValueError):
+            continue
+    return sorted(ids)
+
+
+def _flush(pairs: Counter, counts: Counter, last_order_id: int, open_ids: set, mined: int):
+    """Add one chunk's counts, move the watermark and open ids and rescore the chunk's products, atomically"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if pairs:
+            firsts, seconds = zip(*pairs)
+            cursor.execute(PAIRS_UPSERT_SQL, [list(firsts), list(seconds), list(pairs.values())])
+        if counts:
+            cursor.execute(COUNTS_UPSERT_SQL, [list(counts), list(counts.values())])
+        cursor.execute(
+            "UPDATE bought_together_progress SET last_order_id = %s, open_order_ids = %s, "
+            "orders = orders + %s, updated_at = now() WHERE id = 1 RETURNING orders",
+            [last_order_id, sorted(open_ids), mined],
+        )
+        total_orders = cursor.fetchone()[0]
+        if counts:
+            rescore(counts, total_orders)
+
+
+def rescore(product_ids, total_orders: int):
+    """Recompute the bought-together lists of `product_ids`"""
+    product_ids = sorted(product_ids)
+    min_orders = settings.PRODUCT_BOUGHT_TOGETHER_MIN_ORDERS
+    for start in range(0, len(product_ids), RESCORE_BATCH_SIZE):
+        batch = product_ids[start:start + RESCORE_BATCH_SIZE]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM bought_together WHERE product_id = ANY(%s)", [batch])
+            cursor.execute(RESCORE_SQL, [
+                total_orders, batch, min_orders, batch, min_orders, settings.PRODUCT_BOUGHT_TOGETHER_SIZE,
+            ])
+
+
+def mine_bought_together(full: bool = False, chunk_size: int = 5000) -> dict:
+    """
+    Count the orders placed since the last run and refresh the affected lists.
+
+    Args:
+        full: Drop all counts and lists and start again from the first order
+        chunk_size: Orders per server-side cursor fetch and per counting transaction
+
+    Returns:
+        {'orders': orders counted this run, 'skipped': orders passed over (empty or above
+        MAX_ORDER_ITEMS), 'products': distinct products rescored, 'last_order_id': new watermark}
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if full:
+            cursor.execute("TRUNCATE product_pairs, product_order_counts, bought_together")
+            BoughtTogetherProgress.objects.filter(id=1).delete()
+        progress, _created = BoughtTogetherProgress.objects.get_or_create(id=1)
+    last_order_id = progress.last_order_id
+    open_ids = set(progress.open_order_ids)
+    window = settings.PRODUCT_BOUGHT_TOGETHER_RESCAN_WINDOW
+
+    touched = set()
+    mined = skipped = 0
+    pairs, counts, pending, pending_mined = Counter(), Counter(), 0, 0
+    orders = (
+        Order.objects.filter(Q(id__gt=last_order_id) | Q(id__in=open_ids)).exclude(status='cancelled')
+        .order_by('id').values_list('id', 'products')
+    )
+    # .iterator() streams through a server-side cursor on PostgreSQL
+    for order_id, products in orders.iterator(chunk_size=chunk_size):
+        if order_id in open_ids:
+            open_ids.discard(order_id)
+        else:
+            if last_order_id:
+                # Stepped-over ids may belong to orders not committed yet (or cancelled ones)
+                open_ids.update(range(max(last_order_id + 1, order_id - window), order_id))
+            last_order_id = order_id
+        pending += 1
+        product_ids = order_product_ids(products)
+        if product_ids and len(product_ids) <= MAX_ORDER_ITEMS:
+            counts.update(product_ids)
+            pairs.update(combinations(product_ids, 2))
+            pending_mined += 1
+        else:
+            skipped += 1
+        if pending >= chunk_size:
+            open_ids = {open_id for open_id in open_ids if open_id >= last_order_id - window}
+            _flush(pairs, counts, last_order_id, open_ids, pending_mined)
+            touched.update(counts)
+            mined += pending_mined
+            pairs, counts, pending, pending_mined = Counter(), Counter(), 0, 0
+    if pending:
+        open_ids = {open_id for open_id in open_ids if open_id >= last_order_id - window}
+        _flush(pairs, counts, last_order_id, open_ids, pending_mined)
+        touched.update(counts)
+        mined += pending_mined
+    return {'orders': mined, 'skipped': skipped, 'products': len(touched), 'last_order_id': last_order_id}
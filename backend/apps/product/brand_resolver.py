@@ -0,0 +1,80 @@
+"""
+Per-worker brand name-to-id resolver for the `brand` list filter.
+
+The filter matches brand names by case-insensitive substring. Each worker
+keeps every brand's id and lowercased name in memory (the brands table is
+small), so names resolve to ids without a query and the listing filter
+becomes `brand_id = ANY(...)` on the indexed brand_id column instead of an
+ILIKE per name.
+
+Committed brand writes bump the brand version, a row in the cache_versions
+table (cache.py, signals.py). Each lookup compares the map against that row
+(read once per request) and reloads it after a bump, so every worker resolves
+a rename or new brand from its next request after the write commits; the
+writing transaction itself reads a private version and reloads at once.
+"""
+import threading
+
+from .cache import brand_version
+
+# Distinct name fragments remembered per map version (cleared when full)
+RESOLVED_CACHE_SIZE = 1024
+
+
+class BrandResolver:
+    """Brand ids matching brand names, from an in-memory map reloaded when brands change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._names = ()        # (brand id, lowercased name) pairs
+        self._resolved = {}     # lowercased name -> tuple of matching brand ids
+
+    def _load(self):
+        from apps.brand.models import Brand
+
+        version = brand_version()
+        if version == self._version:
+            return
+        names = tuple((brand_id, name.lower()) for brand_id, name in Brand.objects.values_list('id', 'name'))
+        with self._lock:
+            self._names = names
+            self._resolved = {}
+            self._version = version
+
+    def resolve(self, names) -> tuple:
+        """
+        Ids of brands whose name contains any of `names` (case-insensitive).
+
+        Args:
+            names: Brand name fragments
+
+        Returns:
+            Sorted tuple of brand ids (empty when nothing matches)
+        """
+        self._load()
+        brands, resolved = self._names, self._resolved
+        ids = set()
+        for name in names:
+            needle = str(name).strip().lower()
+            if not needle:
+                continue
+            matches = resolved.get(needle)
+            if matches is None:
+                matches = tuple(brand_id for brand_id, brand_name in brands if needle in brand_name)
+                with self._lock:
+                    if len(resolved) >= RESOLVED_CACHE_SIZE:
+                        resolved.clear()
+                    resolved[needle] = matches
+            ids.update(matches)
+        return tuple(sorted(ids))
+
+    def reset(self):
+        """Forget the map (reloaded on next use)"""
+        with self._lock:
+            self._version = None
+            self._names = ()
+            self._resolved = {}
+
+
+brand_resolver = BrandResolver()
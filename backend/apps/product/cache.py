@@ -0,0 +1,218 @@
+"""
+Catalog-versioned cache for search and collection results (and spelling corrections).
+
+A search/collection plan's ordered product ids (with their ORDER BY key
+values, for cursors) and total are cached under the current catalog version.
+Any write to Product, Brand or ProductTag bumps the version when its
+transaction commits (see signals.py), so stale entries are never read again
+and simply expire. Pages of a registered collection (collection_registry.py)
+are also keyed by that collection's own version, which its refresh moves,
+and the registered-slug map by the collections version.
+
+Writes that bypass model signals (QuerySet.update(), bulk_create, raw SQL)
+must call bump_catalog_version() themselves.
+
+The version counters live in the cache_versions table, so every worker and
+management command sees a bump as soon as it commits, whatever the cache
+backend. Cached values themselves may stay per-process (LocMemCache): their
+keys embed the shared version. Within a request each counter is read from the
+table once (start_request / end_request, connected in signals.py), the
+catalog and collections counters together, so a cached response still costs
+that one query.
+
+Until its bump commits, the writing transaction reads a private version of
+its own instead (a random negative number held by the queued on-commit bump),
+so its later reads miss every cache rather than see results from before the
+write, and nothing it caches is visible to anyone else. A rollback drops the
+queued bump and with it the private version.
+"""
+import hashlib
+import secrets
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+CATALOG_VERSION = 'catalog'
+BRAND_VERSION = 'brand'
+COLLECTIONS_VERSION = 'collections'
+RESULT_KEY_PREFIX = 'product:results'
+CORRECTION_KEY_PREFIX = 'product:corrections'
+
+VERSION_SQL = "SELECT name, version, updated_at FROM cache_versions WHERE name = ANY(%s)"
+
+# Also creates a missing counter; clock_timestamp() so bumps within one transaction still move the time
+BUMP_SQL = """
+    INSERT INTO cache_versions (name, version, updated_at)
+    VALUES (%s, nextval('cache_versions_seq'), clock_timestamp())
+    ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version, updated_at = EXCLUDED.updated_at
+    RETURNING version, updated_at
+"""
+
+# updated_at reported for a counter whose row is missing
+MISSING_MODIFIED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# {counter name: (version, updated_at)} read during the current request, None outside requests
+_request = threading.local()
+
+
+def start_request(**kwargs):
+    _request.versions = {}
+
+
+def end_request(**kwargs):
+    _request.versions = None
+
+
+class _PendingBump:
+    """Queued on-commit bump of one counter, and the private version its transaction reads until then"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = (-1 - secrets.randbits(62), datetime.now(timezone.utc))
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        _bump(self.name)
+
+
+def _pending_bump(name: str):
+    for _savepoints, callback, _robust in connection.run_on_commit:
+        if isinstance(callback, _PendingBump) and callback.name == name and not callback.done:
+            return callback
+    return None
+
+
+def _state(name: str) -> tuple:
+    pending = _pending_bump(name)
+    if pending is not None:
+        return pending.state
+    versions = getattr(_request, 'versions', None)
+    if versions is not None and name in versions:
+        return versions[name]
+    names = [name]
+    if versions is not None:
+        # Catalog and collection pages read both; one statement serves the request
+        names += [shared for shared in (CATALOG_VERSION, COLLECTIONS_VERSION) if shared not in versions]
+    with connection.cursor() as cursor:
+        cursor.execute(VERSION_SQL, [list(dict.fromkeys(names))])
+        states = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+    if versions is not None:
+        for read in names:
+            if _pending_bump(read) is None:
+                # Rows are seeded by migration 0022; the first bump recreates a deleted one
+                versions[read] = states.get(read, (0, MISSING_MODIFIED))
+    return states.get(name, (0, MISSING_MODIFIED))
+
+
+def _bump_on_commit(name: str):
+    if _pending_bump(name) is None:
+        transaction.on_commit(_PendingBump(name))
+
+
+def _bump(name: str) -> tuple:
+    with connection.cursor() as cursor:
+        cursor.execute(BUMP_SQL, [name])
+        state = cursor.fetchone()
+    versions = getattr(_request, 'versions', None)
+    if versions is not None:
+        versions[name] = state
+    return state
+
+
+def catalog_version() -> int:
+    """Current catalog version"""
+    return _state(CATALOG_VERSION)[0]
+
+
+def catalog_modified():
+    """Time (aware datetime) the catalog version last moved"""
+    return _state(CATALOG_VERSION)[1]
+
+
+def bump_catalog_version() -> int:
+    """Invalidate every cached result by moving to a new catalog version"""
+    return _bump(CATALOG_VERSION)[0]
+
+
+def bump_catalog_version_on_commit():
+    """
+    bump_catalog_version() once the current transaction commits (at once in
+    autocommit mode); any number of calls in one transaction bump once
+    """
+    _bump_on_commit(CATALOG_VERSION)
+
+
+def brand_version() -> int:
+    """Current version of the brand table, for per-worker brand name maps"""
+    return _state(BRAND_VERSION)[0]
+
+
+def bump_brand_version() -> int:
+    """Make every worker reload its brand name map on next use"""
+    return _bump(BRAND_VERSION)[0]
+
+
+def bump_brand_version_on_commit():
+    """bump_brand_version() once the current transaction commits, like bump_catalog_version_on_commit()"""
+    _bump_on_commit(BRAND_VERSION)
+
+
+def collections_version() -> int:
+    """Current version of the registered-slug map"""
+    return _state(COLLECTIONS_VERSION)[0]
+
+
+def bump_collections_version_on_commit():
+    """Make every worker reload the registered-slug map once the current transaction commits"""
+    _bump_on_commit(COLLECTIONS_VERSION)
+
+
+def collection_version(collection_id: int) -> int:
+    """Current version of one registered collection's membership"""
+    return _state(f'{COLLECTIONS_VERSION}:{collection_id}')[0]
+
+
+def bump_collection_version_on_commit(collection_id: int):
+    """Invalidate one collection's cached pages once the current transaction (its refresh) commits"""
+    _bump_on_commit(f'{COLLECTIONS_VERSION}:{collection_id}')
+
+
+def result_cache_enabled() -> bool:
+    return settings.PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT > 0
+
+
+def result_key(plan) -> str:
+    """Cache key for a plan's results under the current catalog (and collection) version"""
+    digest = hashlib.sha1(repr((plan.where, plan.params, plan.joins, plan.order_by)).encode()).hexdigest()
+    version = catalog_version()
+    if plan.collection_id is not None:
+        version = f'{version}.{collection_version(plan.collection_id)}'
+    return f'{RESULT_KEY_PREFIX}:{version}:{digest}'
+
+
+def get_results(key: str):
+    """Cached (entries, total) for `key`, or None; entries are (id, order key values) pairs"""
+    return cache.get(key)
+
+
+def set_results(key: str, entries: list, total: int):
+    cache.set(key, (entries, total), timeout=settings.PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT)
+
+
+def correction_key(query: str) -> str:
+    """Cache key for a query's spelling correction under the current catalog version"""
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    return f'{CORRECTION_KEY_PREFIX}:{catalog_version()}:{digest}'
+
+
+def get_correction(key: str):
+    """Cached correction for `key`: the corrected query, '' for none, or None when not cached"""
+    return cache.get(key)
+
+
+def set_correction(key: str, corrected: str):
+    cache.set(key, corrected, timeout=settings.PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT)
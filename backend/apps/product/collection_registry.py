@@ -0,0 +1,207 @@
+"""
+Registered collections with materialised membership.
+
+A Collection row registers a slug. refresh_collection() runs the live slug
+search once and stores every match with its position in the default
+(relevance) order in collection_memberships. The Postgres search backend
+then serves /collections/<slug>/ from that table (filters and sorts still
+apply); unregistered slugs keep the live fuzzy search.
+
+Freshness:
+- a committed transaction with catalog writes marks stale only the refreshed
+  collections it could change: those holding a written product and those
+  whose slug search now matches one (signals.py, catalog_changed), and
+  schedules a background refresh after PRODUCT_COLLECTION_REFRESH_DELAY
+  seconds, coalescing bursts of writes (0 leaves refreshing to the job)
+- a refresh moves only that collection's version (cache.py), so cached pages
+  of other collections and searches stay valid
+- the registered-slug map is cached under the collections version, which
+  collection saves, deletes and first refreshes move, and expires after
+  PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT seconds in any case
+- `manage.py refresh_collections --stale` is the scheduled-job equivalent
+- listing fields (price, stock, names) are always read live; only the member
+  set and default order wait for the refresh
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from . import services
+from .cache import bump_collection_version_on_commit, bump_collections_version_on_commit, collections_version
+from .models import Collection, CollectionMembership, Product
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_KEY_PREFIX = 'product:collections'
+
+
+def registered_collections() -> dict:
+    """{slug: collection id} of collections with a materialised membership, cached per collections version"""
+    key = f'{REGISTRY_KEY_PREFIX}:{collections_version()}'
+    registry = cache.get(key)
+    if registry is None:
+        registry = dict(
+            Collection.objects.filter(refreshed_at__isnull=False).values_list('slug', 'id')
+        )
+        cache.set(key, registry, timeout=settings.PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT)
+    return registry
+
+
+def registered_collection_id(slug: str):
+    """Collection id to serve `slug` from, or None for the live search"""
+    return registered_collections().get(slug.lower())
+
+
+def refresh_collection(collection: Collection) -> int:
+    """
+    Re-materialise one collection's members from the live slug search.
+
+    Returns:
+        Number of member products
+    """
+    plan = services.get_collection_search_query(collection.slug)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Clear the flag first: a write committing during the refresh marks it stale again
+        Collection.objects.filter(id=collection.id).update(stale=False)
+        cursor.execute("DELETE FROM collection_memberships WHERE collection_id = %s", [collection.id])
+        cursor.execute(
+            "INSERT INTO collection_memberships (collection_id, product_id, position) "
+            f"SELECT %s, ranked.id, ranked.position FROM ({plan.ranked_ids_sql}) AS ranked",
+            (collection.id,) + plan.params,
+        )
+        count = cursor.rowcount
+        Collection.objects.filter(id=collection.id).update(product_count=count, refreshed_at=timezone.now())
+        # Cached pages of this collection were built from the previous membership
+        bump_collection_version_on_commit(collection.id)
+        if collection.refreshed_at is None:
+            # First refresh: the slug moves from the live search to the membership table
+            bump_collections_version_on_commit()
+    return count
+
+
+def refresh_collections(stale_only: bool = False, slugs=None) -> dict:
+    """
+    Refresh registered collections.
+
+    Args:
+        stale_only: Skip collections not marked stale since their last refresh
+        slugs: Only these slugs (default all)
+
+    Returns:
+        {slug: member count} of the refreshed collections
+    """
+    collections = Collection.objects.all()
+    if stale_only:
+        collections = collections.filter(stale=True)
+    if slugs:
+        collections = collections.filter(slug__in=[slug.lower() for slug in slugs])
+    return {collection.slug: refresh_collection(collection) for collection in collections}
+
+
+class _PendingCatalogWrite:
+    """on_commit callback collecting what one transaction wrote, for a single catalog_changed() call"""
+
+    def __init__(self):
+        self.product_ids = set()
+        self.brand_ids = set()
+        self.collection_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        catalog_changed(self.product_ids, self.brand_ids, self.collection_ids)
+
+
+def record_catalog_write(product_ids=(), brand_ids=(), collection_ids=()):
+    """
+    Note products, brands (all their products) or collections (members of a
+    deleted product) written in the current transaction; catalog_changed()
+    runs once for all of them when it commits (at once in autocommit mode).
+    """
+    pending = None
+    for _savepoints, callback, _robust in connection.run_on_commit:
+        if isinstance(callback, _PendingCatalogWrite) and not callback.done:
+            pending = callback
+            break
+    if pending is None:
+        pending = _PendingCatalogWrite()
+        transaction.on_commit(pending)
+    pending.product_ids.update(product_ids)
+    pending.brand_ids.update(brand_ids)
+    pending.collection_ids.update(collection_ids)
+
+
+def _collections_matching(slugs: dict, product_ids) -> set:
+    """Ids of the collections in `slugs` ({id: slug}) whose live slug search matches any of `product_ids`"""
+    parts, params = [], []
+    for collection_id, slug in slugs.items():
+        plan = services.get_collection_search_query(slug)
+        parts.append(f"SELECT %s WHERE EXISTS ({plan.matching_ids_sql})")
+        params += [collection_id, *plan.params, list(product_ids)]
+    with connection.cursor() as cursor:
+        cursor.execute('\nUNION ALL\n'.join(parts), params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def catalog_changed(product_ids=(), brand_ids=(), collection_ids=()):
+    """
+    Mark stale the refreshed collections a committed catalog write could
+    change, and schedule a refresh: those holding a written product (it may
+    have dropped out or moved) and those whose slug search now matches one.
+
+    Args:
+        product_ids: Products written
+        brand_ids: Brands written (name changes reach every product of the brand)
+        collection_ids: Collections to mark in any case
+    """
+    product_ids = set(product_ids)
+    if brand_ids:
+        product_ids.update(Product.objects.filter(brand_id__in=brand_ids).values_list('id', flat=True))
+    fresh = dict(Collection.objects.filter(stale=False, refreshed_at__isnull=False).values_list('id', 'slug'))
+    affected = set(collection_ids) & fresh.keys()
+    if product_ids and fresh:
+        affected.update(
+            CollectionMembership.objects.filter(collection_id__in=fresh, product_id__in=product_ids)
+            .values_list('collection_id', flat=True)
+        )
+        unaffected = {collection_id: slug for collection_id, slug in fresh.items() if collection_id not in affected}
+        if unaffected:
+            affected |= _collections_matching(unaffected, product_ids)
+    if affected and Collection.objects.filter(id__in=affected, stale=False).update(stale=True):
+        collection_refresher.schedule()
+
+
+class CollectionRefresher:
+    """Runs one delayed background refresh of stale collections per burst of catalog writes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def schedule(self):
+        delay = settings.PRODUCT_COLLECTION_REFRESH_DELAY
+        if delay <= 0:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        try:
+            refresh_collections(stale_only=True)
+        except Exception:
+            logger.exception('Failed to refresh stale collections')
+        finally:
+            connections.close_all()
+
+
+collection_refresher = CollectionRefresher()
@@ -0,0 +1,102 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the catalog endpoints.
+
+Validators are computed without running the endpoint's main query:
+- catalog lists (product_list, hot, new, explore, gift-box) use the
+  catalog version row in cache_versions and the time it last moved
+  (cache.py), one primary-key read shared by every worker, so all workers
+  send the same validators; every committed Product, Brand and ProductTag
+  write moves it. The ETag is weak (the JSON body is not byte-for-byte
+  stable across serializers) and also carries a digest of the normalized
+  query string, so ?sort=... and ?page=... variants never share one
+- product_detail uses the product's updated_at, one primary-key lookup;
+  signals.py touches updated_at when the product's tag, brand or detail
+  pictures change, so it covers everything in the detail payload
+
+Matching If-None-Match / If-Modified-Since requests get a 304 before the view
+runs. Responses (304s included) carry Cache-Control for shared caches: CDNs
+keep them for PRODUCT_HTTP_CACHE_SHARED_MAX_AGE seconds, browsers for
+PRODUCT_HTTP_CACHE_MAX_AGE, then revalidate. They also carry Vary: Accept, as
+DRF renders the same URL as JSON or as the browsable API.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+from .cache import catalog_modified, catalog_version
+from .models import Product
+
+
+def _shared_cache_control(response):
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.PRODUCT_HTTP_CACHE_MAX_AGE,
+        s_maxage=settings.PRODUCT_HTTP_CACHE_SHARED_MAX_AGE,
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def conditional(etag_func, last_modified_func):
+    """
+    Like django.views.decorators.http.condition, and adds the shared-cache
+    Cache-Control and Vary headers to every response, 304s included. Apply
+    above @api_view.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                _shared_cache_control(response)
+            return response
+        return wrapped
+    return decorator
+
+
+def _query_digest(request) -> str:
+    # Parameter order is irrelevant to the views; repeated values keep theirs
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return hashlib.sha1(query.encode()).hexdigest()[:16]
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Weak ETag for a catalog list: the shared catalog version, the time it was
+    reached and the normalized query string
+    """
+    version = f'{catalog_version()}-{int(catalog_modified().timestamp() * 1000)}'
+    return f'W/"catalog-{version}-{_query_digest(request)}"'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return catalog_modified()
+
+
+def _product_updated_at(request, product_id):
+    # The ETag and Last-Modified callbacks share one lookup per request
+    cached = getattr(request, '_product_updated_at', None)
+    if cached is None or cached[0] != product_id:
+        updated_at = Product.objects.filter(id=product_id).values_list('updated_at', flat=True).first()
+        cached = (product_id, updated_at)
+        request._product_updated_at = cached
+    return cached[1]
+
+
+def product_etag(request, product_id, **kwargs):
+    """Strong ETag for a product detail (None for a missing product, so the view can 404)"""
+    updated_at = _product_updated_at(request, product_id)
+    if updated_at is None:
+        return None
+    return f'product-{product_id}-{int(updated_at.timestamp() * 1000000)}'
+
+
+def product_last_modified(request, product_id, **kwargs):
+    return _product_updated_at(request, product_id)
@@ -0,0 +1,116 @@
+"""
+Home page feed: the hot, new, explore and gift-box rails in one payload.
+
+The serialized feed is built once per catalog version and kept in the cache,
+so /api/products/home/ normally costs one read of the shared catalog version
+row (cache.py) and a cache read. Committed Product, Brand and ProductTag
+writes move that version for every worker. The worker that handled the write
+also schedules a background rebuild after PRODUCT_HOME_FEED_REBUILD_DELAY
+seconds (coalescing bursts of writes), so the next visitor does not pay for
+it; other workers (with a per-process cache) build the new feed on their
+first request. The rebuild only runs once a feed has been served; with a
+delay of 0 the first request after a write rebuilds it instead. Feeds also
+expire after PRODUCT_HOME_FEED_CACHE_TIMEOUT seconds, a bound on staleness
+for writes that bypass the signals without bumping the version.
+
+The single-rail endpoints (/hot/, /new/, ...) read the same rail querysets.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import catalog_version
+from .models import ProductListing
+from .serializers import listing_card_rows, serialize_product_rows
+
+logger = logging.getLogger(__name__)
+
+HOME_KEY_PREFIX = 'product:home'
+# Catalog version of the most recently built feed; its presence enables background rebuilds
+HOME_LATEST_KEY = 'product:home-latest'
+
+RAIL_SIZE = 8
+
+
+def hot_listings():
+    """Most hot products ranked by hot_if high to low"""
+    return ProductListing.objects.filter(hot=True).order_by('-hot_if', '-created_at', '-id')[:RAIL_SIZE]
+
+
+def new_listings():
+    """Newest tagged products ranked by new_if high to low"""
+    return ProductListing.objects.filter(new=True).order_by('-new_if', '-created_at', '-id')[:RAIL_SIZE]
+
+
+def explore_listings():
+    """Products most deserving exploration, ranked by rank_if high to low"""
+    return ProductListing.objects.filter(tagged=True).order_by('-rank_if', '-created_at', '-id')[:RAIL_SIZE]
+
+
+def gift_box_listings():
+    """Gift box products ranked by rank_if high to low"""
+    # Stored is_gift_box flag (any type containing 'gift'); read off listings_gift_box_idx
+    return ProductListing.objects.filter(
+        tagged=True,
+        is_gift_box=True
+    ).order_by('-rank_if', '-created_at', '-id')[:RAIL_SIZE]
+
+
+RAILS = (
+    ('hot', hot_listings),
+    ('new', new_listings),
+    ('explore', explore_listings),
+    ('gift_box', gift_box_listings),
+)
+
+
+def build_home_feed() -> dict:
+    """Serialize every rail from the database: {rail name: [product cards]}"""
+    return {name: serialize_product_rows(listing_card_rows(rail())) for name, rail in RAILS}
+
+
+def home_feed() -> dict:
+    """The home feed for the current catalog version, built and cached on a miss"""
+    version = catalog_version()
+    key = f'{HOME_KEY_PREFIX}:{version}'
+    feed = cache.get(key)
+    if feed is None:
+        feed = build_home_feed()
+        cache.set(key, feed, timeout=settings.PRODUCT_HOME_FEED_CACHE_TIMEOUT)
+        cache.set(HOME_LATEST_KEY, version, timeout=settings.PRODUCT_HOME_FEED_CACHE_TIMEOUT)
+    return feed
+
+
+class HomeFeedRebuilder:
+    """Runs one delayed background rebuild of the home feed per burst of catalog writes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def schedule(self):
+        delay = settings.PRODUCT_HOME_FEED_REBUILD_DELAY
+        if delay <= 0 or cache.get(HOME_LATEST_KEY) is None:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        try:
+            home_feed()
+        except Exception:
+            logger.exception('Failed to rebuild the home feed')
+        finally:
+            connections.close_all()
+
+
+home_feed_rebuilder = HomeFeedRebuilder()
@@ -0,0 +1,67 @@
+"""
+Compare the per-row cost of the original list path, ProductListSerializer
+over Product instances (with brand and tag joined in), with the PRODUCT_CARD
+row projection the list endpoints use now.
+
+Both paths serialize the same products (loaded once, outside the timings, so
+database time is excluded) and must produce identical payloads; the command
+fails if they differ. Times are the best of --repeat runs.
+
+Example:
+    python manage.py benchmark_list_serializers --rows 5000 --repeat 5
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.product.models import Product, ProductListing
+from apps.product.serializers import ProductListSerializer, listing_card_rows, serialize_product_rows
+
+
+def best_time(func, repeat):
+    """Fastest of `repeat` calls of `func` in seconds, and its last result"""
+    best, result = None, None
+    for _index in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ProductListSerializer against the PRODUCT_CARD row projection (us/row)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Products to serialize (default 2000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per serializer, best kept (default 5)')
+
+    def handle(self, *args, **options):
+        instances = list(Product.objects.select_related('tag', 'brand').order_by('id')[:options['rows']])
+        if not instances:
+            raise CommandError('The catalog is empty; run `manage.py seed_catalog` first')
+        listings = ProductListing.objects.filter(id__in=[product.id for product in instances]).order_by('id')
+        values = list(listing_card_rows(listings))
+        columns = tuple(values[0])
+        tuples = [tuple(row.values()) for row in values]
+        repeat = max(1, options['repeat'])
+
+        timings = {}
+        timings['ProductListSerializer'], expected = best_time(
+            lambda: [dict(item) for item in ProductListSerializer(instances, many=True).data], repeat,
+        )
+        timings['projection (dicts)'], from_dicts = best_time(lambda: serialize_product_rows(values), repeat)
+        timings['projection (tuples)'], from_tuples = best_time(
+            lambda: serialize_product_rows(tuples, columns), repeat,
+        )
+        if from_dicts != expected or from_tuples != expected:
+            raise CommandError('The projection output differs from ProductListSerializer')
+
+        count = len(instances)
+        self.stdout.write(f'{count} rows, best of {repeat} runs')
+        self.stdout.write(f"{'serializer':<24}{'total ms':>10}{'us/row':>10}{'speedup':>9}")
+        for name, seconds in timings.items():
+            self.stdout.write(
+                f'{name:<24}{seconds * 1000:>10.2f}{seconds / count * 1e6:>10.2f}'
+                f"{timings['ProductListSerializer'] / seconds:>8.1f}x"
+            )
@@ -0,0 +1,229 @@
+"""
+Replay a search/listing query mix against the product endpoints and report
+latency percentiles and database query counts per endpoint.
+
+Requests go through the full Django stack (URL routing, middleware, views,
+serializers) with the test client, against whatever database the settings
+point at - seed one first with `manage.py seed_catalog`. Search terms and
+slugs are sampled from the catalog, including misspellings, so the mix
+exercises FTS, trigram and listing paths.
+
+Example:
+    python manage.py benchmark_search --requests 2000 --json before.json
+    (checkout the next commit)
+    python manage.py benchmark_search --requests 2000 --json after.json --compare before.json
+"""
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from apps.brand.models import Brand
+from apps.product.models import Product
+
+ENDPOINTS = ('search_products', 'search_products_full', 'product_list_by_collection', 'product_list')
+DEFAULT_MIX = 'search_products=40,search_products_full=20,product_list_by_collection=25,product_list=15'
+SORTS = ('COLLECTION_DEFAULT', 'BEST_SELLING', 'CREATED', 'CREATED_REVERSE', 'PRICE', 'PRICE_REVERSE')
+SPECIAL_SLUGS = ('whats-hot', 'new-stuff', 'gifts-under-50', 'gifts-under-100', 'gift-box')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def parse_mix(value):
+    """'name=weight,...' -> {name: weight} over the known endpoints"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(f'Unknown endpoint {name!r} in --mix (choose from {", ".join(ENDPOINTS)})')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Invalid weight for {name!r} in --mix')
+    if not any(weight > 0 for weight in mix.values()):
+        raise CommandError('--mix needs at least one positive weight')
+    return mix
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts statements without capturing SQL"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark search and listing endpoints (p50/p95/p99 latency and query counts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Measured requests (default 500)')
+        parser.add_argument('--warmup', type=int, default=50, help='Unmeasured warm-up requests (default 50)')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Endpoint weights (default {DEFAULT_MIX})')
+        parser.add_argument('--terms', type=int, default=200, help='Distinct search terms sampled from the catalog (default 200)')
+        parser.add_argument('--seed', type=int, default=7, help='Random seed for the request sequence (default 7)')
+        parser.add_argument('--no-cache', action='store_true', help='Disable the search result cache while benchmarking')
+        parser.add_argument('--json', dest='json_path', help='Write the report as JSON to this path')
+        parser.add_argument('--compare', dest='compare_path', help='Previous JSON report to compare against')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        mix = parse_mix(options['mix'])
+        terms = self.sample_terms(options['terms'])
+        if not terms:
+            raise CommandError('The catalog is empty; run `manage.py seed_catalog` first')
+        slugs = self.sample_slugs(terms)
+        requests = [self.make_request(mix, terms, slugs) for _index in range(options['warmup'] + options['requests'])]
+
+        client = Client(HTTP_HOST='localhost')
+        counter = QueryCounter()
+        timings = defaultdict(list)
+        query_counts = defaultdict(list)
+        errors = defaultdict(int)
+        with ExitStack() as stack:
+            if options['no_cache']:
+                stack.enter_context(override_settings(PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT=0))
+            stack.enter_context(connection.execute_wrapper(counter))
+            for index, (endpoint, url) in enumerate(requests):
+                counter.count = 0
+                started = time.perf_counter()
+                response = client.get(url, secure=True)
+                elapsed = (time.perf_counter() - started) * 1000
+                if index < options['warmup']:
+                    continue
+                if response.status_code != 200:
+                    errors[endpoint] += 1
+                timings[endpoint].append(elapsed)
+                query_counts[endpoint].append(counter.count)
+
+        report = self.build_report(timings, query_counts, errors, options)
+        self.print_report(report)
+        if options['compare_path']:
+            self.print_comparison(report, options['compare_path'])
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Report written to {options['json_path']}")
+
+    def sample_terms(self, count):
+        """Brand names, product-name words and types, plus misspelt variants"""
+        names = list(Product.objects.order_by('?').values_list('name', 'type')[:count])
+        brands = list(Brand.objects.order_by('?').values_list('name', flat=True)[:max(1, count // 5)])
+        terms = set(brands)
+        for name, types in names:
+            words = [word for word in name.split() if len(word) > 3]
+            if words:
+                terms.add(self.rng.choice(words).lower())
+                terms.add(' '.join(words[-2:]).lower())
+            if isinstance(types, list):
+                terms.update(t for t in types if isinstance(t, str))
+        terms = sorted(terms)
+        typos = []
+        for term in self.rng.sample(terms, min(len(terms), max(1, count // 5))):
+            if len(term) > 4:
+                position = self.rng.randrange(1, len(term) - 1)
+                typos.append(term[:position] + term[position + 1] + term[position] + term[position + 2:])
+        short = [term[:2] for term in self.rng.sample(terms, min(len(terms), 5))]
+        return terms + typos + short
+
+    def sample_slugs(self, terms):
+        slugs = list(SPECIAL_SLUGS)
+        slugs += [term.lower().replace(' ', '-') for term in self.rng.sample(terms, min(len(terms), 30))]
+        return slugs
+
+    def make_request(self, mix, terms, slugs):
+        endpoint = self.rng.choices(list(mix), weights=list(mix.values()))[0]
+        page = self.rng.choices([1, 2, 3, 10], weights=[70, 15, 10, 5])[0]
+        sort = self.rng.choice(SORTS)
+        if endpoint == 'search_products':
+            return endpoint, f'/api/products/search/?q={quote(self.rng.choice(terms))}&limit=8'
+        if endpoint == 'search_products_full':
+            return endpoint, f'/api/products/search/{quote(self.rng.choice(terms), safe="")}/?page={page}'
+        if endpoint == 'product_list_by_collection':
+            return endpoint, f'/api/products/collections/{quote(self.rng.choice(slugs), safe="")}/?page={page}&sort={sort}'
+        return endpoint, f'/api/products/?page={page}&sort={sort}'
+
+    def build_report(self, timings, query_counts, errors, options):
+        endpoints = {}
+        for endpoint in ENDPOINTS:
+            values = sorted(timings.get(endpoint, []))
+            if not values:
+                continue
+            queries = query_counts[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': errors.get(endpoint, 0),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'mean_ms': round(sum(values) / len(values), 2),
+                'queries_mean': round(sum(queries) / len(queries), 2),
+                'queries_max': max(queries),
+            }
+        return {
+            'commit': self.current_commit(),
+            'products': Product.objects.count(),
+            'requests': options['requests'],
+            'seed': options['seed'],
+            'mix': options['mix'],
+            'result_cache': not options['no_cache'],
+            'endpoints': endpoints,
+        }
+
+    @staticmethod
+    def current_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"Commit {report['commit'] or 'unknown'}, {report['products']} products, "
+            f"{report['requests']} requests, result cache {'on' if report['result_cache'] else 'off'}"
+        )
+        header = f"{'endpoint':<28}{'n':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'mean':>9}{'q/req':>7}{'q max':>7}"
+        self.stdout.write(header)
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<28}{stats['requests']:>6}{stats['errors']:>5}{stats['p50_ms']:>9.2f}"
+                f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['mean_ms']:>9.2f}"
+                f"{stats['queries_mean']:>7.2f}{stats['queries_max']:>7}"
+            )
+
+    def print_comparison(self, report, path):
+        try:
+            with open(path) as handle:
+                previous = json.load(handle)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot read comparison report {path}: {error}')
+        self.stdout.write(f"Change vs {previous.get('commit') or path} (negative is faster)")
+        for endpoint, stats in report['endpoints'].items():
+            before = previous.get('endpoints', {}).get(endpoint)
+            if not before:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                delta = (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                changes.append(f"{key[:3]} {delta:+.1f}%")
+            changes.append(f"queries {stats['queries_mean'] - before['queries_mean']:+.2f}")
+            self.stdout.write(f"{endpoint:<28}{', '.join(changes)}")
@@ -0,0 +1,26 @@
+"""
+Count co-purchases in orders placed since the last run and refresh the
+"bought together" lists of the products involved (see bought_together.py).
+
+Run on a schedule (e.g. hourly); use --full after bulk order imports,
+cancellations that should stop counting, or orders that committed more than
+PRODUCT_BOUGHT_TOGETHER_RESCAN_WINDOW ids below the watermark.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.product.bought_together import mine_bought_together
+
+
+class Command(BaseCommand):
+    help = 'Mine frequently-bought-together product pairs from new orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Discard all counts and re-mine every order')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Orders per cursor fetch and transaction (default 5000)')
+
+    def handle(self, *args, **options):
+        result = mine_bought_together(full=options['full'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {result['orders']} orders, skipped {result['skipped']} (up to #{result['last_order_id']}), "
+            f"refreshed {result['products']} product lists"
+        ))
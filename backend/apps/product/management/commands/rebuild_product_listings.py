@@ -0,0 +1,22 @@
+"""
+Rebuild the denormalised product_listings table from products, brands and product_tags.
+
+Triggers keep the table current on every write; run this after bulk loads
+that bypass triggers (e.g. COPY with session_replication_role = replica) or
+on a schedule as a consistency sweep.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.product.models import Product, ProductListing
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product_listings table (list-card rows for every product)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT rebuild_product_listings()")
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt product listings: {ProductListing.objects.count()} rows for {Product.objects.count()} products'
+        ))
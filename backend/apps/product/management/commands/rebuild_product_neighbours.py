@@ -0,0 +1,26 @@
+"""
+Recompute the content-based "you might like" neighbours of every product.
+
+Run on a schedule (e.g. nightly) and after bulk catalog loads; products added
+since the last run fall back to the type-overlap query.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.product.neighbours import rebuild_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product_neighbours table (top-k similar products per product)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, help='Neighbours per product (default PRODUCT_NEIGHBOURS_K)')
+        parser.add_argument('--block-size', type=int, help='Products per similarity block (default PRODUCT_NEIGHBOURS_BLOCK_SIZE)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_neighbours(k=options['k'], block_size=options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt product neighbours: {written} rows in {time.perf_counter() - started:.1f}s'
+        ))
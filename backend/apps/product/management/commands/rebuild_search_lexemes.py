@@ -0,0 +1,20 @@
+"""
+Rebuild the search_lexemes spelling dictionary from product names, types and brand names.
+
+Triggers add new words as the catalog changes; run this on a schedule (or
+after bulk loads) to recompute word frequencies and drop words that no
+product or brand uses any more.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.product.models import SearchLexeme
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search_lexemes dictionary used for "did you mean" corrections'
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT rebuild_search_lexemes()")
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search lexemes: {SearchLexeme.objects.count()} words'))
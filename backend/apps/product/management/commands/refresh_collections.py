@@ -0,0 +1,24 @@
+"""
+Re-materialise the membership of registered collections.
+
+Catalog writes already schedule a background refresh of stale collections
+(PRODUCT_COLLECTION_REFRESH_DELAY); run this with --stale from a scheduler
+when that is disabled, or without it after registering new collections.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.product.collection_registry import refresh_collections
+
+
+class Command(BaseCommand):
+    help = 'Refresh the materialised members of registered collections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help='Only these collection slugs (default all)')
+        parser.add_argument('--stale', action='store_true', help='Only collections changed since their last refresh')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_collections(stale_only=options['stale'], slugs=options['slugs'])
+        for slug, count in refreshed.items():
+            self.stdout.write(f'{slug}: {count} products')
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {len(refreshed)} collections'))
@@ -0,0 +1,290 @@
+"""
+Generate a synthetic catalog for load testing and benchmarks.
+
+Brands, products (realistic names, descriptions and `type` arrays), detail
+pictures, tags, users, shopping carts and orders are created at a
+configurable scale. Products are streamed in with COPY, tags and picture
+links are generated set-based in SQL, and everything else uses bulk_create,
+so a million products load in minutes rather than hours.
+
+Example:
+    python manage.py seed_catalog --products 100000 --users 5000 --orders 20000
+"""
+import io
+import json
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.brand.models import Brand
+from apps.cart.models import ShoppingCart
+from apps.order.models import Order
+from apps.product.cache import bump_catalog_version
+from apps.product.models import Product, ProductDetailPic
+
+BRAND_FIRST = [
+    'Saltwater', 'Golden', 'Wild', 'Little', 'Old Mill', 'Copper', 'Harbour', 'Paper', 'Honey', 'Bramble',
+    'Northside', 'Kettle', 'Juniper', 'Blue Gum', 'Fern', 'Ironbark', 'Marigold', 'Pepper', 'Sunday', 'Tidal',
+]
+BRAND_SECOND = [
+    'Provisions', 'Pantry', 'Studio', 'Goods', 'Co.', 'Makers', 'Kitchen', 'Supply', 'Workshop', 'Collective',
+    'Trading', 'Press', 'Candle Co.', 'Apothecary', 'Roasters', 'Larder', 'Home', 'Atelier', 'Farm', 'Mercantile',
+]
+ADJECTIVES = [
+    'Smoked', 'Spiced', 'Hand-poured', 'Organic', 'Small-batch', 'Salted', 'Wildflower', 'Roasted', 'Vintage',
+    'Botanical', 'Golden', 'Rustic', 'Sparkling', 'Native', 'Classic', 'Zesty', 'Midnight', 'Coastal', 'Velvet',
+]
+FLAVOURS = [
+    'Chilli', 'Lemon Myrtle', 'Wattleseed', 'Sea Salt', 'Vanilla', 'Caramel', 'Fig', 'Eucalyptus', 'Lavender',
+    'Ginger', 'Macadamia', 'Dark Chocolate', 'Rosemary', 'Blood Orange', 'Cinnamon', 'Honey', 'Peppermint',
+]
+# noun -> product types it is catalogued under
+NOUNS = {
+    'Oil': ['Condiments', 'Pantry'],
+    'Hot Sauce': ['Condiments', 'Pantry'],
+    'Relish': ['Condiments', 'Pantry'],
+    'Jam': ['Pantry', 'Breakfast'],
+    'Granola': ['Pantry', 'Breakfast'],
+    'Tea': ['Drinks', 'Pantry'],
+    'Coffee Beans': ['Drinks', 'Pantry'],
+    'Chocolate Bar': ['Sweets', 'Snacks'],
+    'Fudge': ['Sweets', 'Snacks'],
+    'Crackers': ['Snacks', 'Pantry'],
+    'Candle': ['Homewares', 'Candles'],
+    'Diffuser': ['Homewares', 'Air Freshener'],
+    'Soap': ['Bath & Body'],
+    'Hand Cream': ['Bath & Body'],
+    'Notebook': ['Stationery'],
+    'Greeting Card': ['Stationery', 'Cards'],
+    'Tote Bag': ['Accessories'],
+    'Mug': ['Homewares', 'Kitchen'],
+    'Tea Towel': ['Homewares', 'Kitchen'],
+    'Hamper': ['Gift Box', 'Hampers'],
+}
+EXTRA_TYPES = ['Gift Box', 'Limited Edition', 'Vegan', 'Gluten Free', 'Australian Made', 'Best Seller']
+DESCRIPTIONS = [
+    'A {adjective} {noun} made in small batches by {brand}.',
+    '{brand} blends {flavour} into this {adjective} {noun}, perfect for gifting.',
+    'Our {flavour} {noun} is {adjective} and made with locally sourced ingredients.',
+    'Bring home a {adjective} {noun} with notes of {flavour}.',
+    'Made by hand, this {noun} pairs {flavour} with a {adjective} finish.',
+]
+ORDER_STATUSES = ['pending', 'processing', 'completed', 'completed', 'completed', 'cancelled']
+
+PRODUCT_COLUMNS = (
+    'name', 'brand_id', 'description', 'price', 'profile_pic_link', 'type',
+    'current_stock', 'status', 'created_at', 'updated_at',
+)
+
+
+def _copy_value(value) -> str:
+    """Encode one value for COPY ... FROM STDIN (text format)"""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a synthetic catalog (brands, products, tags, pics, users, carts, orders)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Number of products (default 10000)')
+        parser.add_argument('--brands', type=int, default=None, help='Number of brands (default products / 100)')
+        parser.add_argument('--users', type=int, default=1000, help='Number of users, each with a cart (default 1000)')
+        parser.add_argument('--orders', type=int, default=None, help='Number of orders (default 2 per user)')
+        parser.add_argument('--pics', type=int, default=200, help='Size of the shared detail picture pool (default 200)')
+        parser.add_argument('--tag-ratio', type=float, default=0.3, help='Share of products with a ProductTag (default 0.3)')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per COPY/bulk batch (default 10000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible catalogs (default 42)')
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Skip per-row triggers during the product load (needs superuser) and rebuild '
+                 'search vectors and listings in bulk afterwards',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_catalog requires PostgreSQL (COPY)')
+        if options['products'] < 1:
+            raise CommandError('--products must be at least 1')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.run_id = f"{options['seed']}-{int(time.time())}"
+        product_count = options['products']
+        brand_count = options['brands'] or max(10, product_count // 100)
+        user_count = options['users']
+        order_count = options['orders'] if options['orders'] is not None else user_count * 2
+
+        started = time.monotonic()
+        brand_ids = self._step('brands', self.create_brands, brand_count)
+        pic_ids = self._step('detail pics', self.create_pics, options['pics'])
+        product_ids = self._step('products', self.create_products, product_count, brand_ids, options['fast'])
+        self._step('tags and picture links', self.create_tags_and_links, product_ids, pic_ids, options['tag_ratio'], options['seed'])
+        user_ids = self._step('users and carts', self.create_users, user_count, product_ids)
+        self._step('orders', self.create_orders, order_count, user_ids, product_ids)
+        bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {brand_count} brands, {product_count} products, {user_count} users and '
+            f'{order_count} orders in {time.monotonic() - started:.1f}s'
+        ))
+
+    def _step(self, label, function, *args):
+        started = time.monotonic()
+        result = function(*args)
+        self.stdout.write(f'  {label}: {time.monotonic() - started:.1f}s')
+        return result
+
+    def create_brands(self, count):
+        existing = set(Brand.objects.values_list('name', flat=True))
+        brands = []
+        names = set()
+        while len(brands) < count:
+            name = f'{self.rng.choice(BRAND_FIRST)} {self.rng.choice(BRAND_SECOND)}'
+            if name in existing or name in names:
+                name = f'{name} {len(brands) + 1}-{self.run_id}'
+            names.add(name)
+            brands.append(Brand(name=name, description=f'{name} makes small-batch goods.'))
+        created = Brand.objects.bulk_create(brands, batch_size=self.batch_size)
+        return [(brand.id, brand.name) for brand in created]
+
+    def create_pics(self, count):
+        pics = [
+            ProductDetailPic(
+                small_pic_link=f'https://picsum.photos/seed/{index}/100/100',
+                big_pic_link=f'https://picsum.photos/seed/{index}/700/780',
+                extra_big_pic_link=f'https://picsum.photos/seed/{index}/1400/1560',
+            )
+            for index in range(max(count, 2))
+        ]
+        return [pic.id for pic in ProductDetailPic.objects.bulk_create(pics, batch_size=self.batch_size)]
+
+    def _product_row(self, index, brand_ids, now):
+        brand_id, brand_name = self.rng.choice(brand_ids)
+        noun = self.rng.choice(list(NOUNS))
+        adjective = self.rng.choice(ADJECTIVES)
+        flavour = self.rng.choice(FLAVOURS)
+        types = list(NOUNS[noun])
+        if self.rng.random() < 0.3:
+            types.append(self.rng.choice(EXTRA_TYPES))
+        template = self.rng.choice(DESCRIPTIONS)
+        description = template.format(adjective=adjective.lower(), noun=noun.lower(), flavour=flavour.lower(), brand=brand_name)
+        stock = 0 if self.rng.random() < 0.1 else self.rng.randint(1, 200)
+        created_at = now - timedelta(minutes=self.rng.randint(0, 60 * 24 * 730))
+        return (
+            f'{adjective} {flavour} {noun}',
+            brand_id,
+            description,
+            Decimal(self.rng.randint(300, 25000)) / 100,
+            f'https://picsum.photos/seed/product-{index}/400/400',
+            json.dumps(sorted(set(types))),
+            stock,
+            'available' if stock and self.rng.random() > 0.05 else 'unavailable',
+            created_at.isoformat(),
+            created_at.isoformat(),
+        )
+
+    def create_products(self, count, brand_ids, fast):
+        now = timezone.now()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products")
+            first_id = cursor.fetchone()[0]
+            if fast:
+                # Replica mode skips ordinary triggers (search vector, listings, FK checks) for this transaction
+                cursor.execute("SET LOCAL session_replication_role = replica")
+            copy_sql = f"COPY products ({', '.join(PRODUCT_COLUMNS)}) FROM STDIN"
+            for start in range(0, count, self.batch_size):
+                buffer = io.StringIO()
+                for index in range(start, min(start + self.batch_size, count)):
+                    row = self._product_row(index, brand_ids, now)
+                    buffer.write('\t'.join(_copy_value(value) for value in row) + '\n')
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+            if fast:
+                cursor.execute("SET LOCAL session_replication_role = origin")
+                cursor.execute("""
+                    UPDATE products p
+                    SET search_vector = product_search_document(p.name, b.name, p.description)
+                    FROM brands b
+                    WHERE b.id = p.brand_id AND p.id > %s
+                """, [first_id])
+                cursor.execute("SELECT rebuild_product_listings()")
+            # Exact word frequencies for the spelling dictionary (triggers only add new words)
+            cursor.execute("SELECT rebuild_search_lexemes()")
+            cursor.execute("SELECT id FROM products WHERE id > %s ORDER BY id", [first_id])
+            return [row[0] for row in cursor.fetchall()]
+
+    def create_tags_and_links(self, product_ids, pic_ids, tag_ratio, seed):
+        first_id = product_ids[0]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+            # Row triggers keep product_listings in sync with the new tags
+            cursor.execute("""
+                INSERT INTO product_tags (product_id, new, new_if, hot, hot_if, rank_if)
+                SELECT id, random() < 0.2, round(random()::numeric, 3), random() < 0.2,
+                       round(random()::numeric, 3), round((random() * 10)::numeric, 3)
+                FROM products
+                WHERE id >= %s AND random() < %s
+            """, [first_id, tag_ratio])
+            cursor.execute("""
+                INSERT INTO products_detail_pics (product_id, productdetailpic_id)
+                SELECT p.id, (%s::bigint[])[1 + (p.id + offsets.n) %% %s]
+                FROM products p
+                CROSS JOIN generate_series(0, 1) AS offsets(n)
+                WHERE p.id >= %s
+            """, [pic_ids, len(pic_ids), first_id])
+
+    def _sample_basket(self, product_ids):
+        """{product_id: quantity} for 1-5 random products (cart/order JSON format)"""
+        picked = self.rng.sample(product_ids, min(len(product_ids), self.rng.randint(1, 5)))
+        return {str(product_id): self.rng.randint(1, 3) for product_id in picked}
+
+    def _amount(self, basket, prices):
+        return sum((prices[int(product_id)] * quantity for product_id, quantity in basket.items()), Decimal('0.00'))
+
+    def _prices(self, product_ids):
+        return dict(Product.objects.filter(id__in=product_ids).values_list('id', 'price'))
+
+    def create_users(self, count, product_ids):
+        password = make_password('benchmark-password')
+        users = [
+            User(
+                username=f'bench-{self.run_id}-{index}',
+                email=f'bench-{self.run_id}-{index}@example.com',
+                phone=f'04{self.rng.randint(10000000, 99999999)}',
+                password=password,
+            )
+            for index in range(count)
+        ]
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        carts = []
+        baskets = [self._sample_basket(product_ids) if self.rng.random() < 0.5 else {} for _user in users]
+        prices = self._prices({int(product_id) for basket in baskets for product_id in basket})
+        for user, basket in zip(users, baskets):
+            carts.append(ShoppingCart(owner=user, products=basket, amount=self._amount(basket, prices)))
+        ShoppingCart.objects.bulk_create(carts, batch_size=self.batch_size)
+        return [user.id for user in users]
+
+    def create_orders(self, count, user_ids, product_ids):
+        if not user_ids:
+            return
+        for start in range(0, count, self.batch_size):
+            baskets = [self._sample_basket(product_ids) for _index in range(start, min(start + self.batch_size, count))]
+            prices = self._prices({int(product_id) for basket in baskets for product_id in basket})
+            Order.objects.bulk_create([
+                Order(
+                    owner_id=self.rng.choice(user_ids),
+                    products=basket,
+                    amount=self._amount(basket, prices),
+                    status=self.rng.choice(ORDER_STATUSES),
+                )
+                for basket in baskets
+            ], batch_size=self.batch_size)
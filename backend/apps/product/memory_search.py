@@ -0,0 +1,738 @@
+"""
+In-memory inverted-index search engine behind InMemorySearchBackend.
+
+Each worker keeps every product as a document with weighted fields (name >
+brand = type > description, like the search_vector weights) in an inverted
+index, plus a sorted vocabulary for prefix matching and a trigram index over
+the vocabulary for fuzzy matching. Queries are scored with BM25, blended with
+the listing rank like the PostgreSQL relevance score, then filtered and
+sorted with the same slug, filter and sort semantics as services.py.
+
+The catalog is read through the ORM only, so this backend needs no
+PostgreSQL search features.
+
+Lifecycle (as in autocomplete.py):
+- warm_up() builds the index in a background thread (config/wsgi.py); until
+  it is ready (or after a failed build) InMemorySearchBackend starts another
+  background build and answers through PostgresSearchBackend meanwhile
+- model signals (see signals.py) queue product, brand and tag changes once
+  committed; the next query applies them to a copy of the index and swaps it
+  in, so queries score a snapshot without holding the index lock
+- an index older than PRODUCT_SEARCH_MEMORY_MAX_AGE is rebuilt in the background,
+  which picks up writes handled by other workers
+"""
+import bisect
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from functools import cached_property
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField
+
+from . import services
+from .autocomplete import trigrams
+
+logger = logging.getLogger(__name__)
+
+# Field weights of a document's term frequencies
+FIELD_WEIGHTS = (('name', 3.0), ('brand', 2.0), ('type', 2.0), ('description', 1.0))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Query-term expansion weights: exact term 1.0, vocabulary terms it prefixes,
+# and trigram-similar terms (weighted by their similarity)
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+FUZZY_SIMILARITY = 0.4
+
+# Upper bound on vocabulary terms a single prefix expands to
+PREFIX_EXPANSION_LIMIT = 50
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+# Row columns, in services.BASE_SELECT order
+COLUMNS = (
+    'id', 'name', 'brand', 'price', 'profile_pic_link', 'new', 'hot', 'type', 'current_stock', 'status', 'created_at',
+)
+
+# (document attribute, descending) ORDER BY keys; every order ends with id
+RANK_KEYS = (('rank_if', True), ('created_at', True), ('id', True))
+RELEVANCE_KEYS = (('relevance_score', True),) + RANK_KEYS
+SORT_KEYS = {
+    'BEST_SELLING': RANK_KEYS,
+    'CREATED': (('created_at', False), ('id', False)),
+    'CREATED_REVERSE': (('created_at', True), ('id', True)),
+    'PRICE': (('price', False), ('id', False)),
+    'PRICE_REVERSE': (('price', True), ('id', True)),
+}
+
+_PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'profile_pic_link', 'type', 'current_stock', 'status', 'created_at',
+    'brand_id', 'brand__name', 'tag__id', 'tag__new', 'tag__hot', 'tag__new_if', 'tag__hot_if', 'tag__rank_if',
+)
+
+
+def stem(word: str) -> str:
+    """Fold simple English plurals ('candles' -> 'candle', 'berries' -> 'berry')"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text) -> list:
+    """Lower-cased, plural-folded word tokens"""
+    return [stem(word) for word in _WORD_RE.findall(str(text or '').lower())]
+
+
+def _type_list(value) -> tuple:
+    return tuple(t for t in value if isinstance(t, str)) if isinstance(value, list) else ()
+
+
+class Document:
+    """One product: list-card fields, tag scores and its weighted term frequencies"""
+
+    __slots__ = (
+        'id', 'name', 'brand_id', 'brand', 'price', 'profile_pic_link', 'new', 'hot', 'type', 'current_stock',
+        'status', 'created_at', 'tagged', 'new_if', 'hot_if', 'rank_if', 'text', 'type_names', 'terms', 'length',
+        'words',
+    )
+
+    def __init__(self, row):
+        (self.id, self.name, description, self.price, self.profile_pic_link, product_type, self.current_stock,
+         self.status, self.created_at, self.brand_id, self.brand, tag_id, new, hot, new_if, hot_if, rank_if) = row
+        self.type = product_type
+        self.tagged = tag_id is not None
+        self.new, self.hot = bool(new), bool(hot)
+        self.new_if, self.hot_if, self.rank_if = new_if or 0.0, hot_if or 0.0, rank_if or 0.0
+        self.type_names = tuple(type_name.lower() for type_name in _type_list(product_type))
+
+        fields = {
+            'name': self.name, 'brand': self.brand, 'type': ' '.join(_type_list(product_type)), 'description': description,
+        }
+        # Lower-cased text for substring (ILIKE) matching of 1-2 character queries
+        self.text = ' '.join(str(value or '') for value in fields.values()).lower()
+        self.terms = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[field]):
+                self.terms[token] += weight
+        self.length = sum(self.terms.values())
+        # Unstemmed name/brand/type words: the spelling-correction dictionary
+        self.words = {
+            word for field in ('name', 'brand', 'type')
+            for word in _WORD_RE.findall(fields[field].lower()) if word.isalpha() and len(word) >= 3
+        }
+
+    @property
+    def in_stock(self) -> bool:
+        return self.current_stock > 0 and self.status == 'available'
+
+    def row(self, extra_columns, score) -> tuple:
+        return tuple(getattr(self, column) for column in COLUMNS) + tuple(
+            score if column == 'relevance_score' else getattr(self, column) for column in extra_columns
+        )
+
+
+@dataclass(frozen=True)
+class MemoryPlan:
+    """
+    Structured in-memory query, the counterpart of services.SearchPlan.
+    Immutable and hashable, so results are memoised per plan.
+    """
+    terms: tuple = ()              # query tokens, matched through the inverted index
+    substring: str = ''            # 1-2 character searches: substring match instead
+    match_all: bool = False        # collections without search terms
+    flag: Optional[str] = None     # 'hot' / 'new' collections
+    price_bound: tuple = ()        # ('lt' | 'gt', value) from the slug
+    filter_key: tuple = ()         # services.normalize_filters output
+    order: tuple = RANK_KEYS
+    limit: Optional[int] = None
+
+    @property
+    def order_columns(self) -> tuple:
+        return tuple(attribute for attribute, _descending in self.order)
+
+    @cached_property
+    def order_fields(self) -> tuple:
+        """ProductListing field of each order key (relevance is a float), to convert cursor values"""
+        from .models import ProductListing
+
+        return tuple(
+            FloatField() if attribute == 'relevance_score' else ProductListing._meta.get_field(attribute)
+            for attribute in self.order_columns
+        )
+
+    @cached_property
+    def order_signature(self) -> str:
+        """Cursors are only valid for the same order (shared format with SearchPlan)"""
+        return hashlib.sha1(repr(('memory', self.order)).encode()).hexdigest()[:12]
+
+    def with_limit(self, limit: Optional[int]) -> 'MemoryPlan':
+        return self if limit == self.limit else replace(self, limit=limit)
+
+
+def _sort_value(value, descending):
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return -value if descending else value
+
+
+class _IndexState:
+    """
+    Index contents. A state is only mutated before it is published (rebuild,
+    or a clone in MemorySearchIndex._snapshot), and a clone copies the inner
+    containers it changes first; published states are read without the lock.
+    """
+
+    def __init__(self):
+        self.docs = {}                      # product id -> Document
+        self.postings = defaultdict(dict)   # term -> {product id: weighted tf}
+        self.vocabulary = []                # sorted terms
+        self.grams = defaultdict(set)       # trigram -> {term}
+        self.gram_counts = {}               # term -> number of trigrams
+        self.total_length = 0.0
+        self.brands = {}                    # brand id -> name
+        self.brand_docs = defaultdict(set)  # brand id -> {product id}
+        self.words = Counter()              # correction dictionary word -> documents using it
+        self.word_grams = defaultdict(set)  # trigram -> {word}
+        self._owned = None                  # containers a clone may mutate; None: all (fresh state)
+
+    def clone(self) -> '_IndexState':
+        """
+        Copy for applying changes. Only the top-level tables are copied: the
+        postings and sets inside them (and the vocabulary) stay shared with
+        this state until a change touches them (_own). Documents are never
+        mutated.
+        """
+        state = _IndexState()
+        state.docs = dict(self.docs)
+        state.postings = defaultdict(dict, self.postings)
+        state.vocabulary = self.vocabulary
+        state.grams = defaultdict(set, self.grams)
+        state.gram_counts = dict(self.gram_counts)
+        state.total_length = self.total_length
+        state.brands = dict(self.brands)
+        state.brand_docs = defaultdict(set, self.brand_docs)
+        state.words = Counter(self.words)
+        state.word_grams = defaultdict(set, self.word_grams)
+        state._owned = set()
+        return state
+
+    def _own(self, table, key, factory):
+        """`table[key]`, created or copied (once per clone) so it can be mutated without touching snapshots"""
+        container = table.get(key)
+        if container is None:
+            container = table[key] = factory()
+        elif self._owned is not None and (id(table), key) not in self._owned:
+            container = table[key] = factory(container)
+        if self._owned is not None:
+            self._owned.add((id(table), key))
+        return container
+
+    def _own_vocabulary(self) -> list:
+        if self._owned is not None and 'vocabulary' not in self._owned:
+            self.vocabulary = list(self.vocabulary)
+            self._owned.add('vocabulary')
+        return self.vocabulary
+
+    def _add_term(self, term, bulk):
+        if bulk:
+            self.vocabulary.append(term)
+        else:
+            bisect.insort(self._own_vocabulary(), term)
+        grams = trigrams(term)
+        for gram in grams:
+            self._own(self.grams, gram, set).add(term)
+        self.gram_counts[term] = len(grams)
+
+    def _remove_term(self, term):
+        position = bisect.bisect_left(self.vocabulary, term)
+        if position < len(self.vocabulary) and self.vocabulary[position] == term:
+            del self._own_vocabulary()[position]
+        for gram in trigrams(term):
+            if gram not in self.grams:
+                continue
+            terms = self._own(self.grams, gram, set)
+            terms.discard(term)
+            if not terms:
+                del self.grams[gram]
+        self.gram_counts.pop(term, None)
+
+    def set_product(self, row, bulk=False):
+        document = Document(row)
+        self.remove_product(document.id)
+        self.docs[document.id] = document
+        self.brands[document.brand_id] = document.brand
+        self._own(self.brand_docs, document.brand_id, set).add(document.id)
+        self.total_length += document.length
+        for term, frequency in document.terms.items():
+            if term not in self.postings:
+                self._add_term(term, bulk)
+            self._own(self.postings, term, dict)[document.id] = frequency
+        for word in document.words:
+            self.words[word] += 1
+            if self.words[word] == 1:
+                for gram in trigrams(word):
+                    self._own(self.word_grams, gram, set).add(word)
+
+    def remove_product(self, product_id):
+        document = self.docs.pop(product_id, None)
+        if document is None:
+            return
+        self._own(self.brand_docs, document.brand_id, set).discard(product_id)
+        self.total_length -= document.length
+        for term in document.terms:
+            if term not in self.postings:
+                continue
+            postings = self._own(self.postings, term, dict)
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[term]
+                self._remove_term(term)
+        for word in document.words:
+            self.words[word] -= 1
+            if self.words[word] <= 0:
+                del self.words[word]
+                for gram in trigrams(word):
+                    if gram not in self.word_grams:
+                        continue
+                    words = self._own(self.word_grams, gram, set)
+                    words.discard(word)
+                    if not words:
+                        del self.word_grams[gram]
+
+    def set_brand(self, brand_id, name):
+        self.brands[brand_id] = name
+
+    def remove_brand(self, brand_id):
+        self.brands.pop(brand_id, None)
+        for product_id in list(self.brand_docs.pop(brand_id, ())):
+            self.remove_product(product_id)
+
+    # Matching and scoring
+
+    @staticmethod
+    def _similar(query_grams, candidates_by_gram, gram_counts):
+        """{candidate: pg_trgm-style similarity} for candidates sharing a trigram with the query"""
+        shared = Counter()
+        for gram in query_grams:
+            for candidate in candidates_by_gram.get(gram, ()):
+                shared[candidate] += 1
+        return {
+            candidate: common / (len(query_grams) + gram_counts(candidate) - common)
+            for candidate, common in shared.items()
+        }
+
+    def expand(self, term) -> dict:
+        """{vocabulary term: weight} a query token matches"""
+        expansions = {}
+        if term in self.postings:
+            expansions[term] = 1.0
+        position = bisect.bisect_left(self.vocabulary, term)
+        for candidate in self.vocabulary[position:position + PREFIX_EXPANSION_LIMIT]:
+            if not candidate.startswith(term):
+                break
+            expansions.setdefault(candidate, PREFIX_WEIGHT)
+        if len(term) > 2:
+            similar = self._similar(trigrams(term), self.grams, self.gram_counts.__getitem__)
+            for candidate, similarity in similar.items():
+                if similarity >= FUZZY_SIMILARITY and FUZZY_WEIGHT * similarity > expansions.get(candidate, 0.0):
+                    expansions[candidate] = FUZZY_WEIGHT * similarity
+        return expansions
+
+    def score(self, terms) -> dict:
+        """BM25 score per matching product id (a document matches any query term)"""
+        count = len(self.docs)
+        average_length = self.total_length / count if count else 1.0
+        scores = defaultdict(float)
+        for term in dict.fromkeys(terms):
+            best = {}
+            for candidate, weight in self.expand(term).items():
+                postings = self.postings[candidate]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for product_id, frequency in postings.items():
+                    length = self.docs[product_id].length
+                    value = weight * idf * frequency * (K1 + 1) / (
+                        frequency + K1 * (1 - B + B * length / average_length)
+                    )
+                    if value > best.get(product_id, 0.0):
+                        best[product_id] = value
+            for product_id, value in best.items():
+                scores[product_id] += value
+        return scores
+
+    def matches(self, plan: MemoryPlan) -> dict:
+        """{product id: relevance score} of documents matching `plan` before filters"""
+        if plan.flag:
+            return {product_id: 0.0 for product_id, document in self.docs.items() if getattr(document, plan.flag)}
+        if plan.match_all:
+            return dict.fromkeys(self.docs, 0.0)
+        if plan.substring:
+            return {
+                product_id: 0.0 for product_id, document in self.docs.items() if plan.substring in document.text
+            }
+        if not plan.terms:
+            return {}
+        # Same shape as the PostgreSQL score: normalised text score + weighted listing rank
+        relevance = {}
+        for product_id, value in self.score(plan.terms).items():
+            rank = max(self.docs[product_id].rank_if, 0)
+            relevance[product_id] = value / (value + 1) + services.RANK_WEIGHT * rank / (rank + 1)
+        return relevance
+
+    @staticmethod
+    def accepts(document, plan: MemoryPlan) -> bool:
+        """Slug price bound and query-parameter filters (services._filter_conditions semantics)"""
+        if plan.price_bound:
+            operator, value = plan.price_bound
+            if (operator == 'lt' and not document.price < value) or (operator == 'gt' and not document.price > value):
+                return False
+        if not plan.filter_key:
+            return True
+        available, min_price, max_price, product_types, brand_ids = plan.filter_key
+        if available is not None and document.in_stock != available:
+            return False
+        if min_price is not None and document.price < min_price:
+            return False
+        if max_price is not None and document.price > max_price:
+            return False
+        # Each requested fragment is matched within one type name, like TYPE_MATCH_SQL's ILIKE
+        if product_types and not any(
+            fragment.lower() in type_name for fragment in product_types for type_name in document.type_names
+        ):
+            return False
+        if brand_ids is not None and document.brand_id not in brand_ids:
+            return False
+        return True
+
+    def results(self, plan: MemoryPlan) -> tuple:
+        """Ordered (documents, relevance scores, sort keys) of every match"""
+        entries = []
+        for product_id, relevance in self.matches(plan).items():
+            document = self.docs[product_id]
+            if not self.accepts(document, plan):
+                continue
+            key = tuple(
+                _sort_value(relevance if attribute == 'relevance_score' else getattr(document, attribute), descending)
+                for attribute, descending in plan.order
+            )
+            entries.append((key, document, relevance))
+        entries.sort(key=lambda entry: entry[0])
+        return (
+            [entry[1] for entry in entries], [entry[2] for entry in entries], [entry[0] for entry in entries],
+        )
+
+    def correct(self, words, threshold) -> dict:
+        """{misspelled word: closest dictionary word} for words the index does not know"""
+        corrections = {}
+        for word in words:
+            if stem(word) in self.postings:
+                continue
+            similar = self._similar(trigrams(word), self.word_grams, lambda candidate: len(trigrams(candidate)))
+            ranked = sorted(
+                (candidate for candidate, similarity in similar.items() if similarity >= threshold),
+                key=lambda candidate: (-similar[candidate], -self.words[candidate], candidate),
+            )
+            if ranked:
+                corrections[word] = ranked[0]
+        return corrections
+
+
+class MemorySearchIndex:
+    """Per-worker search index over the product catalog"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state = None
+        self._changes = []              # committed changes not yet applied to _state
+        self._pending = None
+        self._building = False
+        self._generation = 0
+        self._results = OrderedDict()   # plan -> (generation, documents, scores, keys)
+        self._ready = threading.Event()
+        self.built_at = None
+
+    @property
+    def is_warm(self):
+        return self._state is not None
+
+    # Plans
+
+    def search_plan(self, query: str, limit: int = None) -> MemoryPlan:
+        search_text = ' '.join((query or '').split()).lower()
+        if not search_text:
+            return MemoryPlan(limit=limit)
+        if len(search_text) <= 2:
+            # Like the SQL plan: substring match, listing-rank order
+            return MemoryPlan(substring=search_text, limit=limit)
+        return MemoryPlan(terms=tuple(tokenize(search_text)), order=RELEVANCE_KEYS, limit=limit)
+
+    def collection_plan(self, slug: str, filters: dict = None, sort: str = None) -> MemoryPlan:
+        slug_lower = slug.lower()
+        filter_key = services.normalize_filters(filters)
+        if slug_lower in ('whats-hot', 'new-stuff'):
+            flag = 'hot' if slug_lower == 'whats-hot' else 'new'
+            order = ((f'{flag}_if', True),) + RANK_KEYS[1:]
+            return MemoryPlan(flag=flag, filter_key=filter_key, order=SORT_KEYS.get(sort, order))
+        search_terms, price_value, price_operator = services.parse_slug(slug_lower)
+        price_bound = (price_operator, price_value) if price_value is not None and price_operator else ()
+        if search_terms:
+            return MemoryPlan(
+                terms=tuple(tokenize(' '.join(search_terms))), price_bound=price_bound, filter_key=filter_key,
+                order=SORT_KEYS.get(sort, RELEVANCE_KEYS),
+            )
+        return MemoryPlan(
+            match_all=True, price_bound=price_bound, filter_key=filter_key, order=SORT_KEYS.get(sort, RANK_KEYS),
+        )
+
+    # Fetching
+
+    def _state_for_query(self):
+        if self._state is None:
+            # Only after reset() between planning and fetching: callers check is_warm first
+            self.rebuild()
+            self._ready.wait(timeout=settings.PRODUCT_SEARCH_MEMORY_MAX_AGE)
+            if self._state is None:
+                raise RuntimeError('The in-memory search index could not be built')
+        elif self.built_at is not None and time.monotonic() - self.built_at > settings.PRODUCT_SEARCH_MEMORY_MAX_AGE:
+            self.warm_up()
+        return self._state
+
+    def _snapshot(self) -> tuple:
+        """
+        (state, generation) to run a query against without holding the lock.
+        Queued changes are applied to a clone, which then replaces the state;
+        the clone copies the top-level tables once per burst of writes, and
+        only the postings and trigram sets the changes touch.
+        """
+        self._state_for_query()
+        with self._lock:
+            if self._changes:
+                state = self._state.clone()
+                for operation, args in self._changes:
+                    getattr(state, operation)(*args)
+                self._state = state
+                self._changes = []
+            return self._state, self._generation
+
+    def _matched(self, plan: MemoryPlan) -> tuple:
+        """(documents, scores, keys) for `plan` regardless of limit, memoised until the index changes"""
+        plan = plan.with_limit(None)
+        state, generation = self._snapshot()
+        with self._lock:
+            cached = self._results.get(plan)
+            if cached is not None and cached[0] == generation:
+                self._results.move_to_end(plan)
+                return cached[1:]
+        # Scored outside the lock: other searches in this worker run meanwhile
+        documents, scores, keys = state.results(plan)
+        with self._lock:
+            self._results[plan] = (generation, documents, scores, keys)
+            self._results.move_to_end(plan)
+            while len(self._results) > settings.PRODUCT_SEARCH_PLAN_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return documents, scores, keys
+
+    @staticmethod
+    def _rows(plan: MemoryPlan, documents, scores) -> tuple:
+        extra = tuple(column for column in plan.order_columns if column not in COLUMNS)
+        rows = [document.row(extra, score) for document, score in zip(documents, scores)]
+        return list(COLUMNS + extra), rows
+
+    def fetch_rows(self, plan: MemoryPlan) -> tuple:
+        documents, scores, _keys = self._matched(plan)
+        if plan.limit is not None:
+            documents, scores = documents[:plan.limit], scores[:plan.limit]
+        return self._rows(plan, documents, scores)
+
+    def fetch_page(self, plan: MemoryPlan, page_size: int, offset: int, count_mode: str) -> tuple:
+        documents, scores, _keys = self._matched(plan)
+        columns, rows = self._rows(plan, documents[offset:offset + page_size], scores[offset:offset + page_size])
+        total = len(documents)
+        if count_mode == services.COUNT_CAPPED:
+            cap = settings.PRODUCT_SEARCH_COUNT_CAP
+            return columns, rows, min(total, cap), total > cap
+        return columns, rows, total, False
+
+    def fetch_keyset_page(self, plan: MemoryPlan, page_size: int, after: tuple) -> tuple:
+        documents, scores, keys = self._matched(plan)
+        try:
+            position = bisect.bisect_right(keys, tuple(
+                _sort_value(value, descending) for value, (_attribute, descending) in zip(after, plan.order)
+            ))
+        except TypeError:
+            # Cursor values of the wrong type for this order
+            return self._rows(plan, [], []) + (False,)
+        end = position + page_size
+        columns, rows = self._rows(plan, documents[position:end], scores[position:end])
+        return columns, rows, end < len(documents)
+
+    def fetch_facets(self, plan: MemoryPlan, buckets: int) -> dict:
+        """Same shape as services.fetch_facets"""
+        documents, _scores, _keys = self._matched(plan)
+        brands = Counter(document.brand for document in documents if document.brand is not None)
+        types = Counter(t for document in documents for t in set(_type_list(document.type)))
+        in_stock = sum(1 for document in documents if document.in_stock)
+        prices = [document.price for document in documents]
+        min_price, max_price = (min(prices), max(prices)) if prices else (None, None)
+        counts = Counter()
+        for price in prices:
+            if min_price == max_price:
+                counts[1] += 1
+            else:
+                counts[min(int((price - min_price) / (max_price - min_price) * buckets) + 1, buckets)] += 1
+
+        def most_common(counter):
+            return sorted(counter.items(), key=lambda item: (-item[1], item[0] or ''))
+
+        return {
+            'brand': most_common(brands),
+            'type': most_common(types),
+            'availability': {'in_stock': in_stock, 'out_of_stock': len(documents) - in_stock},
+            'price': {
+                'min': min_price, 'max': max_price,
+                'histogram': services.price_histogram(min_price, max_price, counts, buckets) if prices else [],
+            },
+        }
+
+    def correct_query(self, query: str) -> Optional[str]:
+        """Same contract as services.correct_query, against the index vocabulary"""
+        words = (query or '').lower().split()
+        checked = {word for word in words if word.isalpha() and len(word) >= 3}
+        if not checked:
+            return None
+        state, _generation = self._snapshot()
+        corrections = state.correct(checked, settings.PRODUCT_SEARCH_CORRECTION_SIMILARITY)
+        corrected_words = [corrections.get(word, word) for word in words]
+        return ' '.join(corrected_words) if corrected_words != words else None
+
+    def brand_suggestions(self, query: str, limit: int) -> list:
+        """Brand names containing `query`, for when the autocomplete index is cold"""
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        state, _generation = self._snapshot()
+        names = {name for name in state.brands.values() if name and needle in name.lower()}
+        return sorted(names)[:limit]
+
+    # Lifecycle
+
+    @staticmethod
+    def _product_rows(**filters):
+        from .models import Product
+        return Product.objects.filter(**filters).order_by().values_list(*_PRODUCT_FIELDS)
+
+    def rebuild(self):
+        """Build a fresh index from the database and swap it in"""
+        from apps.brand.models import Brand
+
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._pending = []
+        try:
+            state = _IndexState()
+            for brand_id, name in Brand.objects.values_list('id', 'name').iterator(chunk_size=2000):
+                state.set_brand(brand_id, name)
+            for row in self._product_rows().iterator(chunk_size=2000):
+                state.set_product(row, bulk=True)
+            state.vocabulary.sort()
+            with self._lock:
+                # Replay changes committed while the snapshot was being read
+                for operation, args in self._pending:
+                    getattr(state, operation)(*args)
+                self._state = state
+                # Queued changes were committed before the snapshot was read, or replayed above
+                self._changes = []
+                self._generation += 1
+                self.built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._building = False
+                self._pending = None
+            # Wake queries waiting for the first build (also when it failed)
+            self._ready.set()
+
+    def warm_up(self):
+        """Rebuild the index in a background daemon thread"""
+        with self._lock:
+            if self._building:
+                return
+        thread = threading.Thread(target=self._rebuild_in_background, name='memory-search-build', daemon=True)
+        thread.start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Failed to build the in-memory search index')
+        finally:
+            connections.close_all()
+
+    def reset(self):
+        """Drop the index (the next query rebuilds it)"""
+        with self._lock:
+            self._state = None
+            self._changes = []
+            self._results.clear()
+            self._ready.clear()
+            self.built_at = None
+
+    def _apply(self, operation, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((operation, args))
+            if self._state is not None:
+                # Applied to a copy of the index by the next query (_snapshot)
+                self._changes.append((operation, args))
+                self._generation += 1
+
+    def _tracking(self) -> bool:
+        return self._state is not None or self._building
+
+    def product_changed(self, product_id):
+        """Re-read one product (its row, brand name and tag) after a committed write"""
+        if not self._tracking():
+            return
+        rows = list(self._product_rows(id=product_id))
+        if rows:
+            self._apply('set_product', rows[0])
+        else:
+            self._apply('remove_product', product_id)
+
+    def product_deleted(self, product_id):
+        if self._tracking():
+            self._apply('remove_product', product_id)
+
+    def brand_changed(self, brand_id):
+        """Re-read a brand's products after a rename"""
+        if not self._tracking():
+            return
+        from apps.brand.models import Brand
+        name = Brand.objects.filter(id=brand_id).values_list('name', flat=True).first()
+        if name is None:
+            self._apply('remove_brand', brand_id)
+            return
+        self._apply('set_brand', brand_id, name)
+        for row in self._product_rows(brand_id=brand_id):
+            self._apply('set_product', row)
+
+    def brand_deleted(self, brand_id):
+        if self._tracking():
+            self._apply('remove_brand', brand_id)
+
+
+memory_index = MemorySearchIndex()
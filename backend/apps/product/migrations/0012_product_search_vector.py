@@ -0,0 +1,77 @@
+# Generated manually to add a stored, weighted full-text search vector
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0011_enable_pg_trgm'),
+        ('brand', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Weighted FTS document (name > brand > description), maintained by a database trigger', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_search_vector_gin'),
+        ),
+        migrations.RunSQL(
+            # Weighted document: product name (A) > brand name (B) > description (C)
+            sql="""
+                CREATE OR REPLACE FUNCTION product_search_document(p_name text, p_brand text, p_description text)
+                RETURNS tsvector AS $$
+                    SELECT setweight(to_tsvector('english', COALESCE(p_name, '')), 'A')
+                        || setweight(to_tsvector('english', COALESCE(p_brand, '')), 'B')
+                        || setweight(to_tsvector('english', COALESCE(p_description, '')), 'C');
+                $$ LANGUAGE sql IMMUTABLE;
+
+                CREATE OR REPLACE FUNCTION products_search_vector_trigger() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector := product_search_document(
+                        NEW.name,
+                        (SELECT b.name FROM brands b WHERE b.id = NEW.brand_id),
+                        NEW.description
+                    );
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER products_search_vector_update
+                    BEFORE INSERT OR UPDATE OF name, description, brand_id ON products
+                    FOR EACH ROW EXECUTE FUNCTION products_search_vector_trigger();
+
+                CREATE OR REPLACE FUNCTION brands_search_vector_trigger() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE products
+                    SET search_vector = product_search_document(name, NEW.name, description)
+                    WHERE brand_id = NEW.id;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER brands_search_vector_update
+                    AFTER UPDATE OF name ON brands
+                    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+                    EXECUTE FUNCTION brands_search_vector_trigger();
+
+                UPDATE products p
+                SET search_vector = product_search_document(p.name, b.name, p.description)
+                FROM brands b
+                WHERE b.id = p.brand_id;
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS brands_search_vector_update ON brands;
+                DROP TRIGGER IF EXISTS products_search_vector_update ON products;
+                DROP FUNCTION IF EXISTS brands_search_vector_trigger();
+                DROP FUNCTION IF EXISTS products_search_vector_trigger();
+                DROP FUNCTION IF EXISTS product_search_document(text, text, text);
+            """,
+        ),
+    ]
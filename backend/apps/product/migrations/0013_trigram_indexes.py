@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:47
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brand', '0002_trigram_indexes'),
+        ('product', '0012_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='products_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['description'], name='products_description_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(
+            # Expression index for the `p.type::text ILIKE` search predicate
+            sql="CREATE INDEX IF NOT EXISTS products_type_trgm ON products USING gin ((type::text) gin_trgm_ops);",
+            reverse_sql="DROP INDEX IF EXISTS products_type_trgm;",
+        ),
+    ]
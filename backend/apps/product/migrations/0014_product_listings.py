@@ -0,0 +1,153 @@
+# Generated manually to add the trigger-maintained product_listings table
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0013_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Product ID', primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('brand_id', models.BigIntegerField()),
+                ('brand_name', models.CharField(max_length=200)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('profile_pic_link', models.URLField(max_length=500)),
+                ('type', models.JSONField(default=list)),
+                ('current_stock', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('tagged', models.BooleanField(default=False, help_text='Whether the product has a ProductTag')),
+                ('new', models.BooleanField(default=False)),
+                ('hot', models.BooleanField(default=False)),
+                ('new_if', models.FloatField(default=0.0)),
+                ('hot_if', models.FloatField(default=0.0)),
+                ('rank_if', models.FloatField(default=0.0, help_text='Tag rank_if, 0 for untagged products')),
+            ],
+            options={
+                'db_table': 'product_listings',
+                'indexes': [models.Index(models.OrderBy(models.F('rank_if'), descending=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), name='listings_rank_idx'), models.Index(models.OrderBy(models.F('hot_if'), descending=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), condition=models.Q(('hot', True)), name='listings_hot_idx'), models.Index(models.OrderBy(models.F('new_if'), descending=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), condition=models.Q(('new', True)), name='listings_new_idx'), models.Index(fields=['price', 'id'], name='listings_price_idx'), models.Index(fields=['created_at', 'id'], name='listings_created_idx'), models.Index(models.F('brand_id'), models.OrderBy(models.F('rank_if'), descending=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), name='listings_brand_rank_idx'), django.contrib.postgres.indexes.GinIndex(fields=['type'], name='listings_type_gin', opclasses=['jsonb_path_ops'])],
+            },
+        ),
+        migrations.RunSQL(
+            # Upsert (or drop) the listing row of one product from products, brands and product_tags
+            sql="""
+                CREATE OR REPLACE FUNCTION refresh_product_listing(p_product_id bigint) RETURNS void AS $$
+                BEGIN
+                    INSERT INTO product_listings (
+                        id, name, brand_id, brand_name, price, profile_pic_link, type, current_stock,
+                        status, created_at, tagged, new, hot, new_if, hot_if, rank_if
+                    )
+                    SELECT p.id, p.name, p.brand_id, b.name, p.price, p.profile_pic_link, p.type, p.current_stock,
+                           p.status, p.created_at, pt.id IS NOT NULL,
+                           COALESCE(pt.new, FALSE), COALESCE(pt.hot, FALSE),
+                           COALESCE(pt.new_if, 0), COALESCE(pt.hot_if, 0), COALESCE(pt.rank_if, 0)
+                    FROM products p
+                    JOIN brands b ON b.id = p.brand_id
+                    LEFT JOIN product_tags pt ON pt.product_id = p.id
+                    WHERE p.id = p_product_id
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = EXCLUDED.name, brand_id = EXCLUDED.brand_id, brand_name = EXCLUDED.brand_name,
+                        price = EXCLUDED.price, profile_pic_link = EXCLUDED.profile_pic_link,
+                        type = EXCLUDED.type, current_stock = EXCLUDED.current_stock,
+                        status = EXCLUDED.status, created_at = EXCLUDED.created_at,
+                        tagged = EXCLUDED.tagged, new = EXCLUDED.new, hot = EXCLUDED.hot,
+                        new_if = EXCLUDED.new_if, hot_if = EXCLUDED.hot_if, rank_if = EXCLUDED.rank_if;
+                    IF NOT FOUND THEN
+                        DELETE FROM product_listings WHERE id = p_product_id;
+                    END IF;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE OR REPLACE FUNCTION products_listing_trigger() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'DELETE' THEN
+                        DELETE FROM product_listings WHERE id = OLD.id;
+                    ELSE
+                        PERFORM refresh_product_listing(NEW.id);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER products_listing_update
+                    AFTER INSERT OR DELETE OR UPDATE OF
+                        name, brand_id, price, profile_pic_link, type, current_stock, status, created_at
+                    ON products
+                    FOR EACH ROW EXECUTE FUNCTION products_listing_trigger();
+
+                CREATE OR REPLACE FUNCTION product_tags_listing_trigger() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        PERFORM refresh_product_listing(OLD.product_id);
+                    END IF;
+                    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.product_id <> OLD.product_id) THEN
+                        PERFORM refresh_product_listing(NEW.product_id);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER product_tags_listing_update
+                    AFTER INSERT OR UPDATE OR DELETE ON product_tags
+                    FOR EACH ROW EXECUTE FUNCTION product_tags_listing_trigger();
+
+                CREATE OR REPLACE FUNCTION brands_listing_trigger() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE product_listings SET brand_name = NEW.name WHERE brand_id = NEW.id;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER brands_listing_update
+                    AFTER UPDATE OF name ON brands
+                    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+                    EXECUTE FUNCTION brands_listing_trigger();
+
+                -- Full rebuild (backfill, and `manage.py rebuild_product_listings`)
+                CREATE OR REPLACE FUNCTION rebuild_product_listings() RETURNS void AS $$
+                BEGIN
+                    DELETE FROM product_listings l WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.id = l.id);
+                    INSERT INTO product_listings (
+                        id, name, brand_id, brand_name, price, profile_pic_link, type, current_stock,
+                        status, created_at, tagged, new, hot, new_if, hot_if, rank_if
+                    )
+                    SELECT p.id, p.name, p.brand_id, b.name, p.price, p.profile_pic_link, p.type, p.current_stock,
+                           p.status, p.created_at, pt.id IS NOT NULL,
+                           COALESCE(pt.new, FALSE), COALESCE(pt.hot, FALSE),
+                           COALESCE(pt.new_if, 0), COALESCE(pt.hot_if, 0), COALESCE(pt.rank_if, 0)
+                    FROM products p
+                    JOIN brands b ON b.id = p.brand_id
+                    LEFT JOIN product_tags pt ON pt.product_id = p.id
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = EXCLUDED.name, brand_id = EXCLUDED.brand_id, brand_name = EXCLUDED.brand_name,
+                        price = EXCLUDED.price, profile_pic_link = EXCLUDED.profile_pic_link,
+                        type = EXCLUDED.type, current_stock = EXCLUDED.current_stock,
+                        status = EXCLUDED.status, created_at = EXCLUDED.created_at,
+                        tagged = EXCLUDED.tagged, new = EXCLUDED.new, hot = EXCLUDED.hot,
+                        new_if = EXCLUDED.new_if, hot_if = EXCLUDED.hot_if, rank_if = EXCLUDED.rank_if
+                    WHERE (product_listings.*) IS DISTINCT FROM (EXCLUDED.*);
+                END;
+                $$ LANGUAGE plpgsql;
+
+                SELECT rebuild_product_listings();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS brands_listing_update ON brands;
+                DROP TRIGGER IF EXISTS product_tags_listing_update ON product_tags;
+                DROP TRIGGER IF EXISTS products_listing_update ON products;
+                DROP FUNCTION IF EXISTS rebuild_product_listings();
+                DROP FUNCTION IF EXISTS brands_listing_trigger();
+                DROP FUNCTION IF EXISTS product_tags_listing_trigger();
+                DROP FUNCTION IF EXISTS products_listing_trigger();
+                DROP FUNCTION IF EXISTS refresh_product_listing(bigint);
+            """,
+        ),
+    ]
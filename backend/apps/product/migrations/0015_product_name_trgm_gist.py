@@ -0,0 +1,18 @@
+# Generated manually to add a GiST trigram index for nearest-name (KNN) search candidates
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_product_listings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['name'], name='products_name_trgm_gist', opclasses=['gist_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated manually to add the trigger-maintained search_lexemes dictionary for spelling correction
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0015_product_name_trgm_gist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchLexeme',
+            fields=[
+                ('word', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('frequency', models.PositiveIntegerField(default=1, help_text='Number of products/brands using the word')),
+            ],
+            options={
+                'db_table': 'search_lexemes',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['word'], name='search_lexemes_word_trgm', opclasses=['gin_trgm_ops'])],
+            },
+        ),
+        migrations.RunSQL(
+            # Words are unstemmed ('simple' config) so corrections are real words
+            sql="""
+                CREATE OR REPLACE FUNCTION product_lexeme_document(p_name text, p_type jsonb) RETURNS text AS $$
+                    SELECT COALESCE(p_name, '') || ' ' || COALESCE((
+                        SELECT string_agg(value, ' ')
+                        FROM jsonb_array_elements_text(CASE WHEN jsonb_typeof(p_type) = 'array' THEN p_type ELSE '[]'::jsonb END)
+                    ), '');
+                $$ LANGUAGE sql IMMUTABLE;
+
+                CREATE OR REPLACE FUNCTION search_lexeme_words(p_document text) RETURNS SETOF text AS $$
+                    SELECT word
+                    FROM unnest(tsvector_to_array(to_tsvector('simple', p_document))) AS word
+                    WHERE word ~ '^[[:alpha:]]{3,}$' AND length(word) <= 100;
+                $$ LANGUAGE sql IMMUTABLE;
+
+                CREATE OR REPLACE FUNCTION add_search_lexemes(p_document text) RETURNS void AS $$
+                    INSERT INTO search_lexemes (word, frequency)
+                    SELECT word, 1 FROM search_lexeme_words(p_document) AS word
+                    ON CONFLICT (word) DO NOTHING;
+                $$ LANGUAGE sql;
+
+                CREATE OR REPLACE FUNCTION products_lexemes_trigger() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM add_search_lexemes(product_lexeme_document(NEW.name, NEW.type));
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER products_lexemes_update
+                    AFTER INSERT OR UPDATE OF name, type ON products
+                    FOR EACH ROW EXECUTE FUNCTION products_lexemes_trigger();
+
+                CREATE OR REPLACE FUNCTION brands_lexemes_trigger() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM add_search_lexemes(NEW.name);
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER brands_lexemes_update
+                    AFTER INSERT OR UPDATE OF name ON brands
+                    FOR EACH ROW EXECUTE FUNCTION brands_lexemes_trigger();
+
+                -- Exact frequencies (documents containing the word) via ts_stat; drops stale words
+                CREATE OR REPLACE FUNCTION rebuild_search_lexemes() RETURNS void AS $$
+                BEGIN
+                    DELETE FROM search_lexemes;
+                    INSERT INTO search_lexemes (word, frequency)
+                    SELECT word, ndoc
+                    FROM ts_stat($stat$
+                        SELECT to_tsvector('simple', product_lexeme_document(name, type)) FROM products
+                        UNION ALL
+                        SELECT to_tsvector('simple', name) FROM brands
+                    $stat$)
+                    WHERE word ~ '^[[:alpha:]]{3,}$' AND length(word) <= 100;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                SELECT rebuild_search_lexemes();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS brands_lexemes_update ON brands;
+                DROP TRIGGER IF EXISTS products_lexemes_update ON products;
+                DROP FUNCTION IF EXISTS rebuild_search_lexemes();
+                DROP FUNCTION IF EXISTS brands_lexemes_trigger();
+                DROP FUNCTION IF EXISTS products_lexemes_trigger();
+                DROP FUNCTION IF EXISTS add_search_lexemes(text);
+                DROP FUNCTION IF EXISTS search_lexeme_words(text);
+                DROP FUNCTION IF EXISTS product_lexeme_document(text, jsonb);
+            """,
+        ),
+    ]
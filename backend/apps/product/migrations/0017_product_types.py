@@ -0,0 +1,129 @@
+# Generated manually to intern product types and index them as product_listings.type_ids
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+LISTING_COLUMNS = """id, name, brand_id, brand_name, price, profile_pic_link, type, {type_ids}current_stock,
+                        status, created_at, tagged, new, hot, new_if, hot_if, rank_if"""
+LISTING_VALUES = """p.id, p.name, p.brand_id, b.name, p.price, p.profile_pic_link, p.type, {type_ids}p.current_stock,
+                           p.status, p.created_at, pt.id IS NOT NULL,
+                           COALESCE(pt.new, FALSE), COALESCE(pt.hot, FALSE),
+                           COALESCE(pt.new_if, 0), COALESCE(pt.hot_if, 0), COALESCE(pt.rank_if, 0)"""
+LISTING_UPDATES = """name = EXCLUDED.name, brand_id = EXCLUDED.brand_id, brand_name = EXCLUDED.brand_name,
+                        price = EXCLUDED.price, profile_pic_link = EXCLUDED.profile_pic_link,
+                        type = EXCLUDED.type, {type_ids}current_stock = EXCLUDED.current_stock,
+                        status = EXCLUDED.status, created_at = EXCLUDED.created_at,
+                        tagged = EXCLUDED.tagged, new = EXCLUDED.new, hot = EXCLUDED.hot,
+                        new_if = EXCLUDED.new_if, hot_if = EXCLUDED.hot_if, rank_if = EXCLUDED.rank_if"""
+
+
+def listing_functions(with_type_ids):
+    """refresh_product_listing / rebuild_product_listings, with or without type_ids (for reversing)"""
+    parts = {
+        'columns': LISTING_COLUMNS.format(type_ids='type_ids, ' if with_type_ids else ''),
+        'values': LISTING_VALUES.format(type_ids='product_type_ids(p.type), ' if with_type_ids else ''),
+        'updates': LISTING_UPDATES.format(type_ids='type_ids = EXCLUDED.type_ids, ' if with_type_ids else ''),
+        'intern_one': 'PERFORM intern_product_types((SELECT type FROM products WHERE id = p_product_id));' if with_type_ids else '',
+        'intern_all': """INSERT INTO product_types (name)
+                    SELECT DISTINCT value FROM products, LATERAL jsonb_array_elements_text(
+                        CASE WHEN jsonb_typeof(type) = 'array' THEN type ELSE '[]'::jsonb END
+                    ) AS value
+                    ON CONFLICT (name) DO NOTHING;""" if with_type_ids else '',
+    }
+    return """
+                CREATE OR REPLACE FUNCTION refresh_product_listing(p_product_id bigint) RETURNS void AS $$
+                BEGIN
+                    {intern_one}
+                    INSERT INTO product_listings (
+                        {columns}
+                    )
+                    SELECT {values}
+                    FROM products p
+                    JOIN brands b ON b.id = p.brand_id
+                    LEFT JOIN product_tags pt ON pt.product_id = p.id
+                    WHERE p.id = p_product_id
+                    ON CONFLICT (id) DO UPDATE SET
+                        {updates};
+                    IF NOT FOUND THEN
+                        DELETE FROM product_listings WHERE id = p_product_id;
+                    END IF;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE OR REPLACE FUNCTION rebuild_product_listings() RETURNS void AS $$
+                BEGIN
+                    {intern_all}
+                    DELETE FROM product_listings l WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.id = l.id);
+                    INSERT INTO product_listings (
+                        {columns}
+                    )
+                    SELECT {values}
+                    FROM products p
+                    JOIN brands b ON b.id = p.brand_id
+                    LEFT JOIN product_tags pt ON pt.product_id = p.id
+                    ON CONFLICT (id) DO UPDATE SET
+                        {updates}
+                    WHERE (product_listings.*) IS DISTINCT FROM (EXCLUDED.*);
+                END;
+                $$ LANGUAGE plpgsql;
+    """.format(**parts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_search_lexemes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'db_table': 'product_types',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='type_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, help_text='ProductType ids of `type`', size=None),
+        ),
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='listings_type_gin',
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['type_ids'], name='listings_type_ids_gin'),
+        ),
+        migrations.RunSQL(
+            # New type names are interned before a listing row is written; ids are sorted and distinct
+            sql="""
+                CREATE OR REPLACE FUNCTION intern_product_types(p_type jsonb) RETURNS void AS $$
+                    INSERT INTO product_types (name)
+                    SELECT DISTINCT value
+                    FROM jsonb_array_elements_text(CASE WHEN jsonb_typeof(p_type) = 'array' THEN p_type ELSE '[]'::jsonb END) AS value
+                    ON CONFLICT (name) DO NOTHING;
+                $$ LANGUAGE sql;
+
+                CREATE OR REPLACE FUNCTION product_type_ids(p_type jsonb) RETURNS integer[] AS $$
+                    SELECT COALESCE(array_agg(t.id::integer ORDER BY t.id), '{}')
+                    FROM product_types t
+                    WHERE t.name IN (
+                        SELECT jsonb_array_elements_text(CASE WHEN jsonb_typeof(p_type) = 'array' THEN p_type ELSE '[]'::jsonb END)
+                    );
+                $$ LANGUAGE sql STABLE;
+            """ + listing_functions(with_type_ids=True) + """
+                SELECT rebuild_product_listings();
+            """,
+            reverse_sql=listing_functions(with_type_ids=False) + """
+                DROP FUNCTION IF EXISTS product_type_ids(jsonb);
+                DROP FUNCTION IF EXISTS intern_product_types(jsonb);
+            """,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated manually to add a stored is_gift_box flag and a partial index for the gift-box feed
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0017_product_types'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            # Immutable, so it can compute a stored generated column
+            sql="""
+                CREATE OR REPLACE FUNCTION product_is_gift_box(p_type jsonb) RETURNS boolean AS $$
+                    SELECT EXISTS (
+                        SELECT 1
+                        FROM jsonb_array_elements_text(CASE WHEN jsonb_typeof(p_type) = 'array' THEN p_type ELSE '[]'::jsonb END) AS value
+                        WHERE value ILIKE '%gift%'
+                    );
+                $$ LANGUAGE sql IMMUTABLE;
+            """,
+            reverse_sql="DROP FUNCTION IF EXISTS product_is_gift_box(jsonb);",
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='is_gift_box',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('type'), function='product_is_gift_box', output_field=models.BooleanField()), help_text="Any type name contains 'gift' (stored generated column, see migration 0018)", output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(models.OrderBy(models.F('rank_if'), descending=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), condition=models.Q(('is_gift_box', True), ('tagged', True)), name='listings_gift_box_idx'),
+        ),
+    ]
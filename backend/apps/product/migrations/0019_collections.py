@@ -0,0 +1,42 @@
+# Generated manually to add the collection registry and its materialised membership table
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0018_gift_box_flag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Collection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(help_text='Collection slug as used in /collections/<slug>/', max_length=200, unique=True)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('stale', models.BooleanField(default=True, help_text='Catalog changed since the membership was last refreshed')),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, help_text='Null until the first refresh', null=True)),
+            ],
+            options={
+                'db_table': 'collections',
+                'ordering': ['slug'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CollectionMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text="1-based rank in the collection's default (relevance) order")),
+                ('collection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='product.collection')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product')),
+            ],
+            options={
+                'db_table': 'collection_memberships',
+                'constraints': [models.UniqueConstraint(fields=('collection', 'position'), name='collection_memberships_position_uniq'), models.UniqueConstraint(fields=('collection', 'product'), name='collection_memberships_product_uniq')],
+            },
+        ),
+    ]
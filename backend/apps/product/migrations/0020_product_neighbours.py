@@ -0,0 +1,28 @@
+# Generated manually to add the precomputed "you might like" neighbours table
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0019_collections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(help_text='1-based position, most similar first')),
+                ('score', models.FloatField(help_text="Cosine similarity of the products' feature vectors")),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='product.product')),
+            ],
+            options={
+                'db_table': 'product_neighbours',
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='product_neighbours_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated manually to add the bought-together co-occurrence counts, rankings and job watermark
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0020_product_neighbours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoughtTogetherProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0, help_text='Orders counted so far')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'bought_together_progress',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductOrderCount',
+            fields=[
+                ('product_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('orders', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'product_order_counts',
+            },
+        ),
+        migrations.CreateModel(
+            name='BoughtTogether',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField()),
+                ('other_id', models.BigIntegerField()),
+                ('rank', models.PositiveSmallIntegerField(help_text='1-based position, strongest association first')),
+                ('orders', models.PositiveIntegerField(help_text='Orders containing both products')),
+                ('confidence', models.FloatField(help_text="Share of the product's orders that also contain the other product")),
+                ('lift', models.FloatField(help_text="Confidence relative to the other product's overall order share")),
+            ],
+            options={
+                'db_table': 'bought_together',
+                'constraints': [models.UniqueConstraint(fields=('product_id', 'rank'), name='bought_together_rank_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_a', models.BigIntegerField()),
+                ('product_b', models.BigIntegerField(db_index=True)),
+                ('orders', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'product_pairs',
+                'constraints': [models.UniqueConstraint(fields=('product_a', 'product_b'), name='product_pairs_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated manually to move the catalog and brand version counters from the per-process cache into the database
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0021_bought_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(help_text='When the version last moved')),
+            ],
+            options={
+                'db_table': 'cache_versions',
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE SEQUENCE cache_versions_seq;
+                INSERT INTO cache_versions (name, version, updated_at)
+                VALUES ('catalog', nextval('cache_versions_seq'), now()),
+                       ('brand', nextval('cache_versions_seq'), now());
+            """,
+            reverse_sql="DROP SEQUENCE IF EXISTS cache_versions_seq;",
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated manually to let the bought-together job count orders that commit below its watermark
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0022_cache_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boughttogetherprogress',
+            name='open_order_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, help_text='Ids below the watermark a run stepped over, looked up again by later runs', size=None),
+        ),
+    ]
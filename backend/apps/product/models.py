@@ -1,4 +1,8 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Func
 from apps.brand.models import Brand
 
 
@@ -34,10 +38,20 @@ class Product(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False, help_text="Weighted FTS document (name > brand > description), maintained by a database trigger")
 
     class Meta:
         db_table = 'products'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='products_search_vector_gin'),
+            # Trigram indexes serve ILIKE '%term%' and the pg_trgm % / <% operators
+            # (products_type_trgm on type::text is created in migration 0013)
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='products_name_trgm'),
+            GinIndex(fields=['description'], opclasses=['gin_trgm_ops'], name='products_description_trgm'),
+            # GiST trigram index: index-ordered nearest names (`term <<-> name`) for top-k candidates
+            GistIndex(fields=['name'], opclasses=['gist_trgm_ops'], name='products_name_trgm_gist'),
+        ]
 
     def __str__(self):
         return self.name
@@ -57,3 +71,254 @@ class ProductTag(models.Model):
 
     def __str__(self):
         return f"Tag for {self.product.name}"
+
+
+class ProductType(models.Model):
+    """
+    Interned product type names. Product.type stays a JSON array of names;
+    product_listings.type_ids holds the matching ids (filled by the listing
+    triggers, which intern new names, see migration 0017).
+    """
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        db_table = 'product_types'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class ProductListing(models.Model):
+    """
+    Denormalised list-card row per product: product fields, brand name and tag
+    flags/scores, so listing endpoints read one table instead of joining
+    products, brands and product_tags. Maintained by database triggers on those
+    tables (migration 0014); rebuild with `manage.py rebuild_product_listings`.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Product ID")
+    name = models.CharField(max_length=200)
+    brand_id = models.BigIntegerField()
+    brand_name = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    profile_pic_link = models.URLField(max_length=500)
+    type = models.JSONField(default=list)
+    type_ids = ArrayField(models.IntegerField(), default=list, help_text="ProductType ids of `type`")
+    current_stock = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    tagged = models.BooleanField(default=False, help_text="Whether the product has a ProductTag")
+    is_gift_box = models.GeneratedField(
+        expression=Func(F('type'), function='product_is_gift_box', output_field=models.BooleanField()),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        help_text="Any type name contains 'gift' (stored generated column, see migration 0018)",
+    )
+    new = models.BooleanField(default=False)
+    hot = models.BooleanField(default=False)
+    new_if = models.FloatField(default=0.0)
+    hot_if = models.FloatField(default=0.0)
+    rank_if = models.FloatField(default=0.0, help_text="Tag rank_if, 0 for untagged products")
+
+    class Meta:
+        db_table = 'product_listings'
+        indexes = [
+            # One index per listing order; each ends with id for keyset pagination
+            models.Index(F('rank_if').desc(), F('created_at').desc(), F('id').desc(), name='listings_rank_idx'),
+            models.Index(
+                F('hot_if').desc(), F('created_at').desc(), F('id').desc(),
+                name='listings_hot_idx', condition=models.Q(hot=True),
+            ),
+            models.Index(
+                F('new_if').desc(), F('created_at').desc(), F('id').desc(),
+                name='listings_new_idx', condition=models.Q(new=True),
+            ),
+            # Gift-box feed: the first tagged gift boxes in rank order, read straight off the index
+            models.Index(
+                F('rank_if').desc(), F('created_at').desc(), F('id').desc(),
+                name='listings_gift_box_idx', condition=models.Q(is_gift_box=True, tagged=True),
+            ),
+            models.Index(fields=['price', 'id'], name='listings_price_idx'),
+            models.Index(fields=['created_at', 'id'], name='listings_created_idx'),
+            models.Index(
+                'brand_id', F('rank_if').desc(), F('created_at').desc(), F('id').desc(),
+                name='listings_brand_rank_idx',
+            ),
+            # Type filters, related products and gift boxes: `type_ids && ARRAY[...]`
+            GinIndex(fields=['type_ids'], name='listings_type_ids_gin'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class SearchLexeme(models.Model):
+    """
+    Dictionary of distinct words from product names, brand names and product
+    types, used to correct misspelled search terms ("did you mean").
+    New words are added by database triggers (migration 0016); frequencies
+    are recomputed and stale words dropped by `manage.py rebuild_search_lexemes`.
+    """
+    word = models.CharField(max_length=100, primary_key=True)
+    frequency = models.PositiveIntegerField(default=1, help_text="Number of products/brands using the word")
+
+    class Meta:
+        db_table = 'search_lexemes'
+        indexes = [
+            GinIndex(fields=['word'], opclasses=['gin_trgm_ops'], name='search_lexemes_word_trgm'),
+        ]
+
+    def __str__(self):
+        return self.word
+
+
+class Collection(models.Model):
+    """
+    Registered (named) collection. Its members and their default order are
+    materialised into CollectionMembership from the live slug search, so
+    /collections/<slug>/ reads the membership table instead of re-running
+    the fuzzy search. Refreshed after catalog changes (see collection_registry.py)
+    or with `manage.py refresh_collections`.
+    """
+    slug = models.SlugField(max_length=200, unique=True, help_text="Collection slug as used in /collections/<slug>/")
+    title = models.CharField(max_length=200, blank=True)
+    stale = models.BooleanField(default=True, help_text="Catalog changed since the membership was last refreshed")
+    product_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True, help_text="Null until the first refresh")
+
+    class Meta:
+        db_table = 'collections'
+        ordering = ['slug']
+
+    def __str__(self):
+        return self.title or self.slug
+
+
+class CollectionMembership(models.Model):
+    """Materialised member of a registered collection, with its position in the default order"""
+    collection = models.ForeignKey(Collection, on_delete=models.CASCADE, related_name='memberships')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    position = models.PositiveIntegerField(help_text="1-based rank in the collection's default (relevance) order")
+
+    class Meta:
+        db_table = 'collection_memberships'
+        constraints = [
+            # Also serves reading a collection in position order
+            models.UniqueConstraint(fields=['collection', 'position'], name='collection_memberships_position_uniq'),
+            models.UniqueConstraint(fields=['collection', 'product'], name='collection_memberships_product_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.collection} #{self.position}"
+
+
+class ProductNeighbour(models.Model):
+    """
+    Precomputed content-based neighbour of a product for "you might like",
+    written by `manage.py rebuild_product_neighbours` (see neighbours.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='neighbours', db_index=False)
+    neighbour = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField(help_text="1-based position, most similar first")
+    score = models.FloatField(help_text="Cosine similarity of the products' feature vectors")
+
+    class Meta:
+        db_table = 'product_neighbours'
+        constraints = [
+            # Also serves reading a product's neighbours in rank order
+            models.UniqueConstraint(fields=['product', 'rank'], name='product_neighbours_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.neighbour_id} #{self.rank}"
+
+
+class ProductPair(models.Model):
+    """
+    Number of orders containing both products (product_a < product_b): the
+    sparse co-occurrence matrix behind "bought together", grown incrementally
+    by `manage.py mine_bought_together` (see bought_together.py).
+    """
+    product_a = models.BigIntegerField()
+    product_b = models.BigIntegerField(db_index=True)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'product_pairs'
+        constraints = [
+            models.UniqueConstraint(fields=['product_a', 'product_b'], name='product_pairs_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_a} + {self.product_b}: {self.orders}"
+
+
+class ProductOrderCount(models.Model):
+    """Number of mined orders containing the product (support of the pair scores)"""
+    product_id = models.BigIntegerField(primary_key=True)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'product_order_counts'
+
+    def __str__(self):
+        return f"{self.product_id}: {self.orders}"
+
+
+class BoughtTogether(models.Model):
+    """Top products bought together with a product, ranked by lift then confidence"""
+    product_id = models.BigIntegerField()
+    other_id = models.BigIntegerField()
+    rank = models.PositiveSmallIntegerField(help_text="1-based position, strongest association first")
+    orders = models.PositiveIntegerField(help_text="Orders containing both products")
+    confidence = models.FloatField(help_text="Share of the product's orders that also contain the other product")
+    lift = models.FloatField(help_text="Confidence relative to the other product's overall order share")
+
+    class Meta:
+        db_table = 'bought_together'
+        constraints = [
+            # Also serves reading a product's list in rank order
+            models.UniqueConstraint(fields=['product_id', 'rank'], name='bought_together_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.other_id} #{self.rank}"
+
+
+class BoughtTogetherProgress(models.Model):
+    """
+    Watermark of the bought-together job (single row): orders up to
+    last_order_id are counted, except open_order_ids not seen yet
+    """
+    last_order_id = models.BigIntegerField(default=0)
+    open_order_ids = ArrayField(
+        models.BigIntegerField(), default=list,
+        help_text="Ids below the watermark a run stepped over, looked up again by later runs",
+    )
+    orders = models.PositiveIntegerField(default=0, help_text="Orders counted so far")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bought_together_progress'
+
+    def __str__(self):
+        return f"Orders up to #{self.last_order_id}"
+
+
+class CacheVersion(models.Model):
+    """
+    Named version counter shared by every worker and management command
+    (catalog, brands): cache keys and HTTP validators embed the current
+    version, so moving it invalidates them everywhere (see cache.py).
+    Versions come from the cache_versions_seq sequence, which a rolled-back
+    bump does not rewind, so a version number is never reused.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+    updated_at = models.DateTimeField(help_text="When the version last moved")
+
+    class Meta:
+        db_table = 'cache_versions'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
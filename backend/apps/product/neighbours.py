@@ -0,0 +1,159 @@
+"""
+Offline job computing content-based "you might like" neighbours.
+
+Every product becomes a sparse TF-IDF vector over weighted features: name
+and description words, product types and the brand. Rows are L2-normalised,
+so the dot product of two rows is their cosine similarity. Similarities are
+computed in blocks of rows (one sparse matrix product per block, so memory
+stays at block_size x products), the top-k of each row is picked with
+argpartition and stored in product_neighbours.
+
+/api/products/<id>/you-might-like/ then reads a product's neighbours with one
+lookup on the (product_id, rank) index. Products created after the last run
+fall back to the type-overlap query until the next one:
+
+    python manage.py rebuild_product_neighbours
+"""
+import math
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from scipy import sparse
+
+from .memory_search import tokenize
+from .models import Product
+
+# Feature weights (before IDF): shared types and name words say most about similarity
+FEATURE_WEIGHTS = {'name': 1.0, 'type': 1.5, 'brand': 0.5, 'description': 0.3}
+
+# Neighbour rows per INSERT statement
+INSERT_BATCH_SIZE = 10000
+
+# Products deleted while the job ran are skipped rather than failing the whole rebuild
+INSERT_SQL = """
+    INSERT INTO product_neighbours (product_id, neighbour_id, rank, score)
+    SELECT u.product_id, u.neighbour_id, u.rank, u.score
+    FROM unnest(%s::bigint[], %s::bigint[], %s::smallint[], %s::double precision[])
+         AS u(product_id, neighbour_id, rank, score)
+    WHERE EXISTS (SELECT 1 FROM products WHERE id = u.product_id)
+      AND EXISTS (SELECT 1 FROM products WHERE id = u.neighbour_id)
+"""
+
+
+def product_features(name, description, product_type, brand_id) -> Counter:
+    """Weighted feature counts of one product ('name:', 'desc:', 'type:' and 'brand:' prefixed)"""
+    features = Counter()
+    for word in tokenize(name):
+        features[f'name:{word}'] += FEATURE_WEIGHTS['name']
+    for word in tokenize(description):
+        features[f'desc:{word}'] += FEATURE_WEIGHTS['description']
+    if isinstance(product_type, list):
+        for type_name in product_type:
+            if isinstance(type_name, str) and type_name.strip():
+                features[f'type:{type_name.strip().lower()}'] += FEATURE_WEIGHTS['type']
+    features[f'brand:{brand_id}'] += FEATURE_WEIGHTS['brand']
+    return features
+
+
+def feature_matrix(documents) -> tuple:
+    """
+    Build the L2-normalised TF-IDF matrix.
+
+    Args:
+        documents: Iterable of (product id, feature Counter)
+
+    Returns:
+        (product ids as an int64 array, CSR matrix with one row per product)
+    """
+    ids, rows, columns, values = [], [], [], []
+    vocabulary = {}
+    for row, (product_id, features) in enumerate(documents):
+        ids.append(product_id)
+        for feature, weight in features.items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(feature, len(vocabulary)))
+            # Sublinear term frequency: repeated words add little
+            values.append(1.0 + math.log(weight) if weight > 1 else weight)
+    shape = (len(ids), len(vocabulary))
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (np.array(rows), np.array(columns))), shape=shape,
+    )
+    if not ids:
+        return np.array(ids, dtype=np.int64), matrix
+
+    # Smoothed IDF: features shared by most of the catalog carry little signal
+    document_frequency = np.bincount(matrix.indices, minlength=shape[1])
+    idf = np.log((1 + shape[0]) / (1 + document_frequency)).astype(np.float32) + 1
+    matrix = matrix @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms) @ matrix
+    return np.array(ids, dtype=np.int64), sparse.csr_matrix(matrix, dtype=np.float32)
+
+
+def nearest_neighbours(matrix, k: int, block_size: int):
+    """
+    Top-k most similar other rows of every row, most similar first.
+
+    Yields:
+        (row index, neighbour row indices, similarities) with zero similarities left out
+    """
+    count = matrix.shape[0]
+    k = min(k, count - 1)
+    if k <= 0:
+        return
+    transposed = matrix.T.tocsc()
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+        similarities = (matrix[start:stop] @ transposed).toarray()
+        # A product is not its own neighbour
+        similarities[np.arange(stop - start), np.arange(start, stop)] = -1
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        # Highest first; ties by row index (product id order) so runs are deterministic
+        order = np.lexsort((top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for offset in range(stop - start):
+            keep = top_scores[offset] > 0
+            yield start + offset, top[offset][keep], top_scores[offset][keep]
+
+
+def rebuild_neighbours(k: int = None, block_size: int = None) -> int:
+    """
+    Recompute every product's neighbours and replace the product_neighbours table.
+
+    Args:
+        k: Neighbours per product (default PRODUCT_NEIGHBOURS_K)
+        block_size: Rows per similarity block (default PRODUCT_NEIGHBOURS_BLOCK_SIZE)
+
+    Returns:
+        Number of neighbour rows written
+    """
+    k = k or settings.PRODUCT_NEIGHBOURS_K
+    block_size = block_size or settings.PRODUCT_NEIGHBOURS_BLOCK_SIZE
+    products = Product.objects.order_by('id').values_list('id', 'name', 'description', 'type', 'brand_id')
+    ids, matrix = feature_matrix(
+        (product_id, product_features(name, description, product_type, brand_id))
+        for product_id, name, description, product_type, brand_id in products.iterator(chunk_size=2000)
+    )
+
+    written = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("DELETE FROM product_neighbours")
+        batch = ([], [], [], [])
+        for row, neighbours, scores in nearest_neighbours(matrix, k, block_size):
+            batch[0].extend([int(ids[row])] * len(neighbours))
+            batch[1].extend(ids[neighbours].tolist())
+            batch[2].extend(range(1, len(neighbours) + 1))
+            batch[3].extend(scores.astype(float).tolist())
+            if len(batch[0]) >= INSERT_BATCH_SIZE:
+                cursor.execute(INSERT_SQL, batch)
+                written += cursor.rowcount
+                batch = ([], [], [], [])
+        if batch[0]:
+            cursor.execute(INSERT_SQL, batch)
+            written += cursor.rowcount
+    return written
@@ -0,0 +1,245 @@
+"""
+Pagination for product listings.
+
+Both paginators support two modes on the same endpoint:
+- page numbers (`?page=N`), with a total count
+- keyset cursors (`?cursor=<token>`), where the opaque token encodes the
+  ORDER BY key values plus id of the last row served, so a page costs the
+  same at any depth. Every response carries `next_cursor` to switch to
+  (or continue) cursor mode; `count` is null in cursor mode.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .services import COUNT_CAPPED, COUNT_EXACT
+
+INVALID_CURSOR_MESSAGE = 'Invalid cursor'
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return ['t', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['d', str(value)]
+    if isinstance(value, float):
+        return ['f', value]
+    return ['v', value]
+
+
+def _load_value(item):
+    kind, value = item
+    if kind == 't':
+        return datetime.fromisoformat(value)
+    if kind == 'd':
+        return Decimal(value)
+    if kind == 'f':
+        return float(value)
+    return value
+
+
+def encode_cursor(signature: str, values) -> str:
+    """Opaque, URL-safe token for a position in a given ordering"""
+    payload = json.dumps({'s': signature, 'v': [_dump_value(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, signature: str) -> tuple:
+    """Decode a cursor token; raises NotFound if it is malformed or was issued for another ordering"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload['s'] != signature:
+            raise ValueError('ordering mismatch')
+        return tuple(_load_value(item) for item in payload['v'])
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+
+
+def clean_cursor_values(values, fields) -> tuple:
+    """
+    Convert decoded cursor values through the model fields they are compared
+    with, so a tampered cursor is rejected instead of reaching the query.
+
+    Args:
+        values: Values from decode_cursor()
+        fields: Model field of each ordering key
+
+    Returns:
+        The converted values; raises NotFound if one does not fit its field
+    """
+    if len(values) != len(fields):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    cleaned = []
+    for value, field in zip(values, fields):
+        if value is None or isinstance(value, (list, dict, bool)):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        try:
+            cleaned.append(field.to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+    return tuple(cleaned)
+
+
+def ordering_fields(queryset, ordering) -> tuple:
+    """Model (or annotation output) field behind each name of an ORM ordering"""
+    annotations = queryset.query.annotations
+    fields = []
+    for field in ordering:
+        name = field.lstrip('-')
+        if name in annotations:
+            fields.append(annotations[name].output_field)
+        else:
+            fields.append(queryset.model._meta.get_field(name))
+    return tuple(fields)
+
+
+def ordering_signature(ordering) -> str:
+    return hashlib.sha1(','.join(ordering).encode()).hexdigest()[:12]
+
+
+def keyset_filter(ordering, values) -> Q:
+    """
+    Q object selecting rows after `values` for an ORM ordering, e.g.
+    ('-rank_if', '-created_at', '-id') ->
+    rank < r OR (rank = r AND created < c) OR (rank = r AND created = c AND id < i)
+    """
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {ordering[i].lstrip('-'): values[i] for i in range(position)}
+        condition |= Q(**equal, **{f'{name}__{lookup}': values[position]})
+    return condition
+
+
+class ProductPagination(PageNumberPagination):
+    """Page-number pagination for ordered querysets, with keyset cursor support"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(queryset.query.order_by)
+        self.signature = ordering_signature(self.ordering)
+        token = request.query_params.get(self.cursor_query_param)
+        self.keyset = bool(token)
+        if not self.keyset:
+            items = super().paginate_queryset(queryset, request, view)
+            has_next = self.page.has_next()
+        else:
+            page_size = self.get_page_size(request)
+            after = clean_cursor_values(decode_cursor(token, self.signature), ordering_fields(queryset, self.ordering))
+            items = list(queryset.filter(keyset_filter(self.ordering, after))[:page_size + 1])
+            has_next = len(items) > page_size
+            items = items[:page_size]
+        self.next_cursor = None
+        if items and has_next:
+            last = items[-1]
+            # Model instances or .values() rows (see serializers.listing_card_rows)
+            if isinstance(last, dict):
+                values = [last[field.lstrip('-')] for field in self.ordering]
+            else:
+                values = [getattr(last, field.lstrip('-')) for field in self.ordering]
+            self.next_cursor = encode_cursor(self.signature, values)
+        return items
+
+    def get_next_link(self):
+        if self.keyset:
+            if self.next_cursor is None:
+                return None
+            url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+            return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset:
+            return None
+        return super().get_previous_link()
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': None if self.keyset else self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+
+class SearchPlanPagination(ProductPagination):
+    """
+    The same page-number / cursor contract for search backend plans
+    (collection and search pages). Page-number mode fetches the page and its
+    total in one statement; `count=capped` bounds the total.
+    """
+
+    def paginate_plan(self, plan, request, backend) -> list:
+        """Return the requested page of `plan` (built by `backend`) as a list of row dicts"""
+        self.request = request
+        self.signature = plan.order_signature
+        page_size = self.get_page_size(request)
+        token = request.query_params.get(self.cursor_query_param)
+        self.keyset = bool(token)
+        self.count_mode = request.query_params.get('count', COUNT_EXACT)
+        self.count = None
+        self.count_capped = False
+
+        if self.keyset:
+            after = clean_cursor_values(decode_cursor(token, self.signature), plan.order_fields)
+            columns, rows, has_next = backend.fetch_keyset_page(plan, page_size, after)
+        else:
+            try:
+                self.page_number = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+            except ValueError:
+                raise NotFound(self.invalid_page_message)
+            offset = (self.page_number - 1) * page_size
+            columns, rows, self.count, self.count_capped = backend.fetch_page(plan, page_size, offset, self.count_mode)
+            has_next = offset + page_size < self.count
+
+        results = [dict(zip(columns, row)) for row in rows]
+        self.next_cursor = None
+        if results and has_next:
+            last = results[-1]
+            self.next_cursor = encode_cursor(self.signature, [last[column] for column in plan.order_columns])
+        self.has_next = has_next
+        return results
+
+    def get_next_link(self):
+        if self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.keyset or self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        response_data = {
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        }
+        if self.count_mode == COUNT_CAPPED and not self.keyset:
+            response_data['count_capped'] = self.count_capped
+        return Response(response_data)
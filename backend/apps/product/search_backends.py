@@ -0,0 +1,190 @@
+"""
+Search backends for the product search and collection endpoints.
+
+Views build a plan with the configured backend and hand it back to the same
+backend to fetch rows, pages, cursors and facets, so the endpoints do not
+depend on how matching is done:
+
+- PostgresSearchBackend (default): the FTS + pg_trgm SearchPlans of services.py
+- InMemorySearchBackend: a per-worker inverted index (see memory_search.py),
+  for small deployments; PostgresSearchBackend answers while the index is
+  still being built, so cursors issued then are not valid once it is ready
+
+Select one with the PRODUCT_SEARCH_BACKEND setting (dotted class path).
+"""
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import services
+from .autocomplete import suggestion_index
+from .collection_registry import registered_collection_id
+
+
+class SearchBackend:
+    """
+    Interface shared by the search backends.
+
+    Plans are opaque to callers except for `order` (ORDER BY keys),
+    `order_columns` (row column holding each key's value) and
+    `order_signature`, which the paginator uses to build cursors.
+    Fetch methods return rows as (columns, rows) with the services.BASE_SELECT
+    columns (plus e.g. relevance_score), ready for serialize_product_rows.
+    """
+
+    def search_plan(self, query: str, limit: int = None):
+        """Plan for a free-text search (limit None when paginating)"""
+        raise NotImplementedError
+
+    def collection_plan(self, slug: str, filters: dict = None, sort: str = None):
+        """Plan for a collection slug with query-parameter filters and sort"""
+        raise NotImplementedError
+
+    def fetch_rows(self, plan) -> tuple:
+        """(columns, rows) for every row of `plan`, up to its limit"""
+        raise NotImplementedError
+
+    def fetch_page(self, plan, page_size: int, offset: int, count_mode: str = services.COUNT_EXACT) -> tuple:
+        """(columns, rows, total, capped) for one page of `plan`"""
+        raise NotImplementedError
+
+    def fetch_keyset_page(self, plan, page_size: int, after: tuple) -> tuple:
+        """(columns, rows, has_next) for the rows after a cursor position"""
+        raise NotImplementedError
+
+    def fetch_facets(self, plan, buckets: int = None) -> dict:
+        """Facet counts over every match of `plan` (see services.fetch_facets for the shape)"""
+        raise NotImplementedError
+
+    def correct_query(self, query: str):
+        """Spelling-corrected query, or None when nothing needed correcting"""
+        return None
+
+    def suggestions(self, query: str, limit: int = 8) -> list:
+        """Header search suggestions, from the in-process autocomplete index when warm"""
+        suggestions = suggestion_index.suggest(query, limit=limit)
+        return [] if suggestions is None else suggestions
+
+    def warm_up(self):
+        """Prepare per-worker state in the background (called from config/wsgi.py)"""
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL FTS + pg_trgm search through the raw-SQL SearchPlans in services.py"""
+
+    def search_plan(self, query, limit=None):
+        return services.get_search_query(query, limit=limit)
+
+    def collection_plan(self, slug, filters=None, sort=None):
+        # Registered slugs read their materialised membership, ad-hoc slugs the live search
+        return services.get_collection_search_query(
+            slug, filters, sort=sort, collection_id=registered_collection_id(slug),
+        )
+
+    def fetch_rows(self, plan):
+        return services.fetch_rows(plan)
+
+    def fetch_page(self, plan, page_size, offset, count_mode=services.COUNT_EXACT):
+        return services.fetch_page(plan, page_size, offset, count_mode)
+
+    def fetch_keyset_page(self, plan, page_size, after):
+        return services.fetch_keyset_page(plan, page_size, after)
+
+    def fetch_facets(self, plan, buckets=None):
+        return services.fetch_facets(plan, buckets)
+
+    def correct_query(self, query):
+        return services.correct_query(query)
+
+    def suggestions(self, query, limit=8):
+        # SQL (brands only) while the autocomplete index is cold
+        suggestions = suggestion_index.suggest(query, limit=limit)
+        if suggestions is None:
+            suggestions = services.get_search_suggestions(query, limit=limit)
+        return suggestions
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Per-worker inverted index with BM25 scoring; reads the catalog through the ORM.
+    While the index is cold, plans come from PostgresSearchBackend (`fallback`)
+    and fetches follow the plan they are given, so requests never wait for a build.
+    """
+
+    def __init__(self):
+        from .memory_search import memory_index
+        self.index = memory_index
+        self.fallback = PostgresSearchBackend()
+
+    def _warm(self) -> bool:
+        """Whether the index can answer; a cold index starts (or retries) its background build"""
+        if self.index.is_warm:
+            return True
+        self.index.warm_up()
+        return False
+
+    def search_plan(self, query, limit=None):
+        if not self._warm():
+            return self.fallback.search_plan(query, limit=limit)
+        return self.index.search_plan(query, limit=limit)
+
+    def collection_plan(self, slug, filters=None, sort=None):
+        if not self._warm():
+            return self.fallback.collection_plan(slug, filters, sort=sort)
+        return self.index.collection_plan(slug, filters, sort=sort)
+
+    def fetch_rows(self, plan):
+        if isinstance(plan, services.SearchPlan):
+            return self.fallback.fetch_rows(plan)
+        return self.index.fetch_rows(plan)
+
+    def fetch_page(self, plan, page_size, offset, count_mode=services.COUNT_EXACT):
+        if isinstance(plan, services.SearchPlan):
+            return self.fallback.fetch_page(plan, page_size, offset, count_mode)
+        return self.index.fetch_page(plan, page_size, offset, count_mode)
+
+    def fetch_keyset_page(self, plan, page_size, after):
+        if isinstance(plan, services.SearchPlan):
+            return self.fallback.fetch_keyset_page(plan, page_size, after)
+        return self.index.fetch_keyset_page(plan, page_size, after)
+
+    def fetch_facets(self, plan, buckets=None):
+        if isinstance(plan, services.SearchPlan):
+            return self.fallback.fetch_facets(plan, buckets)
+        return self.index.fetch_facets(plan, buckets or settings.PRODUCT_FACET_PRICE_BUCKETS)
+
+    def correct_query(self, query):
+        if not self._warm():
+            return self.fallback.correct_query(query)
+        return self.index.correct_query(query)
+
+    def suggestions(self, query, limit=8):
+        suggestions = suggestion_index.suggest(query, limit=limit)
+        if suggestions is None:
+            if not self._warm():
+                return services.get_search_suggestions(query, limit=limit)
+            suggestions = self.index.brand_suggestions(query, limit)
+        return suggestions
+
+    def warm_up(self):
+        self.index.warm_up()
+
+
+_backend = None
+
+
+def get_search_backend() -> SearchBackend:
+    """The configured search backend (one instance per process)"""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.PRODUCT_SEARCH_BACKEND)()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    """Pick up PRODUCT_SEARCH_BACKEND changes (override_settings in tests)"""
+    global _backend
+    if setting == 'PRODUCT_SEARCH_BACKEND':
+        _backend = None
@@ -1,3 +1,8 @@
+import json
+from decimal import Decimal
+from functools import lru_cache
+from operator import itemgetter
+from django.db.models import F
 from rest_framework import serializers
 from .models import Product, ProductTag, ProductDetailPic
 
@@ -34,6 +39,140 @@ class ProductListSerializer(serializers.ModelSerializer):
             return False
 
 
+class RowProjection:
+    """
+    Model-free serializer for flat rows: `.values()` dicts, raw cursor dicts or
+    tuples. Each field is (output key, row column, converter or None); the
+    row-to-dict extractor (an itemgetter over the layout's positions plus the
+    converters) is built once per row layout, so serializing a row needs no
+    field objects, model instances or per-field lookups.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.columns = tuple(column for _key, column, _converter in self.fields)
+        self._extractors = {}
+
+    def _build(self, positions):
+        keys = tuple(key for key, _column, _converter in self.fields)
+        converters = tuple(
+            (index, converter) for index, (_key, _column, converter) in enumerate(self.fields) if converter is not None
+        )
+        if len(positions) == 1:
+            # itemgetter of a single item returns the value itself, not a 1-tuple
+            position = positions[0]
+
+            def values(row):
+                return (row[position],)
+        else:
+            values = itemgetter(*positions)
+
+        if not converters:
+            return lambda row: dict(zip(keys, values(row)))
+
+        def extract(row):
+            row_values = list(values(row))
+            for index, converter in converters:
+                row_values[index] = converter(row_values[index])
+            return dict(zip(keys, row_values))
+        return extract
+
+    def extractor(self, columns=None):
+        """
+        Row -> payload function: for dict rows keyed by the field columns, or
+        for tuples laid out as `columns`.
+        """
+        layout = None if columns is None else tuple(columns)
+        extract = self._extractors.get(layout)
+        if extract is None:
+            positions = self.columns if layout is None else [layout.index(column) for column in self.columns]
+            extract = self._extractors[layout] = self._build(positions)
+        return extract
+
+    def serialize(self, rows, columns=None) -> list:
+        """Payloads for dict rows, or for tuples laid out as `columns`"""
+        if not rows:
+            # Empty results may come without a column list
+            return []
+        return list(map(self.extractor(columns), rows))
+
+
+@lru_cache(maxsize=None)
+def _price_field():
+    """ProductListSerializer's price field, built on first use"""
+    return ProductListSerializer().fields['price']
+
+
+def _price(value):
+    # numeric(10, 2) values already have the serialized scale; anything else goes through DRF
+    if type(value) is Decimal and value.as_tuple().exponent == -2:
+        return f'{value:f}'
+    return None if value is None else _price_field().to_representation(value)
+
+
+def _json_list(value):
+    # Raw cursors return jsonb undecoded
+    return json.loads(value) if isinstance(value, str) else value
+
+
+# The ProductListSerializer payload from services.BASE_SELECT-style columns
+PRODUCT_CARD = RowProjection((
+    ('id', 'id', None),
+    ('name', 'name', None),
+    ('brand', 'brand', None),
+    ('price', 'price', _price),
+    ('profile_pic_link', 'profile_pic_link', None),
+    ('new', 'new', None),
+    ('hot', 'hot', None),
+    ('type', 'type', _json_list),
+    ('current_stock', 'current_stock', None),
+    ('status', 'status', None),
+))
+
+
+def listing_card_rows(queryset):
+    """
+    `.values()` rows of a ProductListing queryset with the PRODUCT_CARD columns,
+    plus the queryset's ordering fields (ProductPagination builds cursors from them).
+    """
+    ordering = [field.lstrip('-') for field in queryset.query.order_by]
+    extra = [field for field in dict.fromkeys(ordering) if field not in PRODUCT_CARD.columns]
+    columns = [column for column in PRODUCT_CARD.columns if column != 'brand']
+    return queryset.values(*columns, *extra, brand=F('brand_name'))
+
+
+def serialize_product_rows(rows, columns=None):
+    """
+    Serialize raw search or `.values()` rows (dicts keyed by the
+    services.BASE_SELECT columns, or tuples laid out as `columns`) to the same
+    payload as ProductListSerializer, without instantiating models or
+    re-querying products, brands and tags.
+    """
+    return PRODUCT_CARD.serialize(rows, columns)
+
+
+def serialize_facets(facets):
+    """Serialize services.fetch_facets output, formatting prices like product prices"""
+    price_field = ProductListSerializer().fields['price']
+
+    def price(value):
+        return None if value is None else price_field.to_representation(value)
+
+    return {
+        'brand': [{'value': value, 'count': count} for value, count in facets['brand']],
+        'type': [{'value': value, 'count': count} for value, count in facets['type']],
+        'availability': facets['availability'],
+        'price': {
+            'min': price(facets['price']['min']),
+            'max': price(facets['price']['max']),
+            'histogram': [
+                {'min': price(low), 'max': price(high), 'count': count}
+                for low, high, count in facets['price']['histogram']
+            ],
+        },
+    }
+
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     """Serializer for single product detail view - all fields"""
     new = serializers.SerializerMethodField()
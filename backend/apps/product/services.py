@@ -1,160 +1,423 @@
 """
 Business service layer for collection search using PostgreSQL FTS and pg_trgm
 Uses raw SQL queries - no ORM Q objects, no manual interpretation
+
+Search builders return a SearchPlan (select list, joins, WHERE fragments,
+params, ORDER BY keys, limit). Plans are immutable and memoised in a bounded
+LRU cache keyed on the normalised slug/query, filters and sort, so repeated
+requests skip slug parsing and SQL assembly entirely.
+
+All user input is bound as parameters, so each plan's SQL is one fixed query
+shape; the fetch helpers run those shapes as server-side prepared statements
+(see statements.py).
 """
-import json
+import hashlib
+from dataclasses import dataclass, replace
 from decimal import Decimal
+from functools import cached_property, lru_cache
+from typing import Optional
+from django.conf import settings
 from django.db import connection
+from django.db.models import FloatField
+from . import cache as result_cache
+from .brand_resolver import brand_resolver
+from .statements import prepared_statements
+
+# Brand name match expressed against p.brand_id so every OR-ed search predicate
+# stays on `products` and can be combined as a BitmapOr of index scans.
+# The ARRAY(...) sub-select runs once (trigram index on brands.name) and the
+# outer `= ANY` probe uses the brand_id foreign key index.
+# Params: ILIKE pattern, trigram term.
+BRAND_MATCH_SQL = "p.brand_id = ANY(ARRAY(SELECT id FROM brands WHERE name ILIKE %s OR name %% %s))"
+
+# Listings whose interned types (l.type_ids, GIN-indexed) include any type name
+# matching one of the ILIKE patterns. Params: array of ILIKE patterns.
+TYPE_MATCH_SQL = "l.type_ids && ARRAY(SELECT id::integer FROM product_types WHERE name ILIKE ANY(%s))"
+
+# Plans read the denormalised product_listings table (`l`, see models.ProductListing),
+# which already carries the brand name and tag flags/scores.
+# Exactly the ProductListSerializer fields (see serializers.serialize_product_rows),
+# plus created_at which the default orders use as a cursor key
+BASE_SELECT = (
+    "l.id", "l.name", "l.brand_name AS brand", "l.price", "l.profile_pic_link",
+    "l.new", "l.hot", "l.type", "l.current_stock", "l.status", "l.created_at",
+)
+
+BASE_JOINS = ()
+
+# Search predicates stay on `products` (p), where the FTS and trigram indexes live
+SEARCH_JOINS = ("JOIN products p ON p.id = l.id",)
+
+# List-card rows for a page of cached ids (order restored in Python)
+HYDRATE_SQL = f"SELECT {', '.join(BASE_SELECT)} FROM product_listings l WHERE l.id = ANY(%s)"
+
+# Precomputed "you might like" neighbours (neighbours.py), read off product_neighbours_rank_uniq
+NEIGHBOURS_SQL = (
+    f"SELECT {', '.join(BASE_SELECT)} FROM product_neighbours n "
+    "JOIN product_listings l ON l.id = n.neighbour_id "
+    "WHERE n.product_id = %s ORDER BY n.rank LIMIT %s"
+)
+
+# Precomputed "bought together" lists (bought_together.py), read off bought_together_rank_uniq
+BOUGHT_TOGETHER_SQL = (
+    f"SELECT {', '.join(BASE_SELECT)} FROM bought_together b "
+    "JOIN product_listings l ON l.id = b.other_id "
+    "WHERE b.product_id = %s ORDER BY b.rank LIMIT %s"
+)
 
+# Words ignored when turning a collection slug into search terms
+EXCLUDED_SLUG_WORDS = frozenset({
+    'for', 'the', 'a', 'an', 'and', 'or', 'under', 'over', 'below', 'above', 'to', 'of', 'in', 'on', 'at',
+})
 
-def get_collection_search_query(slug: str, filters: dict = None) -> dict:
+
+@dataclass(frozen=True)
+class OrderKey:
     """
-    Build PostgreSQL FTS + pg_trgm search query from a slug.
-    Relies purely on PostgreSQL's FTS and pg_trgm for fuzzy matching.
-    
-    Args:
-        slug: Collection slug (e.g., 'cooking-condiments', 'gifts-under-100', 'whats-hot', 'new-stuff')
-    
-    Returns:
-        dict with 'sql_query' (SQL string), 'params' (query parameters), 
-        'order_by' (ORDER BY clause), and metadata
+    One ORDER BY term.
+
+    `column` names the selected output column holding the key's value (a
+    `sort_key_N` column is added when None) and `cast` is applied to the
+    cursor value in keyset comparisons, e.g. 'real' for similarity scores.
     """
-    slug_lower = slug.lower()
-    
-    # Handle special collection slugs: whats-hot and new-stuff
-    if slug_lower == 'whats-hot':
-        where_conditions = ["pt.hot = TRUE AND pt.hot_if IS NOT NULL"]
-        params = []
-        order_by = "COALESCE(pt.hot_if, 0) DESC, p.created_at DESC"
-        
-        # Apply additional filters from query parameters
-        if filters:
-            if 'available' in filters and filters['available'] is not None:
-                if filters['available']:
-                    where_conditions.append("p.current_stock > 0 AND p.status = 'available'")
-                else:
-                    where_conditions.append("(p.current_stock = 0 OR p.status = 'unavailable')")
-            
-            if 'min_price' in filters and filters['min_price'] is not None:
-                where_conditions.append("p.price >= %s")
-                params.append(float(filters['min_price']))
-            if 'max_price' in filters and filters['max_price'] is not None:
-                where_conditions.append("p.price <= %s")
-                params.append(float(filters['max_price']))
-            
-            if 'product_type' in filters and filters['product_type']:
-                type_conditions = []
-                for product_type in filters['product_type']:
-                    type_conditions.append("(p.type @> %s::jsonb OR p.type::text ILIKE %s)")
-                    params.append(json.dumps([product_type]))
-                    params.append(f'%{product_type}%')
-                if type_conditions:
-                    where_conditions.append(f"({' OR '.join(type_conditions)})")
-            
-            if 'brand' in filters and filters['brand']:
-                brand_conditions = []
-                for brand_name in filters['brand']:
-                    brand_name_clean = str(brand_name).strip()
-                    if brand_name_clean:
-                        brand_conditions.append("b.name ILIKE %s")
-                        params.append(f'%{brand_name_clean}%')
-                if brand_conditions:
-                    where_conditions.append(f"({' OR '.join(brand_conditions)})")
-        
-        where_clause = ' AND '.join(where_conditions)
-        select_fields = (
-            "p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-            "p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-            "pt.rank_if"
+    expression: str
+    descending: bool = False
+    column: Optional[str] = None
+    cast: Optional[str] = None
+
+    @property
+    def sql(self) -> str:
+        return f"{self.expression} {'DESC' if self.descending else 'ASC'}"
+
+    @property
+    def field(self):
+        """Model field the key's values belong to (computed scores are floats); validates cursors"""
+        from .models import CollectionMembership, ProductListing
+
+        alias, _, name = self.expression.partition('.')
+        model = {'l': ProductListing, 'm': CollectionMembership}.get(alias)
+        return FloatField() if model is None else model._meta.get_field(name)
+
+
+# Every order ends with l.id so keyset (cursor) pagination has a unique, total order
+RANK_ORDER = (
+    OrderKey("l.rank_if", True),
+    OrderKey("l.created_at", True, column='created_at'),
+    OrderKey("l.id", True, column='id'),
+)
+
+# ORDER BY keys for the `sort` query parameter; anything else keeps the plan's default order
+SORT_ORDERS = {
+    'BEST_SELLING': RANK_ORDER,
+    'CREATED': (OrderKey("l.created_at", column='created_at'), OrderKey("l.id", column='id')),
+    'CREATED_REVERSE': (OrderKey("l.created_at", True, column='created_at'), OrderKey("l.id", True, column='id')),
+    'PRICE': (OrderKey("l.price", column='price'), OrderKey("l.id", column='id')),
+    'PRICE_REVERSE': (OrderKey("l.price", True, column='price'), OrderKey("l.id", True, column='id')),
+}
+
+
+# Registered collections read their materialised members (param: collection id),
+# in the order stored at refresh time
+MEMBERSHIP_JOIN = "JOIN collection_memberships m ON m.product_id = l.id AND m.collection_id = %s"
+MEMBERSHIP_ORDER = (OrderKey("m.position"), OrderKey("l.id", column='id'))
+
+
+@dataclass(frozen=True)
+class SearchPlan:
+    """
+    Structured product search query.
+
+    Immutable so a single instance can be shared through the plan cache; the
+    assembled SQL strings are computed once per plan and memoised on it.
+    """
+    select: tuple
+    where: tuple
+    params: tuple  # values for the %s placeholders in joins + where, in text order
+    order: tuple
+    joins: tuple = BASE_JOINS
+    limit: Optional[int] = None
+    collection_id: Optional[int] = None  # registered collection read through MEMBERSHIP_JOIN
+
+    @property
+    def where_sql(self) -> str:
+        return ' AND '.join(self.where) if self.where else 'TRUE'
+
+    @cached_property
+    def order_columns(self) -> tuple:
+        """Output column holding each ORDER BY key's value (used to build cursors)"""
+        return tuple(key.column or f'sort_key_{index}' for index, key in enumerate(self.order))
+
+    @cached_property
+    def order_fields(self) -> tuple:
+        """Model field of each ORDER BY key, to convert cursor values"""
+        return tuple(key.field for key in self.order)
+
+    @cached_property
+    def _select_list(self) -> str:
+        extra = [
+            f"{key.expression} AS sort_key_{index}"
+            for index, key in enumerate(self.order) if key.column is None
+        ]
+        return ', '.join(self.select + tuple(extra))
+
+    @cached_property
+    def order_signature(self) -> str:
+        """Short digest of the ORDER BY keys; cursors are only valid for the same order"""
+        return hashlib.sha1(self.order_by.encode()).hexdigest()[:12]
+
+    @property
+    def order_by(self) -> str:
+        return ', '.join(key.sql for key in self.order)
+
+    @cached_property
+    def _from_where_sql(self) -> str:
+        joins = ''.join(f'\n            {join}' for join in self.joins)
+        return f"""
+            FROM product_listings l{joins}
+            WHERE {self.where_sql}"""
+
+    @cached_property
+    def _select_sql(self) -> str:
+        return f"SELECT {self._select_list}{self._from_where_sql}\n            ORDER BY {self.order_by}"
+
+    @cached_property
+    def sql(self) -> str:
+        """Full query, honouring `limit` when set"""
+        if self.limit is None:
+            return self._select_sql
+        return f"{self._select_sql}\n            LIMIT %s"
+
+    @property
+    def sql_params(self) -> tuple:
+        if self.limit is None:
+            return self.params
+        return self.params + (self.limit,)
+
+    @cached_property
+    def page_sql(self) -> str:
+        """Query for one page; params from page_params()"""
+        return f"{self._select_sql}\n            LIMIT %s OFFSET %s"
+
+    def page_params(self, page_size: int, offset: int) -> tuple:
+        return self.params + (page_size, offset)
+
+    @cached_property
+    def count_sql(self) -> str:
+        """COUNT query over the same FROM/WHERE; params are `params`"""
+        return f"SELECT COUNT(*){self._from_where_sql}"
+
+    @cached_property
+    def capped_count_sql(self) -> str:
+        """
+        COUNT that stops after `cap + 1` matches, so a total of exactly `cap`
+        can be told apart from a larger one; params are `params + (cap + 1,)`
+        """
+        return f"SELECT COUNT(*) FROM (SELECT 1{self._from_where_sql}\n            LIMIT %s) AS capped"
+
+    @cached_property
+    def counted_page_sql(self) -> str:
+        """
+        One page plus the total match count in a single statement.
+        COUNT(*) OVER() is evaluated over the full filtered set before LIMIT;
+        params from page_params().
+        """
+        return (
+            f"SELECT {self._select_list}, COUNT(*) OVER() AS total_count{self._from_where_sql}"
+            f"\n            ORDER BY {self.order_by}\n            LIMIT %s OFFSET %s"
         )
-        
-        sql_query = f"""
-            SELECT {select_fields}
-            FROM products p
-            LEFT JOIN brands b ON p.brand_id = b.id
-            LEFT JOIN product_tags pt ON p.id = pt.product_id
-            WHERE {where_clause}
-            ORDER BY {order_by}
+
+    @cached_property
+    def capped_page_sql(self) -> str:
         """
-        
-        return {
-            'sql_query': sql_query,
-            'params': params,
-            'order_by': order_by,
-        }
-    
-    if slug_lower == 'new-stuff':
-        where_conditions = ["pt.new = TRUE AND pt.new_if IS NOT NULL"]
-        params = []
-        order_by = "COALESCE(pt.new_if, 0) DESC, p.created_at DESC"
-        
-        # Apply additional filters from query parameters
-        if filters:
-            if 'available' in filters and filters['available'] is not None:
-                if filters['available']:
-                    where_conditions.append("p.current_stock > 0 AND p.status = 'available'")
-                else:
-                    where_conditions.append("(p.current_stock = 0 OR p.status = 'unavailable')")
-            
-            if 'min_price' in filters and filters['min_price'] is not None:
-                where_conditions.append("p.price >= %s")
-                params.append(float(filters['min_price']))
-            if 'max_price' in filters and filters['max_price'] is not None:
-                where_conditions.append("p.price <= %s")
-                params.append(float(filters['max_price']))
-            
-            if 'product_type' in filters and filters['product_type']:
-                type_conditions = []
-                for product_type in filters['product_type']:
-                    type_conditions.append("(p.type @> %s::jsonb OR p.type::text ILIKE %s)")
-                    params.append(json.dumps([product_type]))
-                    params.append(f'%{product_type}%')
-                if type_conditions:
-                    where_conditions.append(f"({' OR '.join(type_conditions)})")
-            
-            if 'brand' in filters and filters['brand']:
-                brand_conditions = []
-                for brand_name in filters['brand']:
-                    brand_name_clean = str(brand_name).strip()
-                    if brand_name_clean:
-                        brand_conditions.append("b.name ILIKE %s")
-                        params.append(f'%{brand_name_clean}%')
-                if brand_conditions:
-                    where_conditions.append(f"({' OR '.join(brand_conditions)})")
-        
-        where_clause = ' AND '.join(where_conditions)
-        select_fields = (
-            "p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-            "p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-            "pt.rank_if"
+        One page plus a total capped at `cap`, so huge result sets don't have
+        to be counted in full; params from capped_page_params().
+        """
+        return (
+            f"SELECT {self._select_list}, ({self.capped_count_sql}) AS total_count{self._from_where_sql}"
+            f"\n            ORDER BY {self.order_by}\n            LIMIT %s OFFSET %s"
         )
-        
-        sql_query = f"""
-            SELECT {select_fields}
-            FROM products p
-            LEFT JOIN brands b ON p.brand_id = b.id
-            LEFT JOIN product_tags pt ON p.id = pt.product_id
-            WHERE {where_clause}
-            ORDER BY {order_by}
+
+    def capped_page_params(self, page_size: int, offset: int, cap: int) -> tuple:
+        return self.params + (cap + 1,) + self.params + (page_size, offset)
+
+    @cached_property
+    def keyset_page_sql(self) -> str:
         """
-        
-        return {
-            'sql_query': sql_query,
-            'params': params,
-            'order_by': order_by,
-        }
-    
-    # Regular collection slug handling (existing logic)
-    parts = slug_lower.split('-')
+        Rows strictly after a cursor position, via a row-value comparison on
+        the ORDER BY keys; params from keyset_page_params(). Cost depends on
+        the page size, not on how deep the cursor is.
+        """
+        directions = {key.descending for key in self.order}
+        if len(directions) != 1:
+            raise ValueError('Keyset pagination requires ORDER BY keys with a single direction')
+        keys = ', '.join(key.expression for key in self.order)
+        values = ', '.join(f'%s::{key.cast}' if key.cast else '%s' for key in self.order)
+        comparison = '<' if directions.pop() else '>'
+        return (
+            f"SELECT {self._select_list}{self._from_where_sql}"
+            f"\n            AND ({keys}) {comparison} ({values})"
+            f"\n            ORDER BY {self.order_by}\n            LIMIT %s"
+        )
+
+    def keyset_page_params(self, after: tuple, limit: int) -> tuple:
+        return self.params + tuple(after) + (limit,)
+
+    @cached_property
+    def matching_ids_sql(self) -> str:
+        """Ids among a given list that match the plan; params are `params + (ids,)`"""
+        return f"SELECT l.id{self._from_where_sql} AND l.id = ANY(%s)"
+
+    @cached_property
+    def ranked_ids_sql(self) -> str:
+        """Every match's id and 1-based position in the plan's order; params are `params`"""
+        return f"SELECT l.id, ROW_NUMBER() OVER (ORDER BY {self.order_by}) AS position{self._from_where_sql}"
+
+    @cached_property
+    def id_list_sql(self) -> str:
+        """
+        Ordered ids and ORDER BY key values of the first matches, plus the
+        total match count; params from id_list_params(). Feeds the result cache.
+        """
+        keys = ', '.join(key.expression for key in self.order)
+        return (
+            f"SELECT l.id, {keys}, COUNT(*) OVER() AS total_count{self._from_where_sql}"
+            f"\n            ORDER BY {self.order_by}\n            LIMIT %s"
+        )
+
+    def id_list_params(self, limit: int) -> tuple:
+        return self.params + (limit,)
+
+    @cached_property
+    def facet_sql(self) -> str:
+        """
+        Facet counts over the plan's full FROM/WHERE in one statement; params
+        from facet_params(). Brand, availability and price-bucket counts are
+        GROUPING SETS over the materialised matches, type counts unnest the
+        JSON type array. Rows are (facet, value, count, min_price, max_price).
+        """
+        return f"""
+            WITH matches AS MATERIALIZED (
+                SELECT l.id, l.brand_name AS brand, l.type, l.price,
+                       (l.current_stock > 0 AND l.status = 'available') AS in_stock{self._from_where_sql}
+            ),
+            bounds AS (
+                SELECT MIN(price) AS min_price, MAX(price) AS max_price, %s::int AS buckets FROM matches
+            ),
+            bucketed AS (
+                SELECT m.brand, m.in_stock, m.price,
+                       CASE WHEN bounds.max_price = bounds.min_price THEN 1
+                            ELSE LEAST(width_bucket(m.price, bounds.min_price, bounds.max_price, bounds.buckets), bounds.buckets)
+                       END AS bucket
+                FROM matches m CROSS JOIN bounds
+            )
+            SELECT CASE
+                       WHEN GROUPING(brand) = 0 THEN 'brand'
+                       WHEN GROUPING(in_stock) = 0 THEN 'availability'
+                       WHEN GROUPING(bucket) = 0 THEN 'price'
+                       ELSE 'total'
+                   END AS facet,
+                   COALESCE(brand, in_stock::text, bucket::text) AS value,
+                   COUNT(*), MIN(price), MAX(price)
+            FROM bucketed
+            GROUP BY GROUPING SETS ((brand), (in_stock), (bucket), ())
+            UNION ALL
+            SELECT 'type', types.value, COUNT(DISTINCT m.id), NULL, NULL
+            FROM matches m
+            CROSS JOIN LATERAL jsonb_array_elements_text(
+                CASE WHEN jsonb_typeof(m.type) = 'array' THEN m.type ELSE '[]'::jsonb END
+            ) AS types(value)
+            GROUP BY types.value"""
+
+    def facet_params(self, buckets: int) -> tuple:
+        return self.params + (buckets,)
+
+    def with_limit(self, limit: Optional[int]) -> 'SearchPlan':
+        return self if limit == self.limit else replace(self, limit=limit)
+
+
+def _plan_cache(function):
+    """Bounded LRU cache for plan builders (PRODUCT_SEARCH_PLAN_CACHE_SIZE entries)"""
+    return lru_cache(maxsize=settings.PRODUCT_SEARCH_PLAN_CACHE_SIZE)(function)
+
+
+def normalize_filters(filters: dict = None) -> tuple:
+    """Turn view filters into a hashable, order-independent cache key"""
+    if not filters:
+        return ()
+    available = filters.get('available')
+    min_price = filters.get('min_price')
+    max_price = filters.get('max_price')
+    product_types = tuple(sorted({str(t) for t in filters.get('product_type') or () if t}))
+    # Brand names resolve to ids in process; None means no brand filter, () matches nothing
+    brand_ids = None
+    if filters.get('brand') or filters.get('brand_id'):
+        brand_ids = set(int(brand_id) for brand_id in filters.get('brand_id') or ())
+        if filters.get('brand'):
+            brand_ids.update(brand_resolver.resolve(filters['brand']))
+        brand_ids = tuple(sorted(brand_ids))
+    return (
+        None if available is None else bool(available),
+        None if min_price is None else float(min_price),
+        None if max_price is None else float(max_price),
+        product_types,
+        brand_ids,
+    )
+
+
+def _filter_conditions(filter_key: tuple) -> tuple:
+    """
+    Build WHERE fragments for the query-parameter filters.
+
+    Returns:
+        (where_conditions, params) lists
+    """
     where_conditions = []
     params = []
-    
-    # Extract search terms (exclude common words and numbers)
-    excluded_words = {'for', 'the', 'a', 'an', 'and', 'or', 'under', 'over', 'below', 'above', 'to', 'of', 'in', 'on', 'at'}
+    if not filter_key:
+        return where_conditions, params
+    available, min_price, max_price, product_types, brand_ids = filter_key
+
+    # Availability filter
+    if available is not None:
+        if available:
+            where_conditions.append("l.current_stock > 0 AND l.status = 'available'")
+        else:
+            where_conditions.append("(l.current_stock = 0 OR l.status = 'unavailable')")
+
+    # Price range filters
+    if min_price is not None:
+        where_conditions.append("l.price >= %s")
+        params.append(min_price)
+    if max_price is not None:
+        where_conditions.append("l.price <= %s")
+        params.append(max_price)
+
+    # Product type filter: names (partial, case-insensitive) resolve against the small
+    # product_types table once, then the interned ids probe the GIN index on l.type_ids
+    if product_types:
+        where_conditions.append(TYPE_MATCH_SQL)
+        params.append([f'%{product_type}%' for product_type in product_types])
+
+    # Brand filter: ids (names already resolved by brand_resolver) on the indexed brand_id
+    if brand_ids is not None:
+        where_conditions.append("l.brand_id = ANY(%s)")
+        params.append(list(brand_ids))
+
+    return where_conditions, params
+
+
+def parse_slug(slug_lower: str) -> tuple:
+    """
+    Split a collection slug into search terms and an optional price bound.
+
+    Returns:
+        (search_terms, price_value, price_operator) where price_operator is 'lt', 'gt' or None
+    """
+    parts = slug_lower.split('-')
     search_terms = []
     price_value = None
     price_operator = None
-    
+
     for part in parts:
         # Check if it's a price number
         if part.startswith('$') or part.replace('.', '').isdigit():
@@ -173,173 +436,461 @@ def get_collection_search_query(slug: str, filters: dict = None) -> dict:
                     price_operator = 'lt'
             except (ValueError, TypeError):
                 pass
-        elif part not in excluded_words and len(part) > 2:
+        elif part not in EXCLUDED_SLUG_WORDS and len(part) > 2:
             search_terms.append(part)
-    
-    # Build search conditions using PostgreSQL FTS and pg_trgm
-    # Best practice: Prioritize FTS (more semantic, fewer false positives)
-    # Use similarity with higher threshold (0.2) to reduce false positives
-    # Use ILIKE for exact substring matches (most reliable)
-    search_conditions = []
-    
-    if search_terms:
-        # Combine search terms
-        search_text = ' '.join(search_terms)
-        
-        # Primary: FTS and ILIKE (most reliable, semantic matching)
-        # Secondary: Similarity with higher threshold (0.2) to reduce false positives
-        search_conditions.append(
-            "(to_tsvector('english', p.name || ' ' || p.description || ' ' || COALESCE(b.name, '')) @@ plainto_tsquery('english', %s) OR "
-            "p.name ILIKE %s OR "
-            "p.description ILIKE %s OR "
-            "b.name ILIKE %s OR "
-            "p.type::text ILIKE %s OR "
-            "similarity(p.name, %s) > 0.2 OR "
-            "similarity(p.description, %s) > 0.2 OR "
-            "similarity(b.name, %s) > 0.2)"
+
+    return search_terms, price_value, price_operator
+
+
+# Combined relevance score:
+#   ts_rank_cd over the weighted search_vector (normalised to rank / (rank + 1))
+#   + best trigram similarity of name, description and brand name
+#   + RANK_WEIGHT * rank_if / (rank_if + 1) so popular products win close calls
+# Joined laterally so the search text is bound once (params: search text x4,
+# ahead of the WHERE params) and select list, ORDER BY and keyset comparisons
+# share `relevance.score`.
+RANK_WEIGHT = 0.25
+RELEVANCE_JOIN = (
+    "CROSS JOIN LATERAL (SELECT "
+    "ts_rank_cd(p.search_vector, plainto_tsquery('english', %s), 32) + GREATEST("
+    "similarity(p.name, %s), similarity(p.description, %s), similarity(l.brand_name, %s)"
+    f") + {RANK_WEIGHT} * GREATEST(l.rank_if, 0) / (GREATEST(l.rank_if, 0) + 1)"
+    " AS score) AS relevance"
+)
+
+# Candidate generation for top-k searches (header dropdown): each branch pulls
+# at most N ids in an index-provided order, so the exact score above is only
+# computed for a bounded set however many rows match:
+#   FTS matches in listing-rank order (listings_rank_idx, stops after N hits)
+#   nearest product names by word similarity (GiST trigram KNN on `term <<-> name`)
+#   best-ranked products of matching brands (listings_brand_rank_idx)
+#   best-ranked products with a matching interned type (listings_type_ids_gin)
+# Params: search text, N, search text, N, ILIKE pattern, search text, N, ILIKE pattern, N.
+CANDIDATES_JOIN = """JOIN (
+                (SELECT cl.id FROM product_listings cl JOIN products cp ON cp.id = cl.id
+                 WHERE cp.search_vector @@ plainto_tsquery('english', %s)
+                 ORDER BY cl.rank_if DESC LIMIT %s)
+                UNION
+                (SELECT id FROM products ORDER BY %s <<-> name LIMIT %s)
+                UNION
+                (SELECT id FROM product_listings
+                 WHERE brand_id = ANY(ARRAY(SELECT id FROM brands WHERE name ILIKE %s OR name %% %s))
+                 ORDER BY rank_if DESC LIMIT %s)
+                UNION
+                (SELECT id FROM product_listings
+                 WHERE type_ids && ARRAY(SELECT id::integer FROM product_types WHERE name ILIKE %s)
+                 ORDER BY rank_if DESC LIMIT %s)
+            ) AS candidates ON candidates.id = l.id"""
+
+
+def _relevance_plan_parts(search_text: str) -> tuple:
+    """
+    Plan pieces for relevance ordering (relevance_score, then rank).
+
+    Returns:
+        (select_item, joins, join_params, order)
+    """
+    order = (OrderKey("relevance.score", True, column='relevance_score', cast='double precision'),) + RANK_ORDER
+    return "relevance.score AS relevance_score", SEARCH_JOINS + (RELEVANCE_JOIN,), (search_text,) * 4, order
+
+
+def _candidate_params(search_text: str, candidates: int) -> tuple:
+    pattern = f'%{search_text}%'
+    return (
+        search_text, candidates, search_text, candidates,
+        pattern, search_text, candidates, pattern, candidates,
+    )
+
+
+COUNT_EXACT = 'exact'
+COUNT_CAPPED = 'capped'
+
+
+def _cached_results(plan: SearchPlan) -> tuple:
+    """
+    The plan's ordered (id, order key values) entries and total from the
+    result cache, running id_list_sql on a miss. At most
+    PRODUCT_SEARCH_RESULT_CACHE_MAX_IDS entries are kept per plan.
+    """
+    key = result_cache.result_key(plan)
+    cached = result_cache.get_results(key)
+    if cached is not None:
+        return cached
+    with connection.cursor() as cursor:
+        prepared_statements.execute(
+            cursor, plan.id_list_sql, plan.id_list_params(settings.PRODUCT_SEARCH_RESULT_CACHE_MAX_IDS)
         )
-        params.extend([
-            search_text,  # FTS query (prioritized)
-            f'%{search_text}%', f'%{search_text}%', f'%{search_text}%',  # ILIKE params (exact matches)
-            f'%{search_text}%',  # type search
-            search_text, search_text, search_text,  # similarity params (with higher threshold)
-        ])
-        
-        # Also search individual terms for better matching
-        # Use higher threshold (0.2) for individual terms to reduce false positives
-        for term in search_terms:
-            if len(term) > 3:
-                search_conditions.append(
-                    "(p.name ILIKE %s OR "
-                    "p.description ILIKE %s OR "
-                    "similarity(p.name, %s) > 0.2 OR "
-                    "similarity(p.description, %s) > 0.2)"
-                )
-                params.extend([f'%{term}%', f'%{term}%', term, term])
+        rows = cursor.fetchall()
+    entries = [(row[0], tuple(row[1:-1])) for row in rows]
+    total = rows[0][-1] if rows else 0
+    result_cache.set_results(key, entries, total)
+    return entries, total
+
+
+def _hydrate(plan: SearchPlan, entries: list) -> tuple:
+    """
+    List-card rows for cached entries, in entry order, with the plan's
+    order-key columns (e.g. relevance_score) filled from the cache.
     
-    if search_conditions:
-        where_conditions.append(f"({' OR '.join(search_conditions)})")
+    Returns:
+        (columns, rows)
+    """
+    with connection.cursor() as cursor:
+        prepared_statements.execute(cursor, HYDRATE_SQL, ([product_id for product_id, _keys in entries],))
+        columns = [col[0] for col in cursor.description]
+        by_id = {row[0]: row for row in cursor.fetchall()}
+    extra = [(index, column) for index, column in enumerate(plan.order_columns) if column not in columns]
+    rows = [
+        by_id[product_id] + tuple(keys[index] for index, _column in extra)
+        for product_id, keys in entries if product_id in by_id
+    ]
+    return columns + [column for _index, column in extra], rows
+
+
+def fetch_page(plan: SearchPlan, page_size: int, offset: int, count_mode: str = COUNT_EXACT) -> tuple:
+    """
+    Fetch one page of a plan together with its total in a single round trip.
     
-    # Price filter from slug
-    if price_value is not None and price_operator:
-        if price_operator == 'lt':
-            where_conditions.append("p.price < %s")
-            params.append(price_value)
-        elif price_operator == 'gt':
-            where_conditions.append("p.price > %s")
-            params.append(price_value)
+    With the result cache enabled, a page within the cached id list costs the
+    catalog version read (once per request, cache.py), one cache read and one
+    hydration query by id; deeper pages use the SQL below.
     
-    # Apply additional filters from query parameters
-    if filters:
-        # Availability filter
-        if 'available' in filters and filters['available'] is not None:
-            if filters['available']:
-                where_conditions.append("p.current_stock > 0 AND p.status = 'available'")
-            else:
-                where_conditions.append("(p.current_stock = 0 OR p.status = 'unavailable')")
-        
-        # Price range filters
-        if 'min_price' in filters and filters['min_price'] is not None:
-            where_conditions.append("p.price >= %s")
-            params.append(float(filters['min_price']))
-        if 'max_price' in filters and filters['max_price'] is not None:
-            where_conditions.append("p.price <= %s")
-            params.append(float(filters['max_price']))
-        
-        # Product type filter (type is a JSON array)
-        if 'product_type' in filters and filters['product_type']:
-            type_conditions = []
-            for product_type in filters['product_type']:
-                # Use JSON containment operator for exact match in array
-                # Also use ILIKE as fallback for partial matching
-                type_conditions.append("(p.type @> %s::jsonb OR p.type::text ILIKE %s)")
-                # JSON array format: ["Air Freshener"]
-                import json
-                params.append(json.dumps([product_type]))
-                params.append(f'%{product_type}%')
-            if type_conditions:
-                where_conditions.append(f"({' OR '.join(type_conditions)})")
-        
-        # Brand filter
-        if 'brand' in filters and filters['brand']:
-            brand_conditions = []
-            for brand_name in filters['brand']:
-                # brand_name is already decoded from views.py, but ensure it's a string
-                brand_name_clean = str(brand_name).strip()
-                if brand_name_clean:
-                    brand_conditions.append("b.name ILIKE %s")
-                    params.append(f'%{brand_name_clean}%')
-            if brand_conditions:
-                where_conditions.append(f"({' OR '.join(brand_conditions)})")
+    Args:
+        plan: SearchPlan to run
+        page_size: Rows per page
+        offset: Rows to skip
+        count_mode: COUNT_EXACT (window count over all matches) or COUNT_CAPPED
+            (count stops at PRODUCT_SEARCH_COUNT_CAP matches)
     
-    # Build ORDER BY clause based on relevance
-    # Use pg_trgm similarity score for ranking
-    order_by = "COALESCE(pt.rank_if, 0) DESC, p.created_at DESC"
-    similarity_expr = None
-    if search_terms:
-        search_text = ' '.join(search_terms)
-        # Add similarity-based ordering
-        search_text_escaped = search_text.replace("'", "''")
-        similarity_expr = (
-            f"GREATEST("
-            f"similarity(p.name, '{search_text_escaped}'), "
-            f"similarity(p.description, '{search_text_escaped}'), "
-            f"similarity(b.name, '{search_text_escaped}')"
-            f")"
-        )
-        order_by = "similarity_score DESC, COALESCE(pt.rank_if, 0) DESC, p.created_at DESC"
+    Returns:
+        (columns, rows, total, capped) - `capped` is True when the real total exceeds the cap
+    """
+    cap = settings.PRODUCT_SEARCH_COUNT_CAP
+    if result_cache.result_cache_enabled():
+        entries, total = _cached_results(plan)
+        if offset + page_size <= len(entries) or len(entries) >= total:
+            page = entries[offset:offset + page_size]
+            columns, rows = _hydrate(plan, page) if page else ([], [])
+            if count_mode == COUNT_CAPPED:
+                return columns, rows, min(total, cap), total > cap
+            return columns, rows, total, False
+
+    with connection.cursor() as cursor:
+        if count_mode == COUNT_CAPPED:
+            prepared_statements.execute(cursor, plan.capped_page_sql, plan.capped_page_params(page_size, offset, cap))
+        else:
+            prepared_statements.execute(cursor, plan.counted_page_sql, plan.page_params(page_size, offset))
+        columns = [col[0] for col in cursor.description][:-1]
+        rows = cursor.fetchall()
+        if rows:
+            total = rows[0][-1]
+            rows = [row[:-1] for row in rows]
+        elif offset:
+            # Past the last page: no row carries the window count, count separately
+            if count_mode == COUNT_CAPPED:
+                prepared_statements.execute(cursor, plan.capped_count_sql, plan.params + (cap + 1,))
+            else:
+                prepared_statements.execute(cursor, plan.count_sql, plan.params)
+            total = cursor.fetchone()[0]
+        else:
+            total = 0
+    if count_mode == COUNT_CAPPED:
+        return columns, rows, min(total, cap), total > cap
+    return columns, rows, total, False
+
+
+def fetch_keyset_page(plan: SearchPlan, page_size: int, after: tuple) -> tuple:
+    """
+    Fetch the rows that follow a cursor position.
     
-    # Build SQL query
-    where_clause = ' AND '.join(where_conditions) if where_conditions else 'TRUE'
+    Args:
+        plan: SearchPlan to run
+        page_size: Rows per page
+        after: ORDER BY key values of the last row already seen
     
-    # Use explicit column list
-    select_fields = (
-        "p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-        "p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-        "pt.rank_if"
-    )
-    if similarity_expr:
-        select_fields = f"{select_fields}, {similarity_expr} AS similarity_score"
+    Returns:
+        (columns, rows, has_next)
+    """
+    with connection.cursor() as cursor:
+        prepared_statements.execute(cursor, plan.keyset_page_sql, plan.keyset_page_params(after, page_size + 1))
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+    return columns, rows[:page_size], len(rows) > page_size
+
+
+def fetch_rows(plan: SearchPlan) -> tuple:
+    """
+    Fetch every row of a plan (up to its `limit`).
     
-    sql_query = f"""
-        SELECT {select_fields}
-        FROM products p
-        LEFT JOIN brands b ON p.brand_id = b.id
-        LEFT JOIN product_tags pt ON p.id = pt.product_id
-        WHERE {where_clause}
-        ORDER BY {order_by}
+    Returns:
+        (columns, rows)
+    """
+    if result_cache.result_cache_enabled() and plan.limit is not None:
+        entries, total = _cached_results(plan)
+        if plan.limit <= len(entries) or len(entries) >= total:
+            page = entries[:plan.limit]
+            return _hydrate(plan, page) if page else ([], [])
+
+    with connection.cursor() as cursor:
+        prepared_statements.execute(cursor, plan.sql, plan.sql_params)
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+    return columns, rows
+
+
+def fetch_facets(plan: SearchPlan, buckets: int = None) -> dict:
     """
+    Facet counts for everything a plan matches (not just the current page).
+    
+    Args:
+        plan: SearchPlan whose WHERE (slug/search terms and filters) defines the candidate set
+        buckets: Number of equal-width price histogram buckets (default PRODUCT_FACET_PRICE_BUCKETS)
     
+    Returns:
+        {
+            'brand': [(name, count)], 'type': [(type, count)] - most common first,
+            'availability': {'in_stock': n, 'out_of_stock': n},
+            'price': {'min': Decimal, 'max': Decimal, 'histogram': [(low, high, count)]},
+        }
+    """
+    buckets = buckets or settings.PRODUCT_FACET_PRICE_BUCKETS
+    with connection.cursor() as cursor:
+        prepared_statements.execute(cursor, plan.facet_sql, plan.facet_params(buckets))
+        rows = cursor.fetchall()
+
+    grouped = {'brand': [], 'type': [], 'availability': [], 'price': [], 'total': []}
+    for facet, value, count, min_price, max_price in rows:
+        grouped[facet].append((value, count, min_price, max_price))
+
+    def most_common(entries):
+        return [(value, count) for value, count, _low, _high in sorted(entries, key=lambda e: (-e[1], e[0] or ''))]
+
+    availability = {value: count for value, count, _low, _high in grouped['availability']}
+    _total, total_count, min_price, max_price = grouped['total'][0] if grouped['total'] else (None, 0, None, None)
+    histogram = []
+    if total_count:
+        counts = {int(value): count for value, count, _low, _high in grouped['price']}
+        histogram = price_histogram(min_price, max_price, counts, buckets)
+
     return {
-        'sql_query': sql_query,
-        'params': params,
-        'order_by': order_by,
+        'brand': most_common(entry for entry in grouped['brand'] if entry[0] is not None),
+        'type': most_common(grouped['type']),
+        'availability': {'in_stock': availability.get('true', 0), 'out_of_stock': availability.get('false', 0)},
+        'price': {'min': min_price, 'max': max_price, 'histogram': histogram},
     }
 
 
-def get_search_query(query: str, limit: int = 8) -> dict:
+def price_histogram(min_price: Decimal, max_price: Decimal, counts: dict, buckets: int) -> list:
     """
-    Build PostgreSQL FTS + pg_trgm search query for products and suggestions.
+    Equal-width price buckets between the lowest and highest matching price.
     
     Args:
-        query: Search query string
-        limit: Maximum number of results to return
+        counts: Match count per 1-based bucket number (width_bucket numbering)
     
     Returns:
-        dict with 'sql_query' (SQL string), 'params' (query parameters), 
-        'order_by' (ORDER BY clause), and metadata
+        [(low, high, count)], a single bucket when every price is the same
     """
-    if not query or len(query.strip()) < 1:
-        return {
-            'sql_query': "SELECT p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, p.type, p.current_stock, p.status, p.created_at, p.updated_at, pt.rank_if FROM products p LEFT JOIN brands b ON p.brand_id = b.id LEFT JOIN product_tags pt ON p.id = pt.product_id WHERE FALSE",
-            'params': [],
-            'order_by': '',
-        }
+    bucket_count = 1 if min_price == max_price else buckets
+    width = (max_price - min_price) / bucket_count
+    cent = Decimal('0.01')
+    histogram = []
+    for bucket in range(1, bucket_count + 1):
+        low = (min_price + width * (bucket - 1)).quantize(cent)
+        high = max_price if bucket == bucket_count else (min_price + width * bucket).quantize(cent)
+        histogram.append((low, high, counts.get(bucket, 0)))
+    return histogram
+
+
+def get_collection_search_query(
+    slug: str, filters: dict = None, sort: str = None, collection_id: int = None,
+) -> SearchPlan:
+    """
+    Build PostgreSQL FTS + pg_trgm search plan from a slug.
+    Relies purely on PostgreSQL's FTS and pg_trgm for fuzzy matching.
     
-    search_text = query.strip()
-    where_conditions = []
-    params = []
+    Args:
+        slug: Collection slug (e.g., 'cooking-condiments', 'gifts-under-100', 'whats-hot', 'new-stuff')
+        filters: Optional query-parameter filters (available, min_price, max_price, product_type, brand, brand_id)
+        sort: Optional sort key from SORT_ORDERS; unknown values keep the collection's default order
+        collection_id: Registered collection whose materialised membership replaces the
+            live slug search (see collection_registry.py)
     
+    Returns:
+        Cached SearchPlan for the normalised (slug, filters, sort, collection)
+    """
+    return _collection_plan(
+        slug.lower(), normalize_filters(filters), sort if sort in SORT_ORDERS else None, collection_id,
+    )
+
+
+def _text_match_condition(search_text: str) -> tuple:
+    """
+    Match predicate for a whole search text, shared by searches and collection slugs.
+    FTS against the stored, GIN-indexed search_vector and ILIKE first; trigram
+    similarity on name and brand, word similarity on description as fallbacks
+    (the `%` / `<%` operators use the per-connection thresholds, see
+    signals.configure_trigram_thresholds, so the GIN trigram indexes apply).
+
+    Returns:
+        (sql, params)
+    """
+    sql = (
+        "(p.search_vector @@ plainto_tsquery('english', %s) OR "
+        "p.name ILIKE %s OR "
+        "p.description ILIKE %s OR "
+        f"{BRAND_MATCH_SQL} OR "
+        "p.type::text ILIKE %s OR "
+        "p.name %% %s OR "
+        "%s <%% p.description)"
+    )
+    pattern = f'%{search_text}%'
+    return sql, [search_text, pattern, pattern, pattern, search_text, pattern, search_text, search_text]
+
+
+def _word_match_condition(word: str) -> tuple:
+    """Match predicate for one word (over 3 characters) of a search text or slug: (sql, params)"""
+    sql = (
+        "(p.name ILIKE %s OR "
+        "p.description ILIKE %s OR "
+        f"{BRAND_MATCH_SQL} OR "
+        "p.name %% %s OR "
+        "%s <%% p.description)"
+    )
+    pattern = f'%{word}%'
+    return sql, [pattern, pattern, pattern, word, word, word]
+
+
+@_plan_cache
+def _collection_plan(slug_lower: str, filter_key: tuple, sort: Optional[str], collection_id: Optional[int]) -> SearchPlan:
+    filter_conditions, filter_params = _filter_conditions(filter_key)
+
+    # Registered collection: members and default order come from the membership table
+    if collection_id is not None:
+        return SearchPlan(
+            select=BASE_SELECT,
+            where=tuple(filter_conditions),
+            params=(collection_id,) + tuple(filter_params),
+            order=SORT_ORDERS.get(sort, MEMBERSHIP_ORDER),
+            joins=(MEMBERSHIP_JOIN,),
+            collection_id=collection_id,
+        )
+
+    # Handle special collection slugs: whats-hot and new-stuff
+    if slug_lower == 'whats-hot':
+        where_conditions = ["l.hot"] + filter_conditions
+        params = filter_params
+        order = (OrderKey("l.hot_if", True),) + RANK_ORDER[1:]
+        select = BASE_SELECT
+    elif slug_lower == 'new-stuff':
+        where_conditions = ["l.new"] + filter_conditions
+        params = filter_params
+        order = (OrderKey("l.new_if", True),) + RANK_ORDER[1:]
+        select = BASE_SELECT
+    else:
+        # Regular collection slug handling
+        search_terms, price_value, price_operator = parse_slug(slug_lower)
+        where_conditions = []
+        params = []
+
+        # Build search conditions using PostgreSQL FTS and pg_trgm
+        # Best practice: Prioritize FTS (more semantic, fewer false positives)
+        # Use the pg_trgm `%` / `<%` operators (thresholds set per connection, see
+        # signals.configure_trigram_thresholds) so the GIN trigram indexes apply
+        # Use ILIKE for exact substring matches (most reliable)
+        search_conditions = []
+
+        if search_terms:
+            # Combine search terms
+            search_text = ' '.join(search_terms)
+
+            # Same predicates as a search for the slug text (see _text_match_condition)
+            condition, condition_params = _text_match_condition(search_text)
+            search_conditions.append(condition)
+            params.extend(condition_params)
+
+            # Also search individual terms for better matching
+            for term in search_terms:
+                if len(term) > 3:
+                    condition, condition_params = _word_match_condition(term)
+                    search_conditions.append(condition)
+                    params.extend(condition_params)
+
+        if search_conditions:
+            where_conditions.append(f"({' OR '.join(search_conditions)})")
+
+        # Price filter from slug
+        if price_value is not None and price_operator:
+            if price_operator == 'lt':
+                where_conditions.append("l.price < %s")
+                params.append(price_value)
+            elif price_operator == 'gt':
+                where_conditions.append("l.price > %s")
+                params.append(price_value)
+
+        # Apply additional filters from query parameters
+        where_conditions += filter_conditions
+        params = params + filter_params
+
+        # Order by relevance (pg_trgm similarity) when there are search terms
+        if search_terms:
+            similarity_select, joins, join_params, order = _relevance_plan_parts(' '.join(search_terms))
+            return SearchPlan(
+                select=BASE_SELECT + (similarity_select,),
+                where=tuple(where_conditions),
+                params=join_params + tuple(params),
+                order=SORT_ORDERS.get(sort, order),
+                joins=joins,
+            )
+        select = BASE_SELECT
+        order = RANK_ORDER
+
+    return SearchPlan(
+        select=select,
+        where=tuple(where_conditions),
+        params=tuple(params),
+        order=SORT_ORDERS.get(sort, order),
+    )
+
+
+def get_search_query(query: str, limit: int = None) -> SearchPlan:
+    """
+    Build PostgreSQL FTS + pg_trgm search plan for products and suggestions.
+    
+    Args:
+        query: Search query string
+        limit: Maximum number of results to return (None for no LIMIT, e.g. when paginating)
+    
+    Returns:
+        SearchPlan; the limit-free plan is cached per normalised query. Limits up to
+        PRODUCT_SEARCH_CANDIDATES use the bounded top-k plan (see CANDIDATES_JOIN).
+    """
+    search_text = ' '.join((query or '').split())
+    if limit is not None and limit <= settings.PRODUCT_SEARCH_CANDIDATES:
+        return _top_k_search_plan(search_text).with_limit(limit)
+    return _search_plan(search_text).with_limit(limit)
+
+
+@_plan_cache
+def _top_k_search_plan(search_text: str) -> SearchPlan:
+    """The search plan restricted to index-generated candidates, for short limits"""
+    plan = _search_plan(search_text)
+    if not plan.order or plan.order[0].column != 'relevance_score':
+        # Empty and 1-2 character queries are ordered by rank already
+        return plan
+    return replace(
+        plan,
+        joins=(CANDIDATES_JOIN,) + plan.joins,
+        params=_candidate_params(search_text, settings.PRODUCT_SEARCH_CANDIDATES) + plan.params,
+    )
+
+
+@_plan_cache
+def _search_plan(search_text: str) -> SearchPlan:
+    if not search_text:
+        return SearchPlan(select=BASE_SELECT, where=('FALSE',), params=(), order=RANK_ORDER)
+
+    params = []
+
     # For very short queries (1-2 chars), use ILIKE only (similarity threshold too strict)
     # For longer queries, use FTS + ILIKE + similarity
     is_short_query = len(search_text) <= 2
@@ -349,7 +900,7 @@ def get_search_query(query: str, limit: int = 8) -> dict:
         search_conditions = [
             "p.name ILIKE %s OR "
             "p.description ILIKE %s OR "
-            "b.name ILIKE %s OR "
+            "p.brand_id = ANY(ARRAY(SELECT id FROM brands WHERE name ILIKE %s)) OR "
             "p.type::text ILIKE %s"
         ]
         params.extend([
@@ -357,83 +908,33 @@ def get_search_query(query: str, limit: int = 8) -> dict:
             f'%{search_text}%',
         ])
     else:
-        # Longer query: Use FTS + ILIKE + similarity
-        search_conditions = [
-            "(to_tsvector('english', p.name || ' ' || p.description || ' ' || COALESCE(b.name, '')) @@ plainto_tsquery('english', %s) OR "
-            "p.name ILIKE %s OR "
-            "p.description ILIKE %s OR "
-            "b.name ILIKE %s OR "
-            "p.type::text ILIKE %s OR "
-            "similarity(p.name, %s) > 0.2 OR "
-            "similarity(p.description, %s) > 0.2 OR "
-            "similarity(b.name, %s) > 0.2)"
-        ]
-        params.extend([
-            search_text,
-            f'%{search_text}%', f'%{search_text}%', f'%{search_text}%',
-            f'%{search_text}%',
-            search_text, search_text, search_text,
-        ])
-        
+        # Longer query: Use FTS (stored search_vector) + ILIKE + similarity
+        condition, condition_params = _text_match_condition(search_text)
+        search_conditions = [condition]
+        params.extend(condition_params)
+
         # Also search individual words (only for words longer than 3 chars)
-        words = search_text.split()
-        for word in words:
+        for word in search_text.split():
             if len(word) > 3:
-                search_conditions.append(
-                    "(p.name ILIKE %s OR "
-                    "p.description ILIKE %s OR "
-                    "b.name ILIKE %s OR "
-                    "similarity(p.name, %s) > 0.2 OR "
-                    "similarity(p.description, %s) > 0.2 OR "
-                    "similarity(b.name, %s) > 0.2)"
-                )
-                params.extend([f'%{word}%', f'%{word}%', f'%{word}%', word, word, word])
-    
-    where_conditions.append(f"({' OR '.join(search_conditions)})")
-    
-    where_clause = ' AND '.join(where_conditions)
-    
+                condition, condition_params = _word_match_condition(word)
+                search_conditions.append(condition)
+                params.extend(condition_params)
+
+    where_conditions = (f"({' OR '.join(search_conditions)})",)
+
     # For short queries, don't use similarity for ordering (it will be too low)
     if is_short_query:
-        order_by = "COALESCE(pt.rank_if, 0) DESC, p.created_at DESC"
-        select_fields = (
-            f"p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-            f"p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-            f"pt.rank_if"
-        )
-    else:
-        # Build similarity expression for ordering
-        search_text_escaped = search_text.replace("'", "''")
-        similarity_expr = (
-            f"GREATEST("
-            f"similarity(p.name, '{search_text_escaped}'), "
-            f"similarity(p.description, '{search_text_escaped}'), "
-            f"similarity(b.name, '{search_text_escaped}')"
-            f")"
+        return SearchPlan(
+            select=BASE_SELECT, where=where_conditions, params=tuple(params), order=RANK_ORDER, joins=SEARCH_JOINS,
         )
-        order_by = "similarity_score DESC, COALESCE(pt.rank_if, 0) DESC, p.created_at DESC"
-        select_fields = (
-            f"p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-            f"p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-            f"pt.rank_if, {similarity_expr} AS similarity_score"
-        )
-    
-    sql_query = f"""
-        SELECT {select_fields}
-        FROM products p
-        LEFT JOIN brands b ON p.brand_id = b.id
-        LEFT JOIN product_tags pt ON p.id = pt.product_id
-        WHERE {where_clause}
-        ORDER BY {order_by}
-        LIMIT %s
-    """
-    params.append(limit)
-    
-    return {
-        'sql_query': sql_query,
-        'params': params,
-        'order_by': order_by,
-    }
+    similarity_select, joins, join_params, order = _relevance_plan_parts(search_text)
+    return SearchPlan(
+        select=BASE_SELECT + (similarity_select,),
+        where=where_conditions,
+        params=join_params + tuple(params),
+        order=order,
+        joins=joins,
+    )
 
 
 def get_search_suggestions(query: str, limit: int = 8) -> list:
@@ -457,24 +958,111 @@ def get_search_suggestions(query: str, limit: int = 8) -> list:
     with connection.cursor() as cursor:
         if is_short_query:
             # For short queries, use ILIKE only
-            cursor.execute("""
+            prepared_statements.execute(cursor, """
                 SELECT DISTINCT b.name
                 FROM brands b
                 WHERE b.name ILIKE %s
                 ORDER BY b.name
                 LIMIT %s
-            """, [f'%{search_text}%', limit])
+            """, (f'%{search_text}%', limit))
         else:
-            # For longer queries, use ILIKE + similarity
+            # For longer queries, use ILIKE + trigram match (both served by brands_name_trgm)
             # Need to include similarity in SELECT for ORDER BY to work
-            search_text_escaped = search_text.replace("'", "''")
-            cursor.execute(f"""
-                SELECT DISTINCT b.name, similarity(b.name, '{search_text_escaped}') AS sim_score
+            prepared_statements.execute(cursor, """
+                SELECT DISTINCT b.name, similarity(b.name, %s) AS sim_score
                 FROM brands b
-                WHERE b.name ILIKE %s OR similarity(b.name, %s) > 0.2
+                WHERE b.name ILIKE %s OR b.name %% %s
                 ORDER BY sim_score DESC, b.name
                 LIMIT %s
-            """, [f'%{search_text}%', search_text, limit])
+            """, (search_text, f'%{search_text}%', search_text, limit))
         
         suggestions = [row[0] for row in cursor.fetchall()]
         return suggestions
+
+
+# Per query word: keep it when it is a dictionary word, a stop word or matches
+# any product through FTS (descriptions included); otherwise take the closest
+# dictionary word (GIN trigram index on search_lexemes), most frequent first.
+# Params: words array, similarity threshold.
+CORRECTION_SQL = """
+    SELECT q.word,
+           CASE WHEN EXISTS (SELECT 1 FROM search_lexemes s WHERE s.word = q.word)
+                  OR numnode(plainto_tsquery('english', q.word)) = 0
+                  OR EXISTS (SELECT 1 FROM products p WHERE p.search_vector @@ plainto_tsquery('english', q.word))
+                THEN q.word
+                ELSE best.word
+           END
+    FROM unnest(%s::text[]) WITH ORDINALITY AS q(word, position)
+    LEFT JOIN LATERAL (
+        SELECT s.word
+        FROM search_lexemes s
+        WHERE s.word %% q.word AND similarity(s.word, q.word) >= %s
+        ORDER BY similarity(s.word, q.word) DESC, s.frequency DESC, s.word
+        LIMIT 1
+    ) AS best ON TRUE
+    ORDER BY q.position
+"""
+
+
+def correct_query(query: str) -> Optional[str]:
+    """
+    "Did you mean" correction of misspelled words against the search_lexemes dictionary.
+    Words shorter than 3 letters or containing digits/punctuation are kept as typed;
+    corrections are cached per catalog version like search results.
+    
+    Args:
+        query: Search query string
+    
+    Returns:
+        Corrected query (lower-cased), or None when no word needed correcting
+    """
+    words = (query or '').lower().split()
+    checked = sorted({word for word in words if word.isalpha() and len(word) >= 3})
+    if not checked:
+        return None
+    
+    key = None
+    if result_cache.result_cache_enabled():
+        key = result_cache.correction_key(' '.join(words))
+        cached = result_cache.get_correction(key)
+        if cached is not None:
+            return cached or None
+    
+    with connection.cursor() as cursor:
+        prepared_statements.execute(
+            cursor, CORRECTION_SQL, (checked, settings.PRODUCT_SEARCH_CORRECTION_SIMILARITY)
+        )
+        corrections = {word: corrected for word, corrected in cursor.fetchall() if corrected}
+    
+    corrected_words = [corrections.get(word, word) for word in words]
+    corrected = ' '.join(corrected_words) if corrected_words != words else None
+    if key is not None:
+        result_cache.set_correction(key, corrected or '')
+    return corrected
+
+
+def fetch_neighbours(product_id: int, limit: int = 8) -> list:
+    """
+    Precomputed neighbours of a product, most similar first.
+    
+    Returns:
+        Row dicts with the BASE_SELECT columns (empty when the product has none stored)
+    """
+    return _fetch_listing_rows(NEIGHBOURS_SQL, [product_id, limit])
+
+
+def fetch_bought_together(product_id: int, limit: int = 8) -> list:
+    """
+    Products most often bought together with a product, strongest association first.
+    
+    Returns:
+        Row dicts with the BASE_SELECT columns (empty when none are stored)
+    """
+    return _fetch_listing_rows(BOUGHT_TOGETHER_SQL, [product_id, limit])
+
+
+def _fetch_listing_rows(sql: str, params: list) -> list:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,203 @@
+"""
+Signal receivers for the product app
+"""
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.utils import timezone
+from django.dispatch import receiver
+from apps.brand.models import Brand
+from .autocomplete import suggestion_index
+from .cache import (
+    bump_brand_version_on_commit, bump_catalog_version_on_commit, bump_collections_version_on_commit, end_request,
+    start_request,
+)
+from .collection_registry import record_catalog_write
+from .home_feed import home_feed_rebuilder
+from .memory_search import memory_index
+from .models import Collection, CollectionMembership, Product, ProductDetailPic, ProductTag
+from .statements import prepared_statements
+
+
+# Version counters (cache.py) are read once per request
+request_started.connect(start_request, dispatch_uid='product_cache_versions_start')
+request_finished.connect(end_request, dispatch_uid='product_cache_versions_end')
+
+
+@receiver(connection_created)
+def configure_trigram_thresholds(sender, connection, **kwargs):
+    """
+    Apply the configured pg_trgm thresholds to every new PostgreSQL connection.
+    The `%` (similarity) and `<%` (word similarity) operators used by the search
+    builders compare against these session settings, which keeps the predicates
+    index-usable while the cut-off stays configurable.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SET pg_trgm.similarity_threshold = %s; SET pg_trgm.word_similarity_threshold = %s",
+            [settings.PRODUCT_SEARCH_SIMILARITY_THRESHOLD, settings.PRODUCT_SEARCH_WORD_SIMILARITY_THRESHOLD]
+        )
+
+
+@receiver(connection_created)
+def reset_prepared_statements(sender, connection, **kwargs):
+    """A new session starts without prepared statements"""
+    prepared_statements.reset(connection)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Keep the in-process autocomplete index current once the write commits"""
+    transaction.on_commit(lambda: suggestion_index.product_saved(instance))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    product_id = instance.id
+    transaction.on_commit(lambda: suggestion_index.product_deleted(product_id))
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: suggestion_index.brand_saved(instance))
+
+
+@receiver(post_delete, sender=Brand)
+def brand_deleted(sender, instance, **kwargs):
+    brand_id = instance.id
+    transaction.on_commit(lambda: suggestion_index.brand_deleted(brand_id))
+
+
+@receiver(post_save, sender=Product)
+def product_saved_for_memory_search(sender, instance, **kwargs):
+    """Keep the in-memory search index (InMemorySearchBackend) current once the write commits"""
+    product_id = instance.id
+    transaction.on_commit(lambda: memory_index.product_changed(product_id))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted_for_memory_search(sender, instance, **kwargs):
+    product_id = instance.id
+    transaction.on_commit(lambda: memory_index.product_deleted(product_id))
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved_for_memory_search(sender, instance, **kwargs):
+    brand_id = instance.id
+    transaction.on_commit(lambda: memory_index.brand_changed(brand_id))
+
+
+@receiver(post_delete, sender=Brand)
+def brand_deleted_for_memory_search(sender, instance, **kwargs):
+    brand_id = instance.id
+    transaction.on_commit(lambda: memory_index.brand_deleted(brand_id))
+
+
+@receiver(post_save, sender=ProductTag)
+@receiver(post_delete, sender=ProductTag)
+def tag_changed_for_memory_search(sender, instance, **kwargs):
+    """Tag flags and scores live on the product's document"""
+    product_id = instance.product_id
+    transaction.on_commit(lambda: memory_index.product_changed(product_id))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=ProductTag)
+@receiver(post_delete, sender=ProductTag)
+def invalidate_cached_results(sender, **kwargs):
+    """
+    Move cached search/collection results to a new catalog version once the
+    transaction commits; until then its own reads use a private version and
+    miss the cache (cache.py)
+    """
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def invalidate_brand_names(sender, **kwargs):
+    """Workers reload their brand name-to-id map (brand_resolver.py) once the write commits"""
+    bump_brand_version_on_commit()
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def invalidate_collection_registry(sender, **kwargs):
+    """The registered-slug map is cached per collections version"""
+    bump_collections_version_on_commit()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=ProductTag)
+@receiver(post_delete, sender=ProductTag)
+def mark_collections_stale(sender, instance, **kwargs):
+    """Collections a committed catalog write could change re-materialise their members (one check per transaction)"""
+    if sender is Brand:
+        record_catalog_write(brand_ids=(instance.id,))
+    elif sender is ProductTag:
+        record_catalog_write(product_ids=(instance.product_id,))
+    else:
+        record_catalog_write(product_ids=(instance.id,))
+
+
+@receiver(pre_delete, sender=Product)
+def mark_member_collections_stale(sender, instance, **kwargs):
+    """A deleted product leaves the collections holding it (its memberships cascade with it)"""
+    record_catalog_write(collection_ids=CollectionMembership.objects.filter(
+        product_id=instance.id,
+    ).values_list('collection_id', flat=True))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=ProductTag)
+@receiver(post_delete, sender=ProductTag)
+def rebuild_home_feed(sender, **kwargs):
+    """Have the home feed for the new catalog version ready before the next visitor"""
+    transaction.on_commit(home_feed_rebuilder.schedule)
+
+
+@receiver(post_save, sender=ProductTag)
+@receiver(post_delete, sender=ProductTag)
+def touch_tagged_product(sender, instance, **kwargs):
+    """
+    Product.updated_at validates cached product details (conditional.py), so
+    it moves whenever anything in the detail payload changes. QuerySet.update()
+    sends no signals, so touching never recurses.
+    """
+    Product.objects.filter(id=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Brand)
+def touch_brand_products(sender, instance, created, **kwargs):
+    if not created:
+        Product.objects.filter(brand_id=instance.id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProductDetailPic)
+@receiver(pre_delete, sender=ProductDetailPic)
+def touch_pictured_products(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        Product.objects.filter(detail_pics=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Product.detail_pics.through)
+def touch_product_pictures(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Picture.products.clear(): the linked products are only known beforehand
+        Product.objects.filter(detail_pics=instance).update(updated_at=timezone.now())
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        product_ids = pk_set if reverse else [instance.id]
+        if product_ids:
+            Product.objects.filter(id__in=product_ids).update(updated_at=timezone.now())
@@ -0,0 +1,123 @@
+"""
+Server-side prepared statements for the catalog search queries.
+
+The collection and search SQL comes in a small number of shapes that differ
+only by their bound parameters. Each shape is PREPAREd once per database
+session and run with EXECUTE afterwards, so PostgreSQL parses and plans it
+once instead of on every request.
+
+- statements are tracked per connection (DatabaseWrapper) in an LRU of at most
+  PRODUCT_SEARCH_PREPARED_STATEMENT_LIMIT entries; evicted ones are DEALLOCATEd
+- the registry is reset whenever Django opens a new connection (see signals.py),
+  so statements only pay off on persistent connections; with CONN_MAX_AGE=0
+  every request gets a new session and the plain SQL runs instead
+- PRODUCT_SEARCH_PREPARED_STATEMENTS=False runs the plain SQL instead, e.g.
+  behind a transaction-pooling PgBouncer where sessions are not sticky
+- stats() reports hit/miss counts for this worker process
+"""
+import itertools
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+# `%%` is a literal percent (pg_trgm operators), `%s` a bound parameter
+_PLACEHOLDER_RE = re.compile(r'%%|%s')
+
+
+def to_positional(sql: str) -> str:
+    """Rewrite a DB-API (`%s`) query to PostgreSQL `$n` parameters for PREPARE"""
+    numbers = itertools.count(1)
+
+    def substitute(match):
+        return '%' if match.group() == '%%' else f'${next(numbers)}'
+
+    return _PLACEHOLDER_RE.sub(substitute, sql)
+
+
+class PreparedStatementRegistry:
+    """Prepares and executes query shapes per connection, counting plan reuse"""
+
+    attribute = '_product_prepared_statements'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def enabled(connection) -> bool:
+        return (
+            connection.vendor == 'postgresql'
+            and settings.PRODUCT_SEARCH_PREPARED_STATEMENTS
+            and connection.settings_dict.get('CONN_MAX_AGE') != 0
+        )
+
+    def reset(self, connection):
+        """Forget the statements of `connection` (its session is new or gone)"""
+        setattr(connection, self.attribute, OrderedDict())
+
+    def _statements(self, connection) -> OrderedDict:
+        statements = getattr(connection, self.attribute, None)
+        if statements is None:
+            statements = OrderedDict()
+            setattr(connection, self.attribute, statements)
+        return statements
+
+    def execute(self, cursor, sql: str, params=()):
+        """
+        Run `sql` with `params` on `cursor`, via a prepared statement when enabled.
+
+        Args:
+            cursor: Cursor of django.db.connection
+            sql: Query with `%s` placeholders (and `%%` for a literal percent)
+            params: Parameter values, all user input goes here
+        """
+        connection = cursor.db
+        if not self.enabled(connection):
+            cursor.execute(sql, params)
+            return
+
+        statements = self._statements(connection)
+        name = statements.get(sql)
+        if name is None:
+            with self._lock:
+                self.misses += 1
+                name = f'product_stmt_{next(self._names)}'
+            cursor.execute(f'PREPARE {name} AS {to_positional(sql)}')
+            statements[sql] = name
+            while len(statements) > settings.PRODUCT_SEARCH_PREPARED_STATEMENT_LIMIT:
+                _evicted_sql, evicted = statements.popitem(last=False)
+                cursor.execute(f'DEALLOCATE {evicted}')
+                with self._lock:
+                    self.evictions += 1
+        else:
+            statements.move_to_end(sql)
+            with self._lock:
+                self.hits += 1
+
+        if params:
+            cursor.execute(f"EXECUTE {name}({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f'EXECUTE {name}')
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def prepared(self, connection) -> list:
+        """SQL of the statements currently prepared on `connection`, least recently used first"""
+        return list(self._statements(connection))
+
+
+prepared_statements = PreparedStatementRegistry()
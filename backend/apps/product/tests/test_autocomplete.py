@@ -0,0 +1,87 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.brand.models import Brand
+from apps.product.autocomplete import SuggestionIndex, suggestion_index
+from apps.product.models import Product
+
+
+class SuggestionIndexTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Saltwater Provisions', description='Test')
+        self.product = Product.objects.create(
+            name='Smoked Chilli Oil',
+            brand=self.brand,
+            description='A fiery condiment for noodles',
+            price=14.50,
+            profile_pic_link='https://example.com/oil.jpg',
+            type=['Condiment', 'Gift Box'],
+            current_stock=4,
+            status='available'
+        )
+        self.index = SuggestionIndex()
+
+    def tearDown(self):
+        suggestion_index.reset()
+
+    def test_cold_index_returns_none(self):
+        """Test a cold index signals callers to fall back to SQL"""
+        self.assertIsNone(self.index.suggest('salt'))
+
+    def test_prefix_suggestions_cover_brands_products_and_types(self):
+        """Test whole-string and word prefixes across all suggestion kinds"""
+        self.index.rebuild()
+        self.assertEqual(self.index.suggest('salt'), ['Saltwater Provisions'])
+        self.assertEqual(self.index.suggest('chil'), ['Smoked Chilli Oil'])
+        self.assertEqual(self.index.suggest('gift'), ['Gift Box'])
+        self.assertEqual(self.index.suggest('condi'), ['Condiment'])
+
+    def test_fuzzy_suggestions_tolerate_typos(self):
+        """Test trigram matching finds misspelled names"""
+        self.index.rebuild()
+        self.assertIn('Saltwater Provisions', self.index.suggest('saltwatr provisons'))
+        self.assertEqual(self.index.suggest('zzzz'), [])
+
+    def test_writes_leave_published_containers_untouched(self):
+        """Test writes swap the prefix table and postings a lock-free reader may hold"""
+        self.index.rebuild()
+        state = self.index._state
+        prefixes, postings = state.prefixes, state.grams['  c']
+        before = (list(prefixes), set(postings))
+        self.index.product_saved(self.product.__class__(
+            id=self.product.id, name='Candied Citrus', type=['Confectionery'],
+        ))
+        self.assertEqual((list(prefixes), set(postings)), before)
+        self.assertIsNot(state.prefixes, prefixes)
+        self.assertIn('Candied Citrus', self.index.suggest('cand'))
+        self.assertEqual(self.index.suggest('chil'), [])
+
+    def test_index_updates_incrementally_on_commit(self):
+        """Test product and brand writes are applied without a rebuild"""
+        suggestion_index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Truffle Honey'
+            self.product.type = ['Pantry']
+            self.product.save()
+            Brand.objects.create(name='Harbour Pantry', description='Test')
+        self.assertEqual(suggestion_index.suggest('truf'), ['Truffle Honey'])
+        self.assertEqual(suggestion_index.suggest('chil'), [])
+        self.assertEqual(suggestion_index.suggest('gift'), [])
+        self.assertEqual(suggestion_index.suggest('pantry'), ['Pantry', 'Harbour Pantry'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(suggestion_index.suggest('truf'), [])
+
+    def test_search_endpoint_uses_warm_index(self):
+        """Test the search endpoint answers suggestions from the index when warm"""
+        client = APIClient()
+        response = client.get('/api/products/search/?q=chil')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Cold: SQL path suggests brands only
+        self.assertEqual(response.data['suggestions'], [])
+
+        suggestion_index.rebuild()
+        response = client.get('/api/products/search/?q=chil')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['suggestions'], ['Smoked Chilli Oil'])
@@ -0,0 +1,146 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.brand.models import Brand
+from apps.product.cache import catalog_version
+from apps.product.collection_registry import _PendingCatalogWrite, refresh_collection, registered_collection_id
+from apps.product.models import Collection, CollectionMembership, Product
+
+
+@override_settings(PRODUCT_COLLECTION_REFRESH_DELAY=0)
+class CollectionRegistryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # Committed fixtures: on-commit hooks are queued once per transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_fixtures()
+
+    def create_fixtures(self):
+        self.brand = Brand.objects.create(name='Orchard Kitchen', description='Test')
+        self.products = [
+            Product.objects.create(
+                name=f'Orchard Jam {index}',
+                brand=self.brand,
+                description='Small batch preserve',
+                price=10 + index,
+                profile_pic_link='https://example.com/jam.jpg',
+                type=['Pantry'],
+                current_stock=index,
+                status='available'
+            )
+            for index in range(4)
+        ]
+        self.collection = Collection.objects.create(slug='orchard', title='Orchard')
+
+    def ids(self, url):
+        return [product['id'] for product in self.client.get(url).data['results']]
+
+    def refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_collection(self.collection)
+        self.collection.refresh_from_db()
+
+    def test_refresh_materialises_live_order(self):
+        """Test a refreshed collection serves its stored members in the live search order"""
+        live = self.ids('/api/products/collections/orchard/')
+        self.refresh()
+        self.assertFalse(self.collection.stale)
+        self.assertEqual(self.collection.product_count, 4)
+        self.assertEqual(
+            list(CollectionMembership.objects.filter(collection=self.collection)
+                 .order_by('position').values_list('product_id', flat=True)),
+            live,
+        )
+        self.assertEqual(self.ids('/api/products/collections/orchard/'), live)
+
+    def test_filters_and_sorts_apply_to_members(self):
+        """Test query-parameter filters and sorts still apply to a materialised collection"""
+        self.refresh()
+        self.assertEqual(
+            self.ids('/api/products/collections/orchard/?sort=PRICE_REVERSE'),
+            [product.id for product in reversed(self.products)],
+        )
+        self.assertCountEqual(
+            self.ids('/api/products/collections/orchard/?available=true'),
+            [product.id for product in self.products[1:]],
+        )
+
+    def test_catalog_writes_mark_collection_stale(self):
+        """Test committed product writes mark the collection stale until the next refresh"""
+        self.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name='Orchard Cider Vinegar',
+                brand=self.brand,
+                description='Raw vinegar',
+                price=8.00,
+                profile_pic_link='https://example.com/vinegar.jpg',
+                type=['Pantry'],
+                current_stock=3,
+                status='available'
+            )
+        self.collection.refresh_from_db()
+        self.assertTrue(self.collection.stale)
+        self.assertEqual(len(self.ids('/api/products/collections/orchard/')), 4)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('refresh_collections', '--stale', stdout=out)
+        self.assertIn('orchard: 5 products', out.getvalue())
+        self.assertEqual(len(self.ids('/api/products/collections/orchard/')), 5)
+
+    def test_stale_marking_runs_once_per_transaction(self):
+        """Test a transaction with several catalog writes marks collections stale with one statement"""
+        self.refresh()
+        with self.captureOnCommitCallbacks() as callbacks:
+            for product in self.products:
+                product.current_stock += 1
+                product.save()
+        pending = [callback for callback in callbacks if isinstance(callback, _PendingCatalogWrite)]
+        self.assertEqual(len(pending), 1)
+        pending[0]()
+        self.collection.refresh_from_db()
+        self.assertTrue(self.collection.stale)
+
+    def test_unrelated_writes_leave_collection_fresh(self):
+        """Test a committed write to a product outside the collection's search leaves it fresh"""
+        self.refresh()
+        other = Brand.objects.create(name='Harbour Smokehouse', description='Test')
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Smoked Sea Salt',
+                brand=other,
+                description='Oak smoked flakes',
+                price=6.00,
+                profile_pic_link='https://example.com/salt.jpg',
+                type=['Seasoning'],
+                current_stock=2,
+                status='available'
+            )
+            product.current_stock = 5
+            product.save()
+        self.collection.refresh_from_db()
+        self.assertFalse(self.collection.stale)
+
+    def test_refresh_invalidates_only_its_collection(self):
+        """Test a refresh serves the new members without moving the shared catalog version"""
+        self.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Brand.objects.create(name='Harbour Smokehouse', description='Test')
+        self.assertIn(self.products[0].id, self.ids('/api/products/collections/orchard/'))
+        # Bypasses the signals: only the refresh below can drop the product
+        Product.objects.filter(id=self.products[0].id).update(name='Plum Preserve', brand=other)
+        version = catalog_version()
+        self.refresh()
+        self.assertEqual(catalog_version(), version)
+        self.assertNotIn(self.products[0].id, self.ids('/api/products/collections/orchard/'))
+
+    def test_deleted_collection_falls_back_to_live_search(self):
+        """Test a deleted collection leaves the registry once the delete commits"""
+        self.refresh()
+        self.assertEqual(registered_collection_id('orchard'), self.collection.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collection.delete()
+        self.assertIsNone(registered_collection_id('orchard'))
+        self.assertEqual(len(self.ids('/api/products/collections/orchard/')), 4)
@@ -0,0 +1,250 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from apps.authentication.models import User
+from apps.brand.models import Brand
+from apps.cart.models import ShoppingCart
+from apps.order.models import Order
+from apps.product.bought_together import MAX_ORDER_ITEMS
+from apps.product.models import BoughtTogether, BoughtTogetherProgress, Product, ProductListing, ProductTag
+
+
+class SeedCatalogTests(TestCase):
+    def seed(self, *extra):
+        out = StringIO()
+        call_command(
+            'seed_catalog', '--products', '60', '--brands', '4', '--users', '5', '--orders', '8',
+            '--pics', '3', '--batch-size', '25', *extra, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_seed_catalog(self):
+        """Test the generator creates every entity and keeps derived data in sync"""
+        products_before = Product.objects.count()
+        output = self.seed()
+        self.assertIn('Seeded 4 brands, 60 products', output)
+        self.assertEqual(Product.objects.count(), products_before + 60)
+        self.assertEqual(ProductListing.objects.count(), Product.objects.count())
+        self.assertFalse(Product.objects.filter(search_vector__isnull=True).exists())
+        self.assertTrue(ProductTag.objects.exists())
+        product = Product.objects.order_by('-id').first()
+        self.assertTrue(product.type)
+        self.assertEqual(product.detail_pics.count(), 2)
+        self.assertEqual(User.objects.filter(username__startswith='bench-').count(), 5)
+        self.assertEqual(ShoppingCart.objects.count(), 5)
+        self.assertEqual(Order.objects.count(), 8)
+
+    def test_seed_catalog_fast(self):
+        """Test the trigger-less load rebuilds search vectors and listings afterwards"""
+        self.seed('--fast')
+        self.assertEqual(ProductListing.objects.count(), Product.objects.count())
+        self.assertFalse(Product.objects.filter(search_vector__isnull=True).exists())
+
+
+class BenchmarkSearchTests(TestCase):
+    def test_benchmark_report(self):
+        """Test the benchmark replays the mix and writes a comparable JSON report"""
+        brand = Brand.objects.create(name='Benchmark Brand', description='Test')
+        for index in range(5):
+            Product.objects.create(
+                name=f'Benchmark Honey Jar {index}',
+                brand=brand,
+                description='Raw honey',
+                price=10 + index,
+                profile_pic_link='https://example.com/honey.jpg',
+                type=['Pantry'],
+                current_stock=3,
+            )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            out = StringIO()
+            call_command('benchmark_search', '--requests', '40', '--warmup', '4', '--json', path, stdout=out)
+            with open(path) as handle:
+                report = json.load(handle)
+            call_command('benchmark_search', '--requests', '8', '--warmup', '0', '--compare', path, stdout=out)
+
+        self.assertEqual(sum(stats['requests'] for stats in report['endpoints'].values()), 40)
+        for stats in report['endpoints'].values():
+            self.assertEqual(stats['errors'], 0)
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreaterEqual(stats['queries_max'], 1)
+        self.assertIn('p95', out.getvalue())
+        self.assertIn('negative is faster', out.getvalue())
+
+
+class ProductNeighboursTests(TestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name='Neighbour Brand')
+        other_brand = Brand.objects.create(name='Other Neighbour Brand')
+        specs = (
+            ('Smoked Chilli Oil', brand, ['Condiments', 'Pantry']),
+            ('Smoked Chilli Salt', brand, ['Condiments', 'Pantry']),
+            ('Chilli Jam', other_brand, ['Pantry']),
+            ('Fig Candle', other_brand, ['Candles']),
+        )
+        self.products = [
+            Product.objects.create(
+                name=name, brand=product_brand, description='Small batch', price=10.00,
+                profile_pic_link='https://example.com/p.jpg', type=types, current_stock=1, status='available'
+            )
+            for name, product_brand, types in specs
+        ]
+
+    def test_rebuild_neighbours_serves_you_might_like(self):
+        """Test the job stores nearest neighbours by similarity and the endpoint reads them in order"""
+        out = StringIO()
+        call_command('rebuild_product_neighbours', '--k', '2', '--block-size', '3', stdout=out)
+        self.assertIn('Rebuilt product neighbours', out.getvalue())
+        oil, salt, jam, candle = self.products
+
+        neighbours = list(oil.neighbours.order_by('rank').values_list('neighbour_id', 'score'))
+        self.assertEqual([neighbour for neighbour, _score in neighbours], [salt.id, jam.id])
+        self.assertGreater(neighbours[0][1], neighbours[1][1])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{oil.id}/you-might-like/')
+        self.assertEqual([p['id'] for p in response.data], [salt.id, jam.id])
+        self.assertEqual(response.data[0]['brand'], 'Neighbour Brand')
+
+        # Only the brand and description words in common: the brand mate ranks first
+        self.assertEqual(candle.neighbours.order_by('rank').first().neighbour_id, jam.id)
+
+        # Products created after the run fall back to the type-overlap query
+        latest = Product.objects.create(
+            name='Pantry Crackers', brand=candle.brand, description='New', price=5.00,
+            profile_pic_link='https://example.com/p.jpg', type=['Pantry'], current_stock=1, status='available'
+        )
+        response = self.client.get(f'/api/products/{latest.id}/you-might-like/')
+        self.assertCountEqual([p['id'] for p in response.data], [oil.id, salt.id, jam.id])
+
+
+@override_settings(PRODUCT_BOUGHT_TOGETHER_MIN_ORDERS=2)
+class BoughtTogetherTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pairs', email='pairs@example.com', password='TestPass123!')
+        brand = Brand.objects.create(name='Pairs Brand')
+        self.tea, self.pot, self.cups, self.candle = [
+            Product.objects.create(
+                name=name, brand=brand, description='Test', price=10.00,
+                profile_pic_link='https://example.com/p.jpg', current_stock=1, status='available'
+            )
+            for name in ('Pairs Tea', 'Pairs Teapot', 'Pairs Cups', 'Pairs Candle')
+        ]
+
+    def order(self, *products, status='completed'):
+        return Order.objects.create(
+            owner=self.user, amount=10, products={str(p.id): 1 for p in products}, status=status
+        )
+
+    def mine(self, *extra):
+        out = StringIO()
+        call_command('mine_bought_together', '--chunk-size', '2', *extra, stdout=out)
+        return out.getvalue()
+
+    def ids(self, product):
+        return [p['id'] for p in self.client.get(f'/api/products/{product.id}/bought-together/').data]
+
+    def test_mines_new_orders_incrementally(self):
+        """Test pairs are counted once per order, ranked by lift and extended by later runs"""
+        self.order(self.tea, self.pot, self.cups)
+        self.order(self.tea, self.pot)
+        self.order(self.tea, self.cups, self.candle)
+        self.order(self.tea, self.cups)
+        self.order(self.pot, self.cups, self.candle, status='cancelled')
+        self.assertIn('Counted 4 orders', self.mine())
+        self.assertEqual(self.ids(self.pot), [self.tea.id])
+        # Equal lift (both always bought with tea): the pair seen in more orders first
+        self.assertEqual(self.ids(self.tea), [self.cups.id, self.pot.id])
+        self.assertEqual(self.ids(self.candle), [])
+
+        self.order(self.candle, self.cups)
+        self.assertIn('Counted 1 orders', self.mine())
+        self.assertEqual(self.ids(self.candle), [self.cups.id])
+        self.assertIn('Counted 0 orders', self.mine())
+        self.assertIn('Counted 5 orders', self.mine('--full'))
+        self.assertEqual(self.ids(self.candle), [self.cups.id])
+
+        response = self.client.get('/api/products/999999/bought-together/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_interrupted_run_keeps_flushed_lists(self):
+        """Test chunks committed before a failure already have their lists, and are not counted again"""
+        self.order(self.tea, self.pot)
+        self.order(self.tea, self.pot)
+        self.order(self.tea, self.cups)
+        pair = sorted([self.tea.id, self.pot.id])
+        with mock.patch(
+            'apps.product.bought_together.order_product_ids', side_effect=[pair, pair, RuntimeError('lost connection')],
+        ):
+            with self.assertRaises(RuntimeError):
+                self.mine()
+        self.assertEqual(self.ids(self.pot), [self.tea.id])
+        self.assertIn('Counted 1 orders', self.mine())
+        self.assertEqual(BoughtTogetherProgress.objects.get().orders, 3)
+
+    def test_late_committed_orders_are_counted_once(self):
+        """Test an order committed below the watermark after a run is counted by the next one"""
+        self.order(self.tea, self.pot)
+        late = self.order(self.tea, self.pot)
+        self.order(self.tea, self.cups)
+        late_id, late_products = late.id, late.products
+        # Not visible to the first run, as if its transaction had not committed yet
+        late.delete()
+        self.assertIn('Counted 2 orders', self.mine())
+        self.assertEqual(BoughtTogetherProgress.objects.get().open_order_ids, [late_id])
+        self.assertEqual(self.ids(self.pot), [])
+
+        Order.objects.create(id=late_id, owner=self.user, amount=10, products=late_products)
+        self.assertIn('Counted 1 orders', self.mine())
+        self.assertEqual(self.ids(self.pot), [self.tea.id])
+        self.assertIn('Counted 0 orders', self.mine())
+        progress = BoughtTogetherProgress.objects.get()
+        self.assertEqual((progress.orders, progress.open_order_ids), (3, []))
+
+    @override_settings(PRODUCT_BOUGHT_TOGETHER_RESCAN_WINDOW=1)
+    def test_open_order_ids_stay_within_the_window(self):
+        """Test ids further below the watermark than the rescan window are no longer looked up"""
+        first = self.order(self.tea, self.pot)
+        for _index in range(3):
+            self.order(self.tea, status='cancelled')
+        last = self.order(self.tea, self.cups)
+        self.mine()
+        progress = BoughtTogetherProgress.objects.get()
+        self.assertEqual((progress.last_order_id, progress.open_order_ids), (last.id, [last.id - 1]))
+        self.assertGreater(last.id - 1, first.id)
+
+    def test_skipped_orders_do_not_count_towards_lift(self):
+        """Test bulk and empty orders are passed over and left out of the order total"""
+        self.order(self.tea, self.pot)
+        self.order(self.tea, self.pot)
+        Order.objects.create(
+            owner=self.user, amount=10, products={str(1000 + index): 1 for index in range(MAX_ORDER_ITEMS + 1)},
+        )
+        Order.objects.create(owner=self.user, amount=10, products={})
+        self.assertIn('Counted 2 orders, skipped 2', self.mine())
+        self.assertEqual(BoughtTogetherProgress.objects.get().orders, 2)
+        self.assertEqual(BoughtTogether.objects.get(product_id=self.pot.id).lift, 1.0)
+
+
+class BenchmarkListSerializersTests(TestCase):
+    def test_benchmark_reports_identical_payloads(self):
+        """Test the benchmark serializes the same rows both ways and reports us/row"""
+        brand = Brand.objects.create(name='Benchmark Brand', description='Test')
+        for index in range(3):
+            Product.objects.create(
+                name=f'Benchmark Tea Tin {index}',
+                brand=brand,
+                description='Loose leaf',
+                price=f'{12 + index}.5',
+                profile_pic_link='https://example.com/tea.jpg',
+                type=['Pantry'],
+                current_stock=index,
+            )
+        out = StringIO()
+        call_command('benchmark_list_serializers', '--rows', '10', '--repeat', '2', stdout=out)
+        self.assertIn('3 rows, best of 2 runs', out.getvalue())
+        self.assertIn('projection (tuples)', out.getvalue())
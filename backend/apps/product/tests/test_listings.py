@@ -0,0 +1,103 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from apps.brand.models import Brand
+from apps.product.models import Product, ProductListing, ProductTag, ProductType
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Listing Brand', description='Test')
+        self.product = Product.objects.create(
+            name='Listed Teapot',
+            brand=self.brand,
+            description='Kept in sync by triggers',
+            price=35.00,
+            profile_pic_link='https://example.com/teapot.jpg',
+            type=['Kitchen'],
+            current_stock=6,
+            status='available'
+        )
+
+    def listing(self):
+        return ProductListing.objects.get(id=self.product.id)
+
+    def test_product_writes_are_mirrored(self):
+        """Test inserts, updates and deletes of products reach product_listings"""
+        listing = self.listing()
+        self.assertEqual(listing.name, 'Listed Teapot')
+        self.assertEqual(listing.brand_name, 'Listing Brand')
+        self.assertEqual(listing.type, ['Kitchen'])
+        self.assertFalse(listing.tagged)
+        self.assertEqual(listing.rank_if, 0)
+
+        self.product.price = 29.50
+        self.product.current_stock = 0
+        self.product.save()
+        listing = self.listing()
+        self.assertEqual(str(listing.price), '29.50')
+        self.assertEqual(listing.current_stock, 0)
+
+        product_id = self.product.id
+        self.product.delete()
+        self.assertFalse(ProductListing.objects.filter(id=product_id).exists())
+
+    def test_tag_and_brand_writes_are_mirrored(self):
+        """Test tag flags/scores and brand renames reach product_listings"""
+        tag = ProductTag.objects.create(product=self.product, hot=True, hot_if=0.7, rank_if=0.4)
+        listing = self.listing()
+        self.assertTrue(listing.tagged and listing.hot)
+        self.assertEqual((listing.hot_if, listing.rank_if), (0.7, 0.4))
+
+        tag.hot = False
+        tag.new = True
+        tag.save()
+        listing = self.listing()
+        self.assertFalse(listing.hot)
+        self.assertTrue(listing.new)
+
+        tag.delete()
+        listing = self.listing()
+        self.assertFalse(listing.tagged or listing.new)
+        self.assertEqual(listing.rank_if, 0)
+
+        self.brand.name = 'Renamed Listing Brand'
+        self.brand.save()
+        self.assertEqual(self.listing().brand_name, 'Renamed Listing Brand')
+
+    def test_types_are_interned(self):
+        """Test type names get ProductType rows and listings carry their sorted ids"""
+        kitchen = ProductType.objects.get(name='Kitchen')
+        self.assertEqual(self.listing().type_ids, [kitchen.id])
+
+        self.product.type = ['Kitchen', 'Gift Box', 'Kitchen']
+        self.product.save()
+        gift_box = ProductType.objects.get(name='Gift Box')
+        self.assertEqual(self.listing().type_ids, sorted([kitchen.id, gift_box.id]))
+
+        self.product.type = []
+        self.product.save()
+        self.assertEqual(self.listing().type_ids, [])
+
+    def test_gift_box_flag_follows_types(self):
+        """Test is_gift_box is recomputed whenever the product's types change"""
+        self.assertFalse(self.listing().is_gift_box)
+        self.product.type = ['Kitchen', 'Christmas Gifts']
+        self.product.save()
+        self.assertTrue(self.listing().is_gift_box)
+        self.product.type = ['Kitchen']
+        self.product.save()
+        self.assertFalse(self.listing().is_gift_box)
+
+    def test_rebuild_command(self):
+        """Test the rebuild command repairs drifted and orphaned rows"""
+        listing = self.listing()
+        ProductListing.objects.filter(id=self.product.id).update(name='stale')
+        listing.id = Product.objects.order_by('-id').values_list('id', flat=True)[0] + 1000
+        listing.save(force_insert=True)
+
+        out = StringIO()
+        call_command('rebuild_product_listings', stdout=out)
+        self.assertEqual(self.listing().name, 'Listed Teapot')
+        self.assertEqual(ProductListing.objects.count(), Product.objects.count())
+        self.assertIn('Rebuilt product listings', out.getvalue())
@@ -0,0 +1,176 @@
+from unittest import mock
+from urllib.parse import quote
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.brand.models import Brand
+from apps.product.memory_search import memory_index
+from apps.product.models import Product, ProductTag
+from apps.product.search_backends import InMemorySearchBackend, PostgresSearchBackend, get_search_backend
+
+MEMORY_BACKEND = 'apps.product.search_backends.InMemorySearchBackend'
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND=MEMORY_BACKEND)
+class InMemorySearchBackendTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.brand = Brand.objects.create(name='Saltwater Provisions', description='Test')
+        self.other_brand = Brand.objects.create(name='Harbour Candles', description='Test')
+        self.oil = Product.objects.create(
+            name='Smoked Chilli Oil',
+            brand=self.brand,
+            description='A fiery condiment for noodles',
+            price=14.50,
+            profile_pic_link='https://example.com/oil.jpg',
+            type=['Condiments', 'Pantry'],
+            current_stock=4,
+            status='available'
+        )
+        self.salt = Product.objects.create(
+            name='Flaky Sea Salt',
+            brand=self.brand,
+            description='Hand harvested, lovely on chilli chocolate',
+            price=9.00,
+            profile_pic_link='https://example.com/salt.jpg',
+            type=['Pantry'],
+            current_stock=0,
+            status='available'
+        )
+        self.candle = Product.objects.create(
+            name='Fig Candle',
+            brand=self.other_brand,
+            description='Soy wax candle',
+            price=45.00,
+            profile_pic_link='https://example.com/candle.jpg',
+            type=['Homewares', 'Candles'],
+            current_stock=2,
+            status='available'
+        )
+        ProductTag.objects.create(product=self.candle, hot=True, hot_if=0.8, rank_if=0.9)
+        # Built here: a background build would not see the test transaction's rows
+        memory_index.reset()
+        memory_index.rebuild()
+
+    def tearDown(self):
+        memory_index.reset()
+
+    def ids(self, response):
+        return [product['id'] for product in response.data['results']]
+
+    def test_backend_setting(self):
+        """Test PRODUCT_SEARCH_BACKEND selects the backend class"""
+        self.assertIsInstance(get_search_backend(), InMemorySearchBackend)
+        with override_settings(PRODUCT_SEARCH_BACKEND='apps.product.search_backends.PostgresSearchBackend'):
+            self.assertIsInstance(get_search_backend(), PostgresSearchBackend)
+
+    def test_search_scores_prefix_and_fuzzy_matches(self):
+        """Test BM25 ranking puts name matches first and tolerates prefixes and typos"""
+        response = self.client.get('/api/products/search/?q=chilli')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['products']], [self.oil.id, self.salt.id])
+
+        response = self.client.get('/api/products/search/?q=cand')
+        self.assertEqual([p['id'] for p in response.data['products']], [self.candle.id])
+
+        response = self.client.get('/api/products/search/smokd%20chili/')
+        self.assertEqual(response.data['corrected_query'], 'smoked chilli')
+        self.assertEqual(self.ids(response)[0], self.oil.id)
+
+        response = self.client.get('/api/products/search/?q=zzzzzz')
+        self.assertEqual(response.data['products'], [])
+
+    def test_collection_filters_sorts_and_cursors(self):
+        """Test slug terms, filters, sorts and cursor pages follow the SQL semantics"""
+        response = self.client.get('/api/products/collections/pantry/?sort=PRICE')
+        self.assertEqual(self.ids(response), [self.salt.id, self.oil.id])
+
+        response = self.client.get('/api/products/collections/pantry/?available=true')
+        self.assertEqual(self.ids(response), [self.oil.id])
+
+        response = self.client.get('/api/products/collections/gifts-under-20/')
+        self.assertEqual(response.data['count'], 0)
+
+        response = self.client.get('/api/products/collections/whats-hot/')
+        self.assertEqual(self.ids(response), [self.candle.id])
+
+        expected = self.ids(self.client.get('/api/products/collections/saltwater/'))
+        self.assertCountEqual(expected, [self.oil.id, self.salt.id])
+        response = self.client.get('/api/products/collections/saltwater/?page_size=1')
+        first = self.ids(response)
+        response = self.client.get(f"/api/products/collections/saltwater/?page_size=1&cursor={response.data['next_cursor']}")
+        self.assertEqual(first + self.ids(response), expected)
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_facets_match_postgres_backend(self):
+        """Test both backends report the same facet counts for a collection"""
+        url = '/api/products/collections/pantry/?facets=true'
+        memory_facets = self.client.get(url).data['facets']
+        with override_settings(PRODUCT_SEARCH_BACKEND='apps.product.search_backends.PostgresSearchBackend'):
+            postgres_facets = self.client.get(url).data['facets']
+        self.assertEqual(memory_facets, postgres_facets)
+
+    def test_index_updates_incrementally_on_commit(self):
+        """Test product, tag and brand writes reach a built index without a rebuild"""
+        memory_index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = 'Truffle Salt'
+            self.salt.save()
+            ProductTag.objects.create(product=self.oil, hot=True, hot_if=0.9)
+            self.other_brand.name = 'Harbour Lights'
+            self.other_brand.save()
+        response = self.client.get('/api/products/search/?q=truffle')
+        self.assertEqual([p['id'] for p in response.data['products']], [self.salt.id])
+        response = self.client.get('/api/products/collections/whats-hot/')
+        self.assertEqual(self.ids(response), [self.oil.id, self.candle.id])
+        response = self.client.get('/api/products/search/?q=lights')
+        self.assertEqual([p['brand'] for p in response.data['products']], ['Harbour Lights'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.candle.delete()
+        response = self.client.get('/api/products/search/?q=candle')
+        self.assertEqual(response.data['products'], [])
+
+    def test_type_filter_matches_within_type_names(self):
+        """Test productType fragments match inside one type name, as the SQL filter does"""
+        url = '/api/products/collections/saltwater/?productType='
+        self.assertCountEqual(self.ids(self.client.get(url + 'pant')), [self.oil.id, self.salt.id])
+        self.assertEqual(self.ids(self.client.get(url + quote('condiments", "pantry'))), [])
+
+    def test_cold_index_falls_back_to_postgres(self):
+        """Test requests against a cold index are answered by the SQL backend while it builds in the background"""
+        memory_index.reset()
+        with mock.patch.object(memory_index, 'warm_up') as warm_up:
+            response = self.client.get('/api/products/search/?q=chilli')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertCountEqual([p['id'] for p in response.data['products']], [self.oil.id, self.salt.id])
+            response = self.client.get('/api/products/collections/whats-hot/')
+            self.assertEqual(self.ids(response), [self.candle.id])
+        self.assertTrue(warm_up.called)
+        self.assertFalse(memory_index.is_warm)
+
+    def test_clones_copy_only_touched_postings(self):
+        """Test applying a change shares every posting list it does not touch with the previous snapshot"""
+        before, _generation = memory_index._snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = 'Truffle Salt'
+            self.salt.save()
+        after, _generation = memory_index._snapshot()
+        self.assertIs(after.postings['candle'], before.postings['candle'])
+        self.assertIsNot(after.postings['salt'], before.postings['salt'])
+        self.assertIn(self.salt.id, before.postings['flaky'])
+        self.assertNotIn('flaky', after.postings)
+        self.assertIn('truffle', after.vocabulary)
+        self.assertNotIn('truffle', before.vocabulary)
+
+    def test_queries_read_a_snapshot(self):
+        """Test committed changes are applied to a copy, leaving snapshots in use untouched"""
+        memory_index.rebuild()
+        before, _generation = memory_index._snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = 'Truffle Salt'
+            self.salt.save()
+        after, _generation = memory_index._snapshot()
+        self.assertIsNot(after, before)
+        self.assertEqual(before.docs[self.salt.id].name, 'Flaky Sea Salt')
+        self.assertEqual(after.docs[self.salt.id].name, 'Truffle Salt')
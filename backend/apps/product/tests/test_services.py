@@ -0,0 +1,325 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from apps.brand.models import Brand
+from apps.product.models import Product, SearchLexeme
+from apps.product.services import (
+    correct_query, fetch_page, fetch_rows, get_collection_search_query, get_search_query, get_search_suggestions,
+)
+from apps.product.statements import prepared_statements, to_positional
+
+
+class SearchVectorTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Saltwater Provisions', description='Test')
+        self.product = Product.objects.create(
+            name='Smoked Chilli Oil',
+            brand=self.brand,
+            description='A fiery condiment for noodles',
+            price=14.50,
+            profile_pic_link='https://example.com/oil.jpg',
+            current_stock=4,
+            status='available'
+        )
+
+    def _matches(self, term):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM products WHERE search_vector @@ plainto_tsquery('english', %s)",
+                [term]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_search_vector_is_populated_on_insert(self):
+        """Test the trigger fills search_vector from name, brand and description"""
+        self.assertIn(self.product.id, self._matches('chilli'))
+        self.assertIn(self.product.id, self._matches('saltwater'))
+        self.assertIn(self.product.id, self._matches('noodles'))
+
+    def test_search_vector_is_weighted(self):
+        """Test name lexemes carry weight A, brand B and description C"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT search_vector::text FROM products WHERE id = %s", [self.product.id])
+            vector = cursor.fetchone()[0]
+        self.assertIn("'chilli':2A", vector)
+        self.assertIn("'saltwat':4B", vector)
+        self.assertIn("'noodl':10C", vector)
+
+    def test_search_vector_follows_product_and_brand_changes(self):
+        """Test renaming a product or its brand refreshes the stored vector"""
+        self.product.name = 'Truffle Honey'
+        self.product.save()
+        self.assertIn(self.product.id, self._matches('truffle'))
+        self.assertNotIn(self.product.id, self._matches('chilli'))
+
+        self.brand.name = 'Harbour Pantry'
+        self.brand.save()
+        self.assertIn(self.product.id, self._matches('harbour'))
+        self.assertNotIn(self.product.id, self._matches('saltwater'))
+
+    def test_search_query_uses_stored_vector(self):
+        """Test the search builder matches through the stored vector"""
+        plan = get_search_query('noodles', limit=8)
+        self.assertIn('p.search_vector @@', plan.sql)
+        self.assertNotIn('to_tsvector', plan.sql)
+        with connection.cursor() as cursor:
+            cursor.execute(plan.sql, plan.sql_params)
+            ids = [row[0] for row in cursor.fetchall()]
+        self.assertIn(self.product.id, ids)
+
+
+class SpellingCorrectionTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Saltwater Provisions', description='Test')
+        self.product = Product.objects.create(
+            name='Smoked Chilli Oil',
+            brand=self.brand,
+            description='A fiery condiment for noodles',
+            price=14.50,
+            profile_pic_link='https://example.com/oil.jpg',
+            type=['Condiments'],
+            current_stock=4,
+            status='available'
+        )
+
+    def test_triggers_add_lexemes(self):
+        """Test product names, types and brand names reach the dictionary unstemmed"""
+        words = set(SearchLexeme.objects.values_list('word', flat=True))
+        self.assertTrue({'smoked', 'chilli', 'condiments', 'saltwater', 'provisions'} <= words)
+        self.assertNotIn('oil', {word for word in words if len(word) < 3})
+        self.assertNotIn('noodles', words)
+
+        self.brand.name = 'Harbour Pantry'
+        self.brand.save()
+        self.assertTrue(SearchLexeme.objects.filter(word='harbour').exists())
+
+    def test_correct_query(self):
+        """Test misspelled words are replaced and known words are kept"""
+        self.assertEqual(correct_query('smokd chilli'), 'smoked chilli')
+        self.assertEqual(correct_query('Saltwtaer'), 'saltwater')
+        # Dictionary words, description words (FTS), stop words and short words are kept
+        self.assertIsNone(correct_query('chilli oil'))
+        self.assertIsNone(correct_query('noodles'))
+        self.assertIsNone(correct_query('the chilli'))
+        self.assertIsNone(correct_query('xq 42'))
+        # Nothing close enough in the dictionary
+        self.assertIsNone(correct_query('zzzzzz'))
+
+    def test_rebuild_command(self):
+        """Test the rebuild recomputes frequencies and drops stale words"""
+        SearchLexeme.objects.create(word='obsolete', frequency=3)
+        Product.objects.create(
+            name='Smoked Salt',
+            brand=self.brand,
+            description='Flaky',
+            price=9.00,
+            profile_pic_link='https://example.com/salt.jpg',
+            current_stock=2,
+            status='available'
+        )
+        out = StringIO()
+        call_command('rebuild_search_lexemes', stdout=out)
+        self.assertFalse(SearchLexeme.objects.filter(word='obsolete').exists())
+        self.assertEqual(SearchLexeme.objects.get(word='smoked').frequency, 2)
+        self.assertIn('Rebuilt search lexemes', out.getvalue())
+
+
+class TrigramSearchTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Saltwater Provisions', description='Test')
+        self.product = Product.objects.create(
+            name='Smoked Chilli Oil',
+            brand=self.brand,
+            description='A fiery condiment for noodles',
+            price=14.50,
+            profile_pic_link='https://example.com/oil.jpg',
+            type=['Condiment'],
+            current_stock=4,
+            status='available'
+        )
+
+    def _search_ids(self, query):
+        plan = get_search_query(query, limit=8)
+        with connection.cursor() as cursor:
+            cursor.execute(plan.sql, plan.sql_params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_trigram_thresholds_are_configured(self):
+        """Test the configured pg_trgm thresholds are applied to the connection"""
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW pg_trgm.similarity_threshold")
+            self.assertEqual(float(cursor.fetchone()[0]), 0.2)
+            cursor.execute("SHOW pg_trgm.word_similarity_threshold")
+            self.assertEqual(float(cursor.fetchone()[0]), 0.6)
+
+    def test_fuzzy_matching_tolerates_typos(self):
+        """Test misspelled product and brand names still match via trigram operators"""
+        self.assertIn(self.product.id, self._search_ids('Smoked Chili Oil'))
+        self.assertIn(self.product.id, self._search_ids('Saltwatr Provisions'))
+        self.assertEqual(get_search_suggestions('Saltwatr'), ['Saltwater Provisions'])
+
+    def test_collection_slugs_match_like_searches(self):
+        """Test slug words match brand names (fuzzily) the same way search words do"""
+        plan = get_collection_search_query('saltwatr-provisions-gifts')
+        with connection.cursor() as cursor:
+            cursor.execute(plan.sql, plan.sql_params)
+            self.assertEqual([row[0] for row in cursor.fetchall()], [self.product.id])
+        search = get_search_query('saltwatr provisions gifts')
+        self.assertEqual(plan.sql.count('FROM brands'), search.sql.count('FROM brands'))
+
+    def test_search_predicates_are_index_backed(self):
+        """Test every OR-ed search predicate can be answered from an index"""
+        plan = get_search_query('chilli')
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            cursor.execute(f"EXPLAIN {plan.sql}", plan.sql_params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn('products_name_trgm', plan)
+        self.assertIn('products_description_trgm', plan)
+        self.assertIn('products_search_vector_gin', plan)
+        self.assertIn('brands_name_trgm', plan)
+        self.assertNotIn('Seq Scan on products', plan)
+
+    @override_settings(PRODUCT_SEARCH_CANDIDATES=5)
+    def test_top_k_search_uses_bounded_candidates(self):
+        """Test short-limit searches score only index-generated candidates"""
+        plan = get_search_query('chilli flakes', limit=5)
+        self.assertIn('AS candidates', plan.sql)
+        self.assertIn(5, plan.params)
+        self.assertNotIn('AS candidates', get_search_query('chilli flakes', limit=None).sql)
+        self.assertNotIn('AS candidates', get_search_query('chilli flakes', limit=50).sql)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {plan.sql}", plan.sql_params)
+            explain = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn('products_name_trgm_gist', explain)
+        self.assertIn('products_search_vector_gin', explain)
+        self.assertIn('listings_brand_rank_idx', explain)
+
+        # The same product ranks first with and without the candidate stage
+        self.assertEqual(self._search_ids('smoked chilli oil')[0], self.product.id)
+        full = get_search_query('smoked chilli oil')
+        with connection.cursor() as cursor:
+            cursor.execute(full.sql, full.sql_params)
+            self.assertEqual(cursor.fetchone()[0], self.product.id)
+
+
+class SearchPlanTests(SimpleTestCase):
+    def test_collection_plans_are_cached(self):
+        """Test repeated slugs reuse the same plan, independent of filter order"""
+        filters = {'brand_id': [7, 3], 'product_type': ['Snack']}
+        plan = get_collection_search_query('Gifts-Under-100', filters)
+        same = get_collection_search_query('gifts-under-100', {'product_type': ['Snack'], 'brand_id': [3, 7, 3]})
+        self.assertIs(plan, same)
+        self.assertIs(plan.page_sql, same.page_sql)
+        self.assertIsNot(plan, get_collection_search_query('gifts-under-100'))
+
+    def test_collection_plan_structure(self):
+        """Test the plan exposes where fragments, params and ORDER BY keys"""
+        plan = get_collection_search_query('gifts-under-100', {'available': True})
+        self.assertIn('l.price < %s', plan.where)
+        self.assertIn("l.current_stock > 0 AND l.status = 'available'", plan.where)
+        self.assertIn(100.0, plan.params)
+        self.assertEqual(plan.order_columns[0], 'relevance_score')
+        self.assertTrue(plan.order_by.startswith('relevance.score DESC'))
+        self.assertNotIn('gifts', plan.page_sql)
+        self.assertEqual(plan.page_params(20, 40)[-2:], (20, 40))
+        self.assertEqual(plan.count_sql.count('%s'), len(plan.params))
+        self.assertEqual(plan.page_sql.count('%s'), len(plan.params) + 2)
+
+    def test_sort_replaces_order(self):
+        """Test the sort parameter selects ORDER BY keys without string surgery"""
+        plan = get_collection_search_query('whats-hot', sort='PRICE')
+        self.assertEqual(plan.order_by, 'l.price ASC, l.id ASC')
+        default = get_collection_search_query('whats-hot', sort='UNKNOWN')
+        self.assertEqual(default.order_by, 'l.hot_if DESC, l.created_at DESC, l.id DESC')
+        self.assertIs(default, get_collection_search_query('whats-hot'))
+
+    def test_search_plan_limit(self):
+        """Test the query plan is shared across limits"""
+        plan = get_search_query('  chilli   oil ', limit=8)
+        self.assertEqual(plan.limit, 8)
+        self.assertEqual(plan.sql_params[-1], 8)
+        self.assertIsNone(get_search_query('chilli oil').limit)
+        self.assertEqual(plan.where, get_search_query('chilli oil').where)
+
+
+class PreparedStatementTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="O'Malley Pantry", description='Test')
+        Product.objects.create(
+            name='Pickled Walnut Relish',
+            brand=self.brand,
+            description='Sharp and sweet',
+            price=9.50,
+            profile_pic_link='https://example.com/relish.jpg',
+            current_stock=2,
+            status='available'
+        )
+
+    def _server_statements(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT statement FROM pg_prepared_statements WHERE name LIKE 'product_stmt_%%'")
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_to_positional(self):
+        """Test DB-API placeholders become $n and escaped percents become literal"""
+        sql = "SELECT 1 WHERE a ILIKE %s OR a %% %s LIMIT %s"
+        self.assertEqual(to_positional(sql), "SELECT 1 WHERE a ILIKE $1 OR a % $2 LIMIT $3")
+
+    def test_query_shape_is_prepared_once(self):
+        """Test different search texts reuse one prepared statement"""
+        before = prepared_statements.stats()
+        plan = get_search_query('walnut relish')
+        columns, rows, total, _capped = fetch_page(plan, 10, 0)
+        self.assertEqual(total, 1)
+        self.assertEqual(rows[0][columns.index('name')], 'Pickled Walnut Relish')
+
+        prepared = len(self._server_statements())
+        other = get_search_query('pickle jars')
+        self.assertEqual(other.counted_page_sql, plan.counted_page_sql)
+        fetch_page(other, 10, 0)
+        after = prepared_statements.stats()
+        self.assertEqual(len(self._server_statements()), prepared)
+        self.assertGreaterEqual(after['hits'], before['hits'] + 1)
+        self.assertGreaterEqual(after['misses'], before['misses'] + 1)
+
+    def test_user_text_is_bound(self):
+        """Test quotes in the search text are bound, never spliced into SQL"""
+        columns, rows = fetch_rows(get_search_query("o'malley", limit=5))
+        self.assertEqual([row[columns.index('brand')] for row in rows], ["O'Malley Pantry"])
+        self.assertEqual(get_search_suggestions("o'malley"), ["O'Malley Pantry"])
+        self.assertFalse(any("o'malley" in statement.lower() for statement in self._server_statements()))
+
+    def test_second_request_executes_the_prepared_statement(self):
+        """Test a persistent connection keeps its statements from one request to the next"""
+        self.assertNotEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+        self.client.get('/api/products/search/walnut relish/')
+        before = prepared_statements.stats()
+        response = self.client.get('/api/products/search/pickled relish/')
+        self.assertEqual(response.status_code, 200)
+        after = prepared_statements.stats()
+        self.assertGreater(after['hits'], before['hits'])
+        self.assertEqual(after['misses'], before['misses'])
+
+    def test_non_persistent_connections_skip_prepare(self):
+        """Test CONN_MAX_AGE=0 runs plain SQL, since every request would re-PREPARE"""
+        before = prepared_statements.stats()
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        connection.settings_dict['CONN_MAX_AGE'] = 0
+        try:
+            columns, rows = fetch_rows(get_search_query('walnut relish', limit=5))
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+        self.assertEqual([row[columns.index('name')] for row in rows], ['Pickled Walnut Relish'])
+        self.assertEqual(prepared_statements.stats(), before)
+
+    @override_settings(PRODUCT_SEARCH_PREPARED_STATEMENTS=False)
+    def test_prepared_statements_can_be_disabled(self):
+        """Test the plain SQL path returns the same rows"""
+        before = prepared_statements.stats()
+        columns, rows = fetch_rows(get_search_query('walnut relish', limit=5))
+        self.assertEqual([row[columns.index('name')] for row in rows], ['Pickled Walnut Relish'])
+        self.assertEqual(prepared_statements.stats(), before)
@@ -1,23 +1,31 @@
-from django.test import TestCase
+import base64
+import json
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.brand.models import Brand
-from apps.product.models import Product, ProductTag
+from apps.product.cache import bump_catalog_version, catalog_version
+from apps.product.home_feed import HOME_LATEST_KEY
+from apps.product.models import Product, ProductDetailPic, ProductListing, ProductTag
+from apps.product.serializers import ProductListSerializer, listing_card_rows, serialize_product_rows
 
 
 class ProductTests(TestCase):
     def setUp(self):
         self.client = APIClient()
-        self.brand = Brand.objects.create(name='Test Brand')
-        self.product = Product.objects.create(
-            name='Test Product',
-            brand=self.brand,
-            description='Test description',
-            price=29.99,
-            profile_pic_link='https://example.com/image.jpg',
-            current_stock=10,
-            status='available'
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand = Brand.objects.create(name='Test Brand')
+            self.product = Product.objects.create(
+                name='Test Product',
+                brand=self.brand,
+                description='Test description',
+                price=29.99,
+                profile_pic_link='https://example.com/image.jpg',
+                current_stock=10,
+                status='available'
+            )
 
     def test_product_list(self):
         """Test getting product list"""
@@ -67,6 +75,34 @@ class ProductTests(TestCase):
         response = self.client.get('/api/products/99999/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_product_batch(self):
+        """Test batch details keep the requested order in a fixed number of queries"""
+        pic = ProductDetailPic.objects.create(
+            small_pic_link='https://example.com/s.jpg', big_pic_link='https://example.com/b.jpg',
+            extra_big_pic_link='https://example.com/xb.jpg'
+        )
+        products = [self.product]
+        for index in range(4):
+            product = Product.objects.create(
+                name=f'Batch Product {index}', brand=self.brand, description='Test', price=10 + index,
+                profile_pic_link='https://example.com/batch.jpg', current_stock=1, status='available'
+            )
+            product.detail_pics.add(pic)
+            ProductTag.objects.create(product=product, hot=index % 2 == 0)
+            products.append(product)
+        ids = [products[3].id, products[0].id, 999999, products[4].id, products[3].id]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/products/batch/?ids={','.join(map(str, ids))}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [products[3].id, self.product.id, products[4].id])
+        self.assertEqual(response.data[0], self.client.get(f'/api/products/{products[3].id}/').data)
+
+        self.assertEqual(self.client.get('/api/products/batch/?ids=1,x').status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(PRODUCT_BATCH_MAX_IDS=2):
+            response = self.client.get(f"/api/products/batch/?ids={','.join(map(str, ids))}")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_hot_products(self):
         """Test getting hot products"""
         response = self.client.get('/api/products/hot/')
@@ -85,6 +121,107 @@ class ProductTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('products', response.data)
         self.assertIn('total', response.data)
+        self.assertIsNone(response.data['corrected_query'])
+
+    def test_search_products_corrects_spelling(self):
+        """Test misspelled searches that match nothing run with, and return, the corrected query"""
+        candle = Product.objects.create(
+            name='Hand Poured Beeswax Pillar Candle Set', brand=self.brand, description='Long burning',
+            price=18.00, profile_pic_link='https://example.com/candle.jpg', current_stock=2, status='available'
+        )
+        response = self.client.get('/api/products/search/?q=beeswxa')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['corrected_query'], 'beeswax')
+        self.assertEqual([product['id'] for product in response.data['products']], [candle.id])
+
+        response = self.client.get('/api/products/search/prodcut/')
+        self.assertEqual(response.data['corrected_query'], 'product')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_search_products_keeps_prefixes_as_typed(self):
+        """Test header search runs the raw query, so half-typed words are not corrected into other words"""
+        with self.captureOnCommitCallbacks(execute=True):
+            mug = Product.objects.create(
+                name='Handmade Stoneware Mug', brand=self.brand, description='Thrown by hand', price=24.00,
+                profile_pic_link='https://example.com/mug.jpg', current_stock=3, status='available'
+            )
+            bar = Product.objects.create(
+                name='Sea Salt Chocolate Bar', brand=self.brand, description='Dark chocolate', price=6.00,
+                profile_pic_link='https://example.com/bar.jpg', current_stock=3, status='available'
+            )
+        for query, product in (('handm', mug), ('choc', bar)):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/products/search/?q={query}')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIsNone(response.data['corrected_query'])
+                self.assertEqual([p['id'] for p in response.data['products']], [product.id])
+
+    def test_type_lookups_use_interned_types(self):
+        """Test productType filters, gift boxes and related products match on interned type ids"""
+        hamper = Product.objects.create(
+            name='Picnic Hamper', brand=self.brand, description='Test', price=80.00,
+            profile_pic_link='https://example.com/hamper.jpg', type=['Hampers', 'Gift Box'],
+            current_stock=2, status='available'
+        )
+        ProductTag.objects.create(product=hamper, rank_if=0.5)
+        teapot = Product.objects.create(
+            name='Teapot', brand=self.brand, description='Test', price=30.00,
+            profile_pic_link='https://example.com/teapot.jpg', type=['Kitchen', 'Hampers'],
+            current_stock=2, status='available'
+        )
+        ProductTag.objects.create(product=teapot, rank_if=0.9)
+
+        response = self.client.get('/api/products/?productType=gift')
+        self.assertEqual([p['id'] for p in response.data['results']], [hamper.id])
+
+        response = self.client.get('/api/products/gift-box/')
+        self.assertEqual([p['id'] for p in response.data], [hamper.id])
+
+        response = self.client.get(f'/api/products/{hamper.id}/you-might-like/')
+        self.assertEqual([p['id'] for p in response.data], [teapot.id])
+        response = self.client.get('/api/products/999999/you-might-like/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['detail'], 'No Product matches the given query.')
+
+        response = self.client.get('/api/products/collections/test/?productType=kitchen')
+        self.assertEqual([p['id'] for p in response.data['results']], [teapot.id])
+
+    def test_brand_filter_resolves_names_to_ids(self):
+        """Test brand names and brandId lists filter list and collection endpoints by brand id"""
+        with self.captureOnCommitCallbacks(execute=True):
+            other_brand = Brand.objects.create(name='Harbour Test Candles')
+            candle = Product.objects.create(
+                name='Test Candle', brand=other_brand, description='Test', price=40.00,
+                profile_pic_link='https://example.com/candle.jpg', current_stock=3, status='available'
+            )
+
+        response = self.client.get('/api/products/?brand=harbour')
+        self.assertEqual([p['id'] for p in response.data['results']], [candle.id])
+        response = self.client.get(f'/api/products/?brandId={self.brand.id}')
+        self.assertEqual([p['id'] for p in response.data['results']], [self.product.id])
+        response = self.client.get('/api/products/?brand=nobody')
+        self.assertEqual(response.data['count'], 0)
+
+        response = self.client.get(f'/api/products/collections/test/?brandId={other_brand.id}&sort=PRICE')
+        self.assertEqual([p['id'] for p in response.data['results']], [candle.id])
+        response = self.client.get(f'/api/products/collections/test/?brand=test%20brand&brandId={other_brand.id}&sort=PRICE')
+        self.assertEqual([p['id'] for p in response.data['results']], [self.product.id, candle.id])
+
+        # Renames reach the name map without a restart
+        with self.captureOnCommitCallbacks(execute=True):
+            other_brand.name = 'Lighthouse Test Candles'
+            other_brand.save()
+        response = self.client.get('/api/products/?brand=lighthouse')
+        self.assertEqual([p['id'] for p in response.data['results']], [candle.id])
+        response = self.client.get('/api/products/collections/test/?brand=harbour')
+        self.assertEqual(response.data['count'], 0)
+
+        # A rename committed by another worker or command: only the shared version row moves here
+        Brand.objects.filter(id=other_brand.id).update(name='Beacon Test Candles')
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE cache_versions SET version = nextval('cache_versions_seq') WHERE name = 'brand'")
+        response = self.client.get('/api/products/?brand=beacon')
+        self.assertEqual([p['id'] for p in response.data['results']], [candle.id])
 
     def test_collection_whats_hot(self):
         """Test whats-hot collection returns products with hot=True ordered by hot_if"""
@@ -285,3 +422,488 @@ class ProductTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('results', response.data)
         self.assertIn('count', response.data)
+
+    def test_collection_page_and_count_in_one_query(self):
+        """Test the collection page and its total come from a single statement"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                hot_product = Product.objects.create(
+                    name=f'Hot Window Product {index}',
+                    brand=self.brand,
+                    description='Counted with the page',
+                    price=10 + index,
+                    profile_pic_link='https://example.com/hot_window.jpg',
+                    current_stock=1,
+                    status='available'
+                )
+                ProductTag.objects.create(product=hot_product, hot=True, hot_if=0.5 + index / 10)
+
+        # Page, count and card fields all come from one statement; once the
+        # query shape is prepared on this connection that is a single EXECUTE
+        # (plus the version read that keys the cached registry and results)
+        self.client.get('/api/products/collections/whats-hot/?page_size=2')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/collections/whats-hot/?page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotIn('count_capped', response.data)
+
+        # Past the last page the total is still reported
+        response = self.client.get('/api/products/collections/whats-hot/?page_size=2&page=5')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'], [])
+
+    def test_row_serialization_matches_list_serializer(self):
+        """Test raw-row search results match ProductListSerializer output"""
+        tagged = Product.objects.create(
+            name='Row Shape Kettle',
+            brand=self.brand,
+            description='Serialized from rows',
+            price=42.5,
+            profile_pic_link='https://example.com/kettle.jpg',
+            type=['Kitchen', 'Gift'],
+            current_stock=3,
+            status='available'
+        )
+        ProductTag.objects.create(product=tagged, hot=True, hot_if=0.9)
+
+        response = self.client.get('/api/products/search/Row%20Shape%20Kettle/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = next(item for item in response.data['results'] if item['id'] == tagged.id)
+        expected = ProductListSerializer(Product.objects.get(id=tagged.id)).data
+        self.assertEqual(row, dict(expected))
+        self.assertEqual(row['brand'], 'Test Brand')
+        self.assertTrue(row['hot'])
+        self.assertFalse(row['new'])
+
+    def test_card_projection_matches_drf_serializers(self):
+        """Test the PRODUCT_CARD projection emits the DRF list payload from .values() dicts and raw tuples"""
+        Product.objects.create(
+            name='Projection Mug', brand=self.brand, description='Test', price=7,
+            profile_pic_link='https://example.com/mug.jpg', type=[], current_stock=0, status='unavailable'
+        )
+        listings = ProductListing.objects.order_by('id')
+        products = Product.objects.select_related('tag', 'brand').order_by('id')
+        expected = [dict(item) for item in ProductListSerializer(products, many=True).data]
+        self.assertEqual(serialize_product_rows(listing_card_rows(listings)), expected)
+        self.assertEqual(
+            json.dumps(self.client.get('/api/products/?sort=CREATED').data['results']), json.dumps(expected)
+        )
+
+        columns = ('created_at', 'status', 'current_stock', 'type', 'hot', 'new', 'profile_pic_link', 'price',
+                   'brand', 'name', 'id')
+        values = listing_card_rows(listings.order_by('created_at', 'id'))
+        rows = [tuple(row[column] for column in columns) for row in values]
+        self.assertCountEqual(serialize_product_rows(rows, columns), expected)
+
+    def test_collection_facets(self):
+        """Test facets=true returns counts over every match, not just the page"""
+        other_brand = Brand.objects.create(name='Facet Other Brand')
+        specs = [
+            (self.brand, 10, 5, ['Snack']),
+            (self.brand, 20, 0, ['Snack', 'Gift']),
+            (other_brand, 50, 3, ['Gift']),
+        ]
+        for index, (brand, price, stock, types) in enumerate(specs):
+            product = Product.objects.create(
+                name=f'Faceted Hot Product {index}',
+                brand=brand,
+                description='Counted in facets',
+                price=price,
+                profile_pic_link='https://example.com/facet.jpg',
+                type=types,
+                current_stock=stock,
+                status='available'
+            )
+            ProductTag.objects.create(product=product, hot=True, hot_if=0.5)
+
+        response = self.client.get('/api/products/collections/whats-hot/?page_size=1&facets=true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        facets = response.data['facets']
+        self.assertEqual(facets['brand'], [
+            {'value': 'Test Brand', 'count': 2}, {'value': 'Facet Other Brand', 'count': 1},
+        ])
+        self.assertEqual(facets['type'], [{'value': 'Gift', 'count': 2}, {'value': 'Snack', 'count': 2}])
+        self.assertEqual(facets['availability'], {'in_stock': 2, 'out_of_stock': 1})
+        self.assertEqual((facets['price']['min'], facets['price']['max']), ('10.00', '50.00'))
+        histogram = facets['price']['histogram']
+        self.assertEqual(sum(bucket['count'] for bucket in histogram), 3)
+        self.assertEqual(histogram[0], {'min': '10.00', 'max': '14.00', 'count': 1})
+        self.assertEqual(histogram[-1]['max'], '50.00')
+        self.assertEqual(histogram[-1]['count'], 1)
+
+        # Facets follow the query-parameter filters
+        response = self.client.get('/api/products/collections/whats-hot/?available=true&facets=true')
+        self.assertEqual(response.data['facets']['availability'], {'in_stock': 2, 'out_of_stock': 0})
+
+        # Search pages support the same facets
+        response = self.client.get('/api/products/search/Faceted/?facets=true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['facets']['availability'], {'in_stock': 2, 'out_of_stock': 1})
+
+        # Not computed unless asked for
+        response = self.client.get('/api/products/collections/whats-hot/')
+        self.assertNotIn('facets', response.data)
+
+    def test_search_full_capped_count(self):
+        """Test count=capped bounds the total at PRODUCT_SEARCH_COUNT_CAP"""
+        for index in range(3):
+            Product.objects.create(
+                name=f'Capped Lantern {index}',
+                brand=self.brand,
+                description='Paper lantern',
+                price=5,
+                profile_pic_link='https://example.com/lantern.jpg',
+                current_stock=1,
+                status='available'
+            )
+        with self.settings(PRODUCT_SEARCH_COUNT_CAP=2):
+            response = self.client.get('/api/products/search/lantern/?count=capped&page_size=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertTrue(response.data['count_capped'])
+        self.assertEqual(len(response.data['results']), 1)
+
+        # Exactly `cap` matches is a full count, not a capped one
+        with self.settings(PRODUCT_SEARCH_COUNT_CAP=3):
+            response = self.client.get('/api/products/search/lantern/?count=capped&page_size=1')
+        self.assertEqual(response.data['count'], 3)
+        self.assertFalse(response.data['count_capped'])
+
+        response = self.client.get('/api/products/search/lantern/')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_search_results_cache(self):
+        """Test repeated searches are served from cached ids until the catalog changes"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                Product.objects.create(
+                    name=f'Cached Lantern {index}',
+                    brand=self.brand,
+                    description='Paper lantern',
+                    price=10 + index,
+                    profile_pic_link='https://example.com/lantern.jpg',
+                    current_stock=1,
+                    status='available'
+                )
+        url = '/api/products/search/lantern/?page_size=2'
+        first = self.client.get(url)
+        self.assertEqual(first.data['count'], 3)
+
+        # Cache hit: the catalog version and the hydration query for the page's ids
+        with self.assertNumQueries(2):
+            second = self.client.get(url)
+        self.assertEqual(second.data['results'], first.data['results'])
+        self.assertEqual(second.data['next_cursor'], first.data['next_cursor'])
+
+        # Any product write moves to a new catalog version: the writing
+        # transaction misses the cache at once, everyone else once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name='Cached Lantern 3',
+                brand=self.brand,
+                description='Paper lantern',
+                price=13,
+                profile_pic_link='https://example.com/lantern.jpg',
+            )
+            self.assertEqual(self.client.get(url).data['count'], 4)
+        self.assertEqual(self.client.get(url).data['count'], 4)
+
+    def test_catalog_version_moves_once_on_commit(self):
+        """Test writes bump the shared version once, on commit, and the writer reads a private version until then"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT last_value FROM cache_versions_seq")
+            last_value = cursor.fetchone()[0]
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 31
+            self.product.save()
+            ProductTag.objects.create(product=self.product, hot=True)
+            private = catalog_version()
+            self.assertNotEqual(private, version)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT version FROM cache_versions WHERE name = 'catalog'")
+                self.assertEqual(cursor.fetchone()[0], version)
+        self.assertEqual(catalog_version(), last_value + 1)
+
+        # A rolled-back write leaves no private version behind
+        try:
+            with transaction.atomic():
+                self.product.save()
+                self.assertLess(catalog_version(), 0)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(catalog_version(), last_value + 1)
+
+    def test_catalog_version_is_shared_and_never_reused(self):
+        """Test the version lives in the database, outside the cache, and a rolled-back bump is not reused"""
+        version = catalog_version()
+        cache.clear()
+        self.assertEqual(catalog_version(), version)
+        try:
+            with transaction.atomic():
+                rolled_back = bump_catalog_version()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(catalog_version(), version)
+        self.assertGreater(bump_catalog_version(), rolled_back)
+
+    @override_settings(PRODUCT_SEARCH_RESULT_CACHE_MAX_IDS=2)
+    def test_pages_beyond_cached_ids(self):
+        """Test pages past the cached id list fall back to SQL with the same order"""
+        for index in range(5):
+            Product.objects.create(
+                name=f'Deep Page Kite {index}',
+                brand=self.brand,
+                description='Paper kite',
+                price=10 + index,
+                profile_pic_link='https://example.com/kite.jpg',
+            )
+        with override_settings(PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT=0):
+            expected = [p['id'] for p in self.client.get('/api/products/search/kite/?page_size=100').data['results']]
+        ids = []
+        for page in (1, 2, 3):
+            response = self.client.get(f'/api/products/search/kite/?page_size=2&page={page}')
+            self.assertEqual(response.data['count'], 5)
+            ids.extend(p['id'] for p in response.data['results'])
+        self.assertEqual(ids, expected)
+
+    def _walk_cursor_pages(self, url):
+        """Follow next_cursor from the first page and collect every product id"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [p['id'] for p in response.data['results']]
+        separator = '&' if '?' in url else '?'
+        while response.data['next_cursor']:
+            response = self.client.get(f"{url}{separator}cursor={response.data['next_cursor']}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsNone(response.data['count'])
+            ids.extend(p['id'] for p in response.data['results'])
+        return ids
+
+    def test_cursor_pagination_matches_offset_order(self):
+        """Test keyset cursors walk every sort mode in the same order as page numbers"""
+        for index in range(5):
+            product = Product.objects.create(
+                name=f'Cursor Candle {index}',
+                brand=self.brand,
+                description='Soy wax candle',
+                price=10 if index % 2 else 20,  # ties on price resolved by id
+                profile_pic_link='https://example.com/candle.jpg',
+                current_stock=1,
+                status='available'
+            )
+            ProductTag.objects.create(product=product, hot=True, hot_if=0.5, rank_if=index % 3)
+
+        urls = [
+            '/api/products/?page_size=2&sort=PRICE',
+            '/api/products/?page_size=2&sort=PRICE_REVERSE',
+            '/api/products/?page_size=2&sort=CREATED',
+            '/api/products/?page_size=2',
+            f'/api/products/brand/{self.brand.id}/?page_size=2&sort=BEST_SELLING',
+            '/api/products/collections/whats-hot/?page_size=2',
+            '/api/products/collections/whats-hot/?page_size=2&sort=PRICE',
+            '/api/products/search/candle/?page_size=2',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cursor_ids = self._walk_cursor_pages(url)
+                response = self.client.get(url.replace('page_size=2', 'page_size=100'))
+                self.assertEqual(cursor_ids, [p['id'] for p in response.data['results']])
+                self.assertEqual(len(cursor_ids), len(set(cursor_ids)))
+
+    def test_cursor_pagination_links(self):
+        """Test next links carry the cursor and reject tokens from another ordering"""
+        for index in range(3):
+            Product.objects.create(
+                name=f'Linked Product {index}',
+                brand=self.brand,
+                description='Test',
+                price=5,
+                profile_pic_link='https://example.com/linked.jpg',
+            )
+        response = self.client.get('/api/products/?page_size=2&sort=PRICE')
+        self.assertIn('page=2', response.data['next'])
+        token = response.data['next_cursor']
+
+        response = self.client.get(f'/api/products/?page_size=2&sort=PRICE&cursor={token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        if response.data['next']:
+            self.assertIn('cursor=', response.data['next'])
+            self.assertNotIn('page=', response.data['next'])
+
+        response = self.client.get(f'/api/products/?page_size=2&sort=PRICE_REVERSE&cursor={token}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/products/search/linked/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        """Test a tampered cursor with values that don't fit the ordering fields is a 404, not a 500"""
+        for index in range(3):
+            Product.objects.create(
+                name=f'Forged Product {index}',
+                brand=self.brand,
+                description='Test',
+                price=5,
+                profile_pic_link='https://example.com/forged.jpg',
+            )
+        for url in ['/api/products/?page_size=1&sort=PRICE', '/api/products/search/forged/?page_size=1']:
+            token = self.client.get(url).data['next_cursor']
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            for values in (
+                [['v', 'cheap']] + payload['v'][1:],
+                payload['v'][:-1] + [['v', 'not-an-id']],
+                payload['v'][:-1] + [['v', [1, 2]]],
+                payload['v'][:-1] + [['v', None]],
+            ):
+                forged = base64.urlsafe_b64encode(
+                    json.dumps({'s': payload['s'], 'v': values}).encode()
+                ).decode().rstrip('=')
+                with self.subTest(url=url, values=values):
+                    response = self.client.get(f'{url}&cursor={forged}')
+                    self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                    self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand = Brand.objects.create(name='Etag Brand')
+            self.product = Product.objects.create(
+                name='Etag Teapot',
+                brand=self.brand,
+                description='Test',
+                price=30.00,
+                profile_pic_link='https://example.com/teapot.jpg',
+                current_stock=3,
+                status='available'
+            )
+            ProductTag.objects.create(product=self.product, hot=True, hot_if=0.5)
+
+    def test_catalog_lists_answer_304_until_catalog_changes(self):
+        """Test list endpoints revalidate against the catalog version without running their query"""
+        for url in ('/api/products/', '/api/products/hot/', '/api/products/gift-box/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('s-maxage', response['Cache-Control'])
+            self.assertTrue(response['ETag'].startswith('W/"catalog-'))
+            self.assertIn('Accept', response['Vary'])
+            # Only the shared catalog version row is read
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertIn('public', response['Cache-Control'])
+            self.assertIn('Accept', response['Vary'])
+
+        # The query string is part of the validator, in any parameter order
+        etag = self.client.get('/api/products/?sort=PRICE&available=true')['ETag']
+        self.assertEqual(self.client.get('/api/products/?available=true&sort=PRICE')['ETag'], etag)
+        self.assertNotEqual(self.client.get('/api/products/?sort=PRICE_REVERSE&available=true')['ETag'], etag)
+        response = self.client.get('/api/products/?sort=PRICE_REVERSE', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = self.client.get('/api/products/hot/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 25.00
+            self.product.save()
+        response = self.client.get('/api/products/hot/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # A write committed by another worker moves the shared row, not this process's cache
+        etag = response['ETag']
+        cache.clear()
+        response = self.client.get('/api/products/hot/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE cache_versions SET version = nextval('cache_versions_seq'), updated_at = clock_timestamp() "
+                "WHERE name = 'catalog'"
+            )
+        response = self.client.get('/api/products/hot/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_detail_validators_follow_updated_at(self):
+        """Test detail ETag/Last-Modified come from updated_at, which tag and brand changes touch"""
+        url = f'/api/products/{self.product.id}/'
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        tag = self.product.tag
+        tag.hot = False
+        tag.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['hot'])
+
+        etag = response['ETag']
+        self.brand.name = 'Renamed Etag Brand'
+        self.brand.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['brand'], 'Renamed Etag Brand')
+
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HomeFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand = Brand.objects.create(name='Home Brand')
+            self.hamper = Product.objects.create(
+                name='Home Hamper', brand=self.brand, description='Test', price=60.00,
+                profile_pic_link='https://example.com/hamper.jpg', type=['Gift Box'],
+                current_stock=2, status='available'
+            )
+            ProductTag.objects.create(product=self.hamper, hot=True, hot_if=0.9, rank_if=0.7)
+            self.teapot = Product.objects.create(
+                name='Home Teapot', brand=self.brand, description='Test', price=30.00,
+                profile_pic_link='https://example.com/teapot.jpg', type=['Kitchen'],
+                current_stock=2, status='available'
+            )
+            ProductTag.objects.create(product=self.teapot, new=True, new_if=0.8, rank_if=0.2)
+
+    def tearDown(self):
+        cache.delete(HOME_LATEST_KEY)
+
+    def test_home_feed_matches_rail_endpoints(self):
+        """Test /home/ returns every rail as its own endpoint does, from the cache once built"""
+        response = self.client.get('/api/products/home/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for rail, url in (('hot', 'hot'), ('new', 'new'), ('explore', 'explore'), ('gift_box', 'gift-box')):
+            self.assertEqual(response.data[rail], self.client.get(f'/api/products/{url}/').data)
+        self.assertEqual([p['id'] for p in response.data['explore']], [self.hamper.id, self.teapot.id])
+
+        # Only the shared catalog version row is read
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/products/home/').data, response.data)
+
+    @override_settings(PRODUCT_HOME_FEED_REBUILD_DELAY=0)
+    def test_home_feed_follows_tag_changes(self):
+        """Test a tag write moves the feed to a new catalog version"""
+        self.client.get('/api/products/home/')
+        tag = self.teapot.tag
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.hot = True
+            tag.hot_if = 0.95
+            tag.save()
+        response = self.client.get('/api/products/home/')
+        self.assertEqual([p['id'] for p in response.data['hot']], [self.teapot.id, self.hamper.id])
+
+        # Another worker's write: only the shared version moves, this process never ran the signals
+        ProductTag.objects.filter(id=tag.id).update(hot=False)
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE cache_versions SET version = nextval('cache_versions_seq') WHERE name = 'catalog'")
+        response = self.client.get('/api/products/home/')
+        self.assertEqual([p['id'] for p in response.data['hot']], [self.hamper.id])
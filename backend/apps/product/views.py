@@ -1,35 +1,77 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Case, When, Value, FloatField, F, Q
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import Q
 from apps.brand.models import Brand
-from .models import Product
-from .serializers import ProductListSerializer, ProductDetailSerializer
-from .services import get_collection_search_query, get_search_query, get_search_suggestions
-from django.db import connection
+from .brand_resolver import brand_resolver
+from .conditional import catalog_etag, catalog_last_modified, conditional, product_etag, product_last_modified
+from .home_feed import explore_listings, gift_box_listings, home_feed, hot_listings, new_listings
+from .models import Product, ProductListing, ProductType
+from .serializers import ProductDetailSerializer, listing_card_rows, serialize_facets, serialize_product_rows
+from .search_backends import get_search_backend
+from .services import fetch_bought_together, fetch_neighbours
+from .pagination import ProductPagination, SearchPlanPagination
 from urllib.parse import unquote
 
 
-class ProductPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+def _type_ids_matching(names):
+    """Sub-select of ProductType ids whose name contains any of `names` (case-insensitive)"""
+    names_q = Q()
+    for name in names:
+        names_q |= Q(name__icontains=name)
+    return ArraySubquery(ProductType.objects.filter(names_q).values('id'))
 
 
+def _brand_id_list(value):
+    """Integer brand ids from a comma-separated `brandId` parameter (non-numeric entries ignored)"""
+    return [int(b) for b in (part.strip() for part in value.split(',')) if b.isdigit()]
+
+
+# Listing orderings for the `sort` query parameter; each ends with id so cursors have a total order
+LISTING_SORT_ORDERS = {
+    # Best selling: rank by rank_if (could be enhanced with sales data later)
+    'BEST_SELLING': ('-rank_if', '-created_at', '-id'),
+    # Oldest first
+    'CREATED': ('created_at', 'id'),
+    # Newest first
+    'CREATED_REVERSE': ('-created_at', '-id'),
+    # Price: Low to High
+    'PRICE': ('price', 'id'),
+    # Price: High to Low
+    'PRICE_REVERSE': ('-price', '-id'),
+}
+# COLLECTION_DEFAULT or unknown: Featured (rank by rank_if)
+FEATURED_ORDER = ('-rank_if', '-created_at', '-id')
+
+
+def _sort_listings(products, request):
+    """Order a ProductListing queryset by the `sort` query parameter"""
+    sort_param = request.query_params.get('sort', 'COLLECTION_DEFAULT')
+    return products.order_by(*LISTING_SORT_ORDERS.get(sort_param, FEATURED_ORDER))
+
+
+def _detail_products():
+    """Products with everything ProductDetailSerializer reads loaded up front"""
+    return Product.objects.select_related('brand', 'tag').prefetch_related('detail_pics')
+
+
+def _wants_facets(request):
+    """`?facets=true` adds brand/type/availability/price facet counts to list responses"""
+    return request.query_params.get('facets', '').lower() == 'true'
+
+
+@conditional(catalog_etag, catalog_last_modified)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def product_list(request):
     """Get all products with pagination, with optional sorting and filtering"""
-    products = Product.objects.select_related('tag', 'brand').annotate(
-        rank_if_value=Case(
-            When(tag__isnull=False, then=F('tag__rank_if')),
-            default=Value(0.0),
-            output_field=FloatField()
-        )
-    )
+    # Denormalised list-card rows (brand name and tag scores included, no joins)
+    products = ProductListing.objects.all()
     
     # Apply filters
     available_param = request.query_params.get('available')
@@ -51,45 +93,23 @@ def product_list(request):
     product_type = request.query_params.get('productType')
     if product_type:
         type_list = [t.strip() for t in product_type.split(',')]
-        type_q = Q()
-        for pt in type_list:
-            type_q |= Q(type__icontains=pt)
-        products = products.filter(type_q)
+        products = products.filter(type_ids__overlap=_type_ids_matching(type_list))
     
+    # Brand names resolve to ids in process, so the filter is brand_id IN (...) on the index
     brand = request.query_params.get('brand')
-    if brand:
-        brand_list = [unquote(b.strip()) for b in brand.split(',')]
-        brand_q = Q()
-        for b_name in brand_list:
-            brand_q |= Q(brand__name__icontains=b_name)
-        products = products.filter(brand_q)
+    brand_ids = set(_brand_id_list(request.query_params.get('brandId', '')))
+    if brand or brand_ids:
+        if brand:
+            brand_ids.update(brand_resolver.resolve(unquote(b.strip()) for b in brand.split(',')))
+        products = products.filter(brand_id__in=sorted(brand_ids))
     
     # Handle sorting based on query parameter
-    sort_param = request.query_params.get('sort', 'COLLECTION_DEFAULT')
-    
-    if sort_param == 'BEST_SELLING':
-        # Best selling: rank by rank_if (could be enhanced with sales data later)
-        products = products.order_by('-rank_if_value', '-created_at')
-    elif sort_param == 'CREATED':
-        # Oldest first
-        products = products.order_by('created_at', 'id')
-    elif sort_param == 'CREATED_REVERSE':
-        # Newest first
-        products = products.order_by('-created_at', '-id')
-    elif sort_param == 'PRICE':
-        # Price: Low to High
-        products = products.order_by('price', 'id')
-    elif sort_param == 'PRICE_REVERSE':
-        # Price: High to Low
-        products = products.order_by('-price', '-id')
-    else:
-        # COLLECTION_DEFAULT or unknown: Featured (rank by rank_if)
-        products = products.order_by('-rank_if_value', '-created_at')
+    products = _sort_listings(products, request)
     
+    # Flat .values() rows through the PRODUCT_CARD projection (no model instances)
     paginator = ProductPagination()
-    paginated_products = paginator.paginate_queryset(products, request)
-    serializer = ProductListSerializer(paginated_products, many=True)
-    return paginator.get_paginated_response(serializer.data)
+    paginated_products = paginator.paginate_queryset(listing_card_rows(products), request)
+    return paginator.get_paginated_response(serialize_product_rows(paginated_products))
 
 
 @api_view(['GET'])
@@ -118,89 +138,26 @@ def product_list_by_collection(request, slug):
     if brand:
         filters['brand'] = [unquote(b.strip()) for b in brand.split(',')]
     
-    # Build PostgreSQL search query with filters
-    search_config = get_collection_search_query(slug, filters)
-    
-    # Get pagination params
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    offset = (page - 1) * page_size
+    brand_id = request.query_params.get('brandId')
+    if brand_id:
+        filters['brand_id'] = _brand_id_list(brand_id)
     
-    # Handle sorting
+    # Build (or fetch the cached) search plan for slug + filters + sort
+    backend = get_search_backend()
     sort_param = request.query_params.get('sort', 'COLLECTION_DEFAULT')
+    plan = backend.collection_plan(slug, filters, sort=sort_param)
     
-    # Adjust ORDER BY based on sort parameter
-    base_order_by = search_config['order_by']
-    if sort_param == 'BEST_SELLING':
-        order_by = "COALESCE(pt.rank_if, 0) DESC, p.created_at DESC"
-    elif sort_param == 'CREATED':
-        order_by = "p.created_at ASC, p.id ASC"
-    elif sort_param == 'CREATED_REVERSE':
-        order_by = "p.created_at DESC, p.id DESC"
-    elif sort_param == 'PRICE':
-        order_by = "p.price ASC, p.id ASC"
-    elif sort_param == 'PRICE_REVERSE':
-        order_by = "p.price DESC, p.id DESC"
-    else:
-        order_by = base_order_by
-    
-    # Build SQL with pagination
-    sql_query = search_config['sql_query'].replace(
-        f"ORDER BY {search_config['order_by']}",
-        f"ORDER BY {order_by}"
-    )
-    sql_query = f"{sql_query} LIMIT %s OFFSET %s"
-    
-    # Execute query
-    with connection.cursor() as cursor:
-        # Count total results - extract WHERE clause and build simpler count query
-        sql_query_str = search_config['sql_query']
-        # Extract WHERE clause from the original query
-        where_match = sql_query_str.split('WHERE')
-        where_clause = where_match[1].split('ORDER BY')[0].strip() if len(where_match) > 1 else 'TRUE'
-        
-        count_query = f"""
-            SELECT COUNT(DISTINCT p.id)
-            FROM products p
-            LEFT JOIN brands b ON p.brand_id = b.id
-            LEFT JOIN product_tags pt ON p.id = pt.product_id
-            WHERE {where_clause}
-        """
-        cursor.execute(count_query, search_config['params'])
-        total = cursor.fetchone()[0]
-        
-        # Get paginated results
-        params = search_config['params'] + [page_size, offset]
-        cursor.execute(sql_query, params)
-        
-        # Fetch results
-        columns = [col[0] for col in cursor.description]
-        rows = cursor.fetchall()
-        
-        # Convert rows to dictionaries
-        results = [dict(zip(columns, row)) for row in rows]
-        product_ids = [r['id'] for r in results]
-    
-    # Fetch Product objects from Django ORM to use serializers
-    # Preserve order by using a dict
-    products_dict = {
-        p.id: p for p in Product.objects.select_related('tag', 'brand')
-        .filter(id__in=product_ids)
-    }
-    
-    # Order products according to SQL results
-    products = [products_dict[pid] for pid in product_ids if pid in products_dict]
-    
-    # Serialize
-    serializer = ProductListSerializer(products, many=True)
-    
-    # Build paginated response
-    return Response({
-        'count': total,
-        'next': f"{request.build_absolute_uri()}?page={page + 1}" if offset + page_size < total else None,
-        'previous': f"{request.build_absolute_uri()}?page={page - 1}" if page > 1 else None,
-        'results': serializer.data
-    })
+    # Page-number (page + total in one statement) or keyset cursor pagination
+    paginator = SearchPlanPagination()
+    results = paginator.paginate_plan(plan, request, backend)
+    
+    # Serialize straight from the fetched rows (no second query)
+    response = paginator.get_paginated_response(serialize_product_rows(results))
+    
+    # Optional sidebar facets over every match (one aggregate query)
+    if _wants_facets(request):
+        response.data['facets'] = serialize_facets(backend.fetch_facets(plan))
+    return response
 
 
 @api_view(['GET'])
@@ -214,36 +171,34 @@ def search_products(request):
         return Response({
             'suggestions': [],
             'products': [],
-            'total': 0
+            'total': 0,
+            'corrected_query': None
         })
     
-    # Get suggestions (brands)
-    suggestions = get_search_suggestions(query, limit=limit)
-    
-    # Get products
-    search_config = get_search_query(query, limit=limit)
+    # Get suggestions from the in-process index; the backend's fallback while it is cold
+    backend = get_search_backend()
+    suggestions = backend.suggestions(query, limit=limit)
     
-    with connection.cursor() as cursor:
-        cursor.execute(search_config['sql_query'], search_config['params'])
-        columns = [col[0] for col in cursor.description]
-        rows = cursor.fetchall()
-        results = [dict(zip(columns, row)) for row in rows]
-        product_ids = [r['id'] for r in results]
+    # Get products for the query as typed: mid-word prefixes ('choc') must not
+    # be "corrected" into other words while the user is still typing
+    columns, rows = backend.fetch_rows(backend.search_plan(query, limit=limit))
     
-    # Fetch Product objects from Django ORM
-    products_dict = {
-        p.id: p for p in Product.objects.select_related('tag', 'brand')
-        .filter(id__in=product_ids)
-    }
-    products = [products_dict[pid] for pid in product_ids if pid in products_dict]
+    # "Did you mean" only when nothing matched: search again with misspelled
+    # words corrected against the lexeme dictionary
+    corrected_query = None
+    if not rows:
+        corrected_query = backend.correct_query(query)
+        if corrected_query:
+            columns, rows = backend.fetch_rows(backend.search_plan(corrected_query, limit=limit))
     
-    # Serialize
-    serializer = ProductListSerializer(products, many=True)
+    # Serialize straight from the fetched row tuples (no second query)
+    products = serialize_product_rows(rows, columns)
     
     return Response({
         'suggestions': suggestions,
-        'products': serializer.data,
-        'total': len(products)
+        'products': products,
+        'total': len(products),
+        'corrected_query': corrected_query
     })
 
 
@@ -251,176 +206,98 @@ def search_products(request):
 @permission_classes([AllowAny])
 def search_products_full(request, query):
     """Full search results page with pagination"""
-    # Get pagination params
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    offset = (page - 1) * page_size
-    
-    # Build search query
-    search_config = get_search_query(query, limit=10000)  # Large limit for counting
-    
-    # Extract WHERE clause for count
-    sql_query_str = search_config['sql_query']
-    where_match = sql_query_str.split('WHERE')
-    where_clause = where_match[1].split('ORDER BY')[0].strip() if len(where_match) > 1 else 'TRUE'
-    # Remove LIMIT from where_clause if present
-    where_clause = where_clause.split('LIMIT')[0].strip()
-    
-    # Check if it's a short query (no similarity_score in SELECT)
-    is_short_query = 'similarity_score' not in sql_query_str
-    
-    # Build count query
-    count_query = f"""
-        SELECT COUNT(DISTINCT p.id)
-        FROM products p
-        LEFT JOIN brands b ON p.brand_id = b.id
-        LEFT JOIN product_tags pt ON p.id = pt.product_id
-        WHERE {where_clause}
-    """
-    
-    # Build paginated query - use the ORDER BY from search_config
-    if is_short_query:
-        # Short query: no similarity_score
-        select_fields = (
-            f"p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-            f"p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-            f"pt.rank_if"
-        )
-        order_by = search_config['order_by']
-    else:
-        # Longer query: include similarity_score
-        search_text_escaped = query.replace("'", "''")
-        similarity_expr = (
-            f"GREATEST("
-            f"similarity(p.name, '{search_text_escaped}'), "
-            f"similarity(p.description, '{search_text_escaped}'), "
-            f"similarity(b.name, '{search_text_escaped}')"
-            f")"
-        )
-        select_fields = (
-            f"p.id, p.name, p.brand_id, p.description, p.price, p.profile_pic_link, "
-            f"p.type, p.current_stock, p.status, p.created_at, p.updated_at, "
-            f"pt.rank_if, {similarity_expr} AS similarity_score"
-        )
-        order_by = search_config['order_by']
-    
-    paginated_query = f"""
-        SELECT {select_fields}
-        FROM products p
-        LEFT JOIN brands b ON p.brand_id = b.id
-        LEFT JOIN product_tags pt ON p.id = pt.product_id
-        WHERE {where_clause}
-        ORDER BY {order_by}
-        LIMIT %s OFFSET %s
-    """
-    
-    with connection.cursor() as cursor:
-        # Get total count
-        cursor.execute(count_query, search_config['params'][:-1])  # Remove limit param
-        total = cursor.fetchone()[0]
-        
-        # Get paginated results
-        params = search_config['params'][:-1] + [page_size, offset]  # Remove limit, add pagination
-        cursor.execute(paginated_query, params)
-        
-        columns = [col[0] for col in cursor.description]
-        rows = cursor.fetchall()
-        results = [dict(zip(columns, row)) for row in rows]
-        product_ids = [r['id'] for r in results]
-    
-    # Fetch Product objects from Django ORM
-    products_dict = {
-        p.id: p for p in Product.objects.select_related('tag', 'brand')
-        .filter(id__in=product_ids)
-    }
-    products = [products_dict[pid] for pid in product_ids if pid in products_dict]
-    
-    # Serialize
-    serializer = ProductListSerializer(products, many=True)
-    
-    # Build paginated response
-    return Response({
-        'count': total,
-        'next': f"{request.build_absolute_uri()}?page={page + 1}" if offset + page_size < total else None,
-        'previous': f"{request.build_absolute_uri()}?page={page - 1}" if page > 1 else None,
-        'results': serializer.data
-    })
+    # Build (or fetch the cached) search plan, with misspelled words corrected
+    backend = get_search_backend()
+    corrected_query = backend.correct_query(query)
+    plan = backend.search_plan(corrected_query or query)
+    
+    # Page-number (page + total in one statement) or keyset cursor pagination
+    paginator = SearchPlanPagination()
+    results = paginator.paginate_plan(plan, request, backend)
+    
+    # Serialize straight from the fetched rows (no second query)
+    response = paginator.get_paginated_response(serialize_product_rows(results))
+    response.data['corrected_query'] = corrected_query
+    
+    # Optional sidebar facets over every match (one aggregate query)
+    if _wants_facets(request):
+        response.data['facets'] = serialize_facets(backend.fetch_facets(plan))
+    return response
 
 
+@conditional(product_etag, product_last_modified)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def product_detail(request, product_id):
     """Get single product by ID with all details"""
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(_detail_products(), id=product_id)
     serializer = ProductDetailSerializer(product)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_batch(request):
+    """Get details of several products (?ids=3,1,2) in the requested order; unknown ids are skipped"""
+    try:
+        ids = list(dict.fromkeys(int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        return Response({'error': 'ids must be a comma-separated list of product ids'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > settings.PRODUCT_BATCH_MAX_IDS:
+        return Response(
+            {'error': f'At most {settings.PRODUCT_BATCH_MAX_IDS} ids per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Two queries whatever the number of ids: products joined to brand and tag, then detail pictures
+    products = _detail_products().in_bulk(ids)
+    serializer = ProductDetailSerializer([products[i] for i in ids if i in products], many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@conditional(catalog_etag, catalog_last_modified)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def hot_products(request):
     """Get 8 most hot products ranked by hot_if high to low"""
-    products = Product.objects.select_related('tag').filter(
-        tag__hot=True,
-        tag__isnull=False
-    ).order_by('-tag__hot_if')[:8]
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    products = hot_listings()
+    return Response(serialize_product_rows(listing_card_rows(products)), status=status.HTTP_200_OK)
 
 
+@conditional(catalog_etag, catalog_last_modified)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def new_products(request):
     """Get 8 most new products ranked by new_if high to low"""
-    products = Product.objects.select_related('tag').filter(
-        tag__new=True,
-        tag__isnull=False
-    ).order_by('-tag__new_if')[:8]
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    products = new_listings()
+    return Response(serialize_product_rows(listing_card_rows(products)), status=status.HTTP_200_OK)
 
 
+@conditional(catalog_etag, catalog_last_modified)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def explore_products(request):
     """Get 8 most deserve to explore products ranked by rank_if high to low"""
-    products = Product.objects.select_related('tag').filter(
-        tag__isnull=False
-    ).order_by('-tag__rank_if')[:8]
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    products = explore_listings()
+    return Response(serialize_product_rows(listing_card_rows(products)), status=status.HTTP_200_OK)
 
 
+@conditional(catalog_etag, catalog_last_modified)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def gift_box_products(request):
     """Get 8 gift box products ranked by rank_if high to low"""
-    # Filter products where type array contains anything with 'gift' (case-insensitive)
-    # Get all products with tags, annotate rank_if, then filter in Python for case-insensitive matching
-    products = Product.objects.select_related('tag').filter(
-        tag__isnull=False
-    ).annotate(
-        rank_if_value=Case(
-            When(tag__isnull=False, then=F('tag__rank_if')),
-            default=Value(0.0),
-            output_field=FloatField()
-        )
-    ).order_by('-rank_if_value')
-    
-    # Filter for products where any type contains 'gift' (case-insensitive)
-    gift_products = []
-    for product in products:
-        if product.type and isinstance(product.type, list):
-            for type_item in product.type:
-                if isinstance(type_item, str) and 'gift' in type_item.lower():
-                    gift_products.append(product)
-                    break
-        # Stop once we have 8 products (already sorted by rank_if)
-        if len(gift_products) >= 8:
-            break
-    
-    serializer = ProductListSerializer(gift_products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    products = gift_box_listings()
+    return Response(serialize_product_rows(listing_card_rows(products)), status=status.HTTP_200_OK)
+
+
+@conditional(catalog_etag, catalog_last_modified)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def home_products(request):
+    """Hot, new, explore and gift-box rails for the home page in one response"""
+    # Cached per catalog version and rebuilt in the background after catalog writes
+    return Response(home_feed(), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -430,76 +307,52 @@ def product_list_by_brand(request, brand_id):
     # Get brand by ID
     brand = get_object_or_404(Brand, id=brand_id)
     
-    products = Product.objects.select_related('tag').filter(
-        brand=brand
-    ).annotate(
-        rank_if_value=Case(
-            When(tag__isnull=False, then=F('tag__rank_if')),
-            default=Value(0.0),
-            output_field=FloatField()
-        )
-    )
+    products = ProductListing.objects.filter(brand_id=brand.id)
     
     # Handle sorting based on query parameter
-    sort_param = request.query_params.get('sort', 'COLLECTION_DEFAULT')
-    
-    if sort_param == 'BEST_SELLING':
-        # Best selling: rank by rank_if (could be enhanced with sales data later)
-        products = products.order_by('-rank_if_value', '-created_at')
-    elif sort_param == 'CREATED':
-        # Oldest first
-        products = products.order_by('created_at', 'id')
-    elif sort_param == 'CREATED_REVERSE':
-        # Newest first
-        products = products.order_by('-created_at', '-id')
-    elif sort_param == 'PRICE':
-        # Price: Low to High
-        products = products.order_by('price', 'id')
-    elif sort_param == 'PRICE_REVERSE':
-        # Price: High to Low
-        products = products.order_by('-price', '-id')
-    else:
-        # COLLECTION_DEFAULT or unknown: Featured (rank by rank_if)
-        products = products.order_by('-rank_if_value', '-created_at')
+    products = _sort_listings(products, request)
     
+    # Flat .values() rows through the PRODUCT_CARD projection (no model instances)
     paginator = ProductPagination()
-    paginated_products = paginator.paginate_queryset(products, request)
-    serializer = ProductListSerializer(paginated_products, many=True)
-    return paginator.get_paginated_response(serializer.data)
+    paginated_products = paginator.paginate_queryset(listing_card_rows(products), request)
+    return paginator.get_paginated_response(serialize_product_rows(paginated_products))
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def you_might_like_products(request, product_id):
-    """Get 8 products with same type as provided product, ordered by rank_if, excluding the provided product"""
-    # Get the product to find its type
-    product = get_object_or_404(Product, id=product_id)
-    
-    # Get product's type array
-    product_types = product.type if isinstance(product.type, list) else []
-    
-    if not product_types:
+    """Get the 8 products most similar to the provided product"""
+    # Neighbours precomputed by `manage.py rebuild_product_neighbours` (one indexed lookup)
+    neighbours = fetch_neighbours(product_id, limit=8)
+    if neighbours:
+        return Response(serialize_product_rows(neighbours), status=status.HTTP_200_OK)
+    
+    # Not in the last neighbours run (e.g. a new product): products sharing a type, by rank_if
+    # Get the product's interned type ids
+    product = ProductListing.objects.filter(id=product_id).only('type_ids').first()
+    if product is None:
+        raise NotFound('No Product matches the given query.')
+    
+    if not product.type_ids:
         # If product has no type, return empty list
         return Response([], status=status.HTTP_200_OK)
     
-    # Find products that share at least one type with the provided product
-    # Using __contains for each type in the array
-    type_filters = Q()
-    for product_type in product_types:
-        type_filters |= Q(type__contains=[product_type])
-    
-    # Get products with same type, exclude current product, ordered by rank_if
-    products = Product.objects.select_related('tag').filter(
-        type_filters
+    # Get products sharing at least one type (GIN overlap), exclude current product, ordered by rank_if
+    products = ProductListing.objects.filter(
+        type_ids__overlap=product.type_ids
     ).exclude(
         id=product_id
-    ).annotate(
-        rank_if_value=Case(
-            When(tag__isnull=False, then=F('tag__rank_if')),
-            default=Value(0.0),
-            output_field=FloatField()
-        )
-    ).order_by('-rank_if_value', '-created_at')[:8]
+    ).order_by(*FEATURED_ORDER)[:8]
     
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serialize_product_rows(listing_card_rows(products)), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def bought_together_products(request, product_id):
+    """Get up to 8 products frequently bought together with the provided product"""
+    # Lists mined from order history by `manage.py mine_bought_together` (one indexed lookup)
+    products = fetch_bought_together(product_id, limit=8)
+    if not products:
+        get_object_or_404(Product.objects.only('id'), id=product_id)
+    return Response(serialize_product_rows(products), status=status.HTTP_200_OK)
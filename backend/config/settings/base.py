@@ -78,6 +78,11 @@ DATABASES = {
         'PASSWORD': config('POSTGRES_PASSWORD', default='postgres'),
         'HOST': config('POSTGRES_HOST', default=config('DB_HOST', default='db')),
         'PORT': config('POSTGRES_PORT', default=config('DB_PORT', default='5432')),
+        # Seconds a connection (and the search statements prepared on it) is reused
+        # across requests; 0 closes it after every request
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int),
+        # Check a reused connection is still alive before the request's first query
+        'CONN_HEALTH_CHECKS': config('CONN_HEALTH_CHECKS', default=True, cast=bool),
     }
 }
 
@@ -151,7 +156,72 @@ else:
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache (catalog-versioned search results, see apps.product.cache).
+# The version counters are stored in the database, so a per-process cache stays correct
+# with several workers; a shared backend (memcached/redis) lets them share cached results.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='popshop'),
+    }
+}
+
 # Stripe settings
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+
+# Product search settings
+# pg_trgm thresholds applied per connection (see apps.product.signals)
+PRODUCT_SEARCH_SIMILARITY_THRESHOLD = config('PRODUCT_SEARCH_SIMILARITY_THRESHOLD', default=0.2, cast=float)
+PRODUCT_SEARCH_WORD_SIMILARITY_THRESHOLD = config('PRODUCT_SEARCH_WORD_SIMILARITY_THRESHOLD', default=0.6, cast=float)
+# Seconds before a worker's in-process autocomplete index is rebuilt in the background
+PRODUCT_AUTOCOMPLETE_MAX_AGE = config('PRODUCT_AUTOCOMPLETE_MAX_AGE', default=300, cast=int)
+# Maximum number of search/collection query plans memoised per worker
+PRODUCT_SEARCH_PLAN_CACHE_SIZE = config('PRODUCT_SEARCH_PLAN_CACHE_SIZE', default=512, cast=int)
+# Upper bound for `count=capped` totals on collection and search pages
+PRODUCT_SEARCH_COUNT_CAP = config('PRODUCT_SEARCH_COUNT_CAP', default=1000, cast=int)
+# Run catalog search queries as per-connection server-side prepared statements
+# (disable behind a transaction-pooling PgBouncer)
+PRODUCT_SEARCH_PREPARED_STATEMENTS = config('PRODUCT_SEARCH_PREPARED_STATEMENTS', default=True, cast=bool)
+# Maximum number of prepared query shapes kept per connection
+PRODUCT_SEARCH_PREPARED_STATEMENT_LIMIT = config('PRODUCT_SEARCH_PREPARED_STATEMENT_LIMIT', default=64, cast=int)
+# Number of equal-width buckets in the price histogram facet
+PRODUCT_FACET_PRICE_BUCKETS = config('PRODUCT_FACET_PRICE_BUCKETS', default=10, cast=int)
+# Seconds to keep cached search/collection result ids (0 disables the result cache)
+PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT = config('PRODUCT_SEARCH_RESULT_CACHE_TIMEOUT', default=300, cast=int)
+# Maximum ordered ids cached per search/collection; deeper pages query the database
+PRODUCT_SEARCH_RESULT_CACHE_MAX_IDS = config('PRODUCT_SEARCH_RESULT_CACHE_MAX_IDS', default=1000, cast=int)
+# Candidates pulled per index branch for short-limit (top-k) searches such as the header dropdown
+PRODUCT_SEARCH_CANDIDATES = config('PRODUCT_SEARCH_CANDIDATES', default=200, cast=int)
+# Minimum trigram similarity for a "did you mean" correction from the search_lexemes dictionary
+PRODUCT_SEARCH_CORRECTION_SIMILARITY = config('PRODUCT_SEARCH_CORRECTION_SIMILARITY', default=0.3, cast=float)
+# Search backend class: PostgreSQL FTS + pg_trgm, or the per-worker in-memory index
+# ('apps.product.search_backends.InMemorySearchBackend')
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='apps.product.search_backends.PostgresSearchBackend')
+# Seconds before the in-memory search index is rebuilt in the background (picks up other workers' writes)
+PRODUCT_SEARCH_MEMORY_MAX_AGE = config('PRODUCT_SEARCH_MEMORY_MAX_AGE', default=300, cast=int)
+# Seconds after a catalog write before stale registered collections are refreshed in the background
+# (0: only `manage.py refresh_collections --stale`)
+PRODUCT_COLLECTION_REFRESH_DELAY = config('PRODUCT_COLLECTION_REFRESH_DELAY', default=30, cast=int)
+# Cache-Control max-age for conditional catalog responses (browsers revalidate after this)
+PRODUCT_HTTP_CACHE_MAX_AGE = config('PRODUCT_HTTP_CACHE_MAX_AGE', default=0, cast=int)
+# Cache-Control s-maxage for conditional catalog responses (CDNs and other shared caches)
+PRODUCT_HTTP_CACHE_SHARED_MAX_AGE = config('PRODUCT_HTTP_CACHE_SHARED_MAX_AGE', default=60, cast=int)
+# Seconds a built home feed (/api/products/home/) stays in the cache for its catalog version
+# (also bounds staleness after writes that do not bump the version)
+PRODUCT_HOME_FEED_CACHE_TIMEOUT = config('PRODUCT_HOME_FEED_CACHE_TIMEOUT', default=300, cast=int)
+# Seconds after a catalog write before the home feed is rebuilt in the background (0: on the next request)
+PRODUCT_HOME_FEED_REBUILD_DELAY = config('PRODUCT_HOME_FEED_REBUILD_DELAY', default=1, cast=int)
+# Maximum product ids per /api/products/batch/ request
+PRODUCT_BATCH_MAX_IDS = config('PRODUCT_BATCH_MAX_IDS', default=50, cast=int)
+# Neighbours stored per product by `manage.py rebuild_product_neighbours`
+PRODUCT_NEIGHBOURS_K = config('PRODUCT_NEIGHBOURS_K', default=20, cast=int)
+# Products per similarity block in the neighbours job (memory grows with block size x catalog size)
+PRODUCT_NEIGHBOURS_BLOCK_SIZE = config('PRODUCT_NEIGHBOURS_BLOCK_SIZE', default=256, cast=int)
+# Products stored per bought-together list by `manage.py mine_bought_together`
+PRODUCT_BOUGHT_TOGETHER_SIZE = config('PRODUCT_BOUGHT_TOGETHER_SIZE', default=20, cast=int)
+# Orders two products must share before they are listed as bought together
+PRODUCT_BOUGHT_TOGETHER_MIN_ORDERS = config('PRODUCT_BOUGHT_TOGETHER_MIN_ORDERS', default=2, cast=int)
+# Order ids below its watermark the bought-together job keeps looking up, for orders that commit late
+PRODUCT_BOUGHT_TOGETHER_RESCAN_WINDOW = config('PRODUCT_BOUGHT_TOGETHER_RESCAN_WINDOW', default=1000, cast=int)
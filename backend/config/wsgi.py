@@ -8,3 +8,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Build the per-worker autocomplete index in the background; search suggestions
+# use SQL until it is ready (gunicorn imports this module in every worker).
+from apps.product.autocomplete import suggestion_index  # noqa: E402
+
+suggestion_index.warm_up()
+
+# Likewise the in-memory search index when PRODUCT_SEARCH_BACKEND selects it
+from apps.product.search_backends import get_search_backend  # noqa: E402
+
+get_search_backend().warm_up()